@@ -1,14 +1,15 @@
 """
 AWS Lambda Handler
 Main entry point for serverless functions
+
+Heavy dependencies (numpy, faiss, openai, tiktoken, youtube_transcript_api,
+boto3) are imported inside the handlers that use them, so a cold start only
+pays for the route being served. Python caches the modules, so warm
+invocations do not import them again.
 """
 import json
 import os
-from utils.transcript_extractor import get_transcript
-from utils.text_processor import chunk_text
-from utils.embeddings import EmbeddingGenerator
-from utils.vector_store import VectorStore
-from utils.rag_engine import RAGEngine
+from utils import tracing
 
 
 def get_cors_headers():
@@ -16,22 +17,56 @@ def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Headers': 'Content-Type',
-        'Access-Control-Allow-Methods': 'POST, OPTIONS'
+        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS'
     }
 
 
+@tracing.traced_request('ingest')
 def ingest_video(event, context):
     """
     Endpoint: POST /ingest
-    Process YouTube video: extract transcript, chunk, embed, store
+    Queue a YouTube video for ingestion: extract transcript, chunk, embed, store
 
     Input: {"url": "https://youtube.com/watch?v=..."}
-    Output: {"success": true, "video_id": "...", "chunks_count": 42}
+       or: {"job_id": "..."} to resume a failed job from its failed stage
+       Add "wait": true to run the pipeline inside the request
+       Add "force": true to re-ingest a video whose index is up to date
+       Add "refresh": true to fetch the captions again and apply only the
+       chunks that changed (live streams, premieres, corrected transcripts)
+    Output: {"success": true, "job_id": "...", "status": "queued"}
+
+    Ingest is idempotent: a video already indexed with the current embedding
+    model and chunking returns {"already_ingested": true} without a job, and
+    a video being ingested returns the running job ("deduplicated": true).
     """
+    from utils.ingest_pipeline import (
+        get_job_backend, run_job, submit_job, resume_job, wait_for_job, find_compatible_index
+    )
+    from utils.transcript_extractor import extract_video_id
+
     try:
         # Parse request body
         body = json.loads(event.get('body', '{}'))
         video_url = body.get('url')
+        job_id = body.get('job_id')
+
+        if job_id:
+            job, _ = resume_job(job_id)
+            if not job:
+                return {
+                    'statusCode': 404,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({'error': 'Job not found'})
+                }
+            response = {'success': True, 'job_id': job['job_id'], 'status': job['status']}
+            if job['job_id'] != job_id:
+                # The video is already being ingested by another job
+                response['deduplicated'] = True
+            return {
+                'statusCode': 202,
+                'headers': get_cors_headers(),
+                'body': json.dumps(response)
+            }
 
         if not video_url:
             return {
@@ -40,71 +75,126 @@ def ingest_video(event, context):
                 'body': json.dumps({'error': 'Video URL is required'})
             }
 
-        # Step 1: Extract transcript
-        print(f"Extracting transcript for: {video_url}")
-        transcript_result = get_transcript(video_url)
-
-        if not transcript_result['success']:
+        try:
+            video_id = extract_video_id(video_url)
+        except ValueError as e:
             return {
                 'statusCode': 400,
                 'headers': get_cors_headers(),
-                'body': json.dumps({'error': transcript_result['error']})
+                'body': json.dumps({'error': str(e)})
             }
 
-        video_id = transcript_result['video_id']
-        transcript = transcript_result['transcript']
-        print(f"Transcript extracted: {len(transcript)} characters")
+        refresh = bool(body.get('refresh'))
+        if not body.get('force') and not refresh:
+            meta = find_compatible_index(os.getenv('S3_BUCKET_NAME'), video_id)
+            if meta:
+                return {
+                    'statusCode': 200,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({
+                        'success': True,
+                        'video_id': video_id,
+                        'status': 'succeeded',
+                        'already_ingested': True,
+                        'chunks_count': meta.get('count'),
+                        'message': 'Video already ingested'
+                    })
+                }
+
+        if body.get('wait'):
+            # Synchronous mode: same stages, run in this request, or wait
+            # for the ingest of this video that is already running
+            store, _ = get_job_backend()
+            job, created = submit_job(video_url, video_id, enqueue=False, refresh=refresh)
+            job = run_job(store, job['job_id']) if created else wait_for_job(store, job['job_id'])
+
+            if job['status'] != 'succeeded':
+                return {
+                    'statusCode': 400 if job['stage'] == 'fetch' else 500,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({'error': job['error'] or f"Ingest job {job['job_id']} is still {job['status']}"})
+                }
+
+            return {
+                'statusCode': 200,
+                'headers': get_cors_headers(),
+                'body': json.dumps(dict(
+                    job['result'],
+                    success=True,
+                    job_id=job['job_id'],
+                    deduplicated=not created,
+                    message='Video processed successfully'
+                ))
+            }
+
+        job, created = submit_job(video_url, video_id, refresh=refresh)
+        if created:
+            print(f"Queued ingest job {job['job_id']} for: {video_url}")
+        else:
+            print(f"Joined running ingest job {job['job_id']} for: {video_url}")
+
+        return {
+            'statusCode': 202,
+            'headers': get_cors_headers(),
+            'body': json.dumps({
+                'success': True,
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'deduplicated': not created,
+                'message': 'Video queued for processing' if created else 'Video is already being processed'
+            })
+        }
+
+    except Exception as e:
+        print(f"Error in ingest_video: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': get_cors_headers(),
+            'body': json.dumps({'error': f'Internal error: {str(e)}'})
+        }
 
-        # Step 2: Chunk text
-        chunk_size = int(os.getenv('CHUNK_SIZE', 500))
-        chunk_overlap = int(os.getenv('CHUNK_OVERLAP', 50))
 
-        chunks = chunk_text(transcript, chunk_size=chunk_size, overlap=chunk_overlap)
-        print(f"Text chunked into {len(chunks)} pieces")
+@tracing.traced_request('ingest_status')
+def ingest_status(event, context):
+    """
+    Endpoint: POST /ingest/status (or GET ?job_id=...)
+    Report the current stage, progress and per-stage timings of an ingest job
 
-        # Step 3: Generate embeddings
-        embedding_model = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
-        embedder = EmbeddingGenerator(model=embedding_model)
+    Input: {"job_id": "..."}
+    Output: {"success": true, "job_id": "...", "status": "running", "stage": "embed",
+             "progress": 0.5, "stages": {...}, "result": {...}}
+    """
+    from utils.ingest_pipeline import get_job_backend
 
-        embeddings_result = embedder.generate_embeddings(chunks)
+    try:
+        body = json.loads(event.get('body') or '{}')
+        job_id = body.get('job_id') or (event.get('queryStringParameters') or {}).get('job_id')
 
-        if not embeddings_result['success']:
+        if not job_id:
             return {
-                'statusCode': 500,
+                'statusCode': 400,
                 'headers': get_cors_headers(),
-                'body': json.dumps({'error': embeddings_result['error']})
+                'body': json.dumps({'error': 'job_id is required'})
             }
 
-        embeddings = embeddings_result['embeddings']
-        print(f"Generated {len(embeddings)} embeddings, dimension: {embeddings_result['dimension']}")
-
-        # Step 4: Create and store vector index
-        vector_store = VectorStore(dimension=embeddings_result['dimension'])
-        vector_store.add_vectors(embeddings, chunks)
+        store, _ = get_job_backend()
+        job = store.get_job(job_id)
 
-        # Save to S3
-        bucket_name = os.getenv('S3_BUCKET_NAME')
-        if bucket_name:
-            success = vector_store.save_to_s3(bucket_name, video_id)
-            if not success:
-                print("Warning: Failed to save to S3")
-
-        print(f"Vector store created and saved for video: {video_id}")
+        if not job:
+            return {
+                'statusCode': 404,
+                'headers': get_cors_headers(),
+                'body': json.dumps({'error': 'Job not found'})
+            }
 
         return {
             'statusCode': 200,
             'headers': get_cors_headers(),
-            'body': json.dumps({
-                'success': True,
-                'video_id': video_id,
-                'chunks_count': len(chunks),
-                'transcript_length': len(transcript),
-                'message': 'Video processed successfully'
-            })
+            'body': json.dumps(dict(job, success=True))
         }
 
     except Exception as e:
-        print(f"Error in ingest_video: {str(e)}")
+        print(f"Error in ingest_status: {str(e)}")
         return {
             'statusCode': 500,
             'headers': get_cors_headers(),
@@ -112,66 +202,444 @@ def ingest_video(event, context):
         }
 
 
+@tracing.traced_request('ingest_worker')
+def ingest_worker(event, context):
+    """
+    SQS-triggered worker: runs one pipeline stage per message
+    and enqueues the next stage of the job
+    """
+    from utils.ingest_pipeline import process_queue_message
+
+    for record in event.get('Records', []):
+        process_queue_message(record['body'])
+
+
+def _chat_request_error(body):
+    """400 response for an invalid /chat body, or None"""
+    if not body.get('video_id') or not body.get('question'):
+        return {
+            'statusCode': 400,
+            'headers': get_cors_headers(),
+            'body': json.dumps({'error': 'video_id and question are required'})
+        }
+    return None
+
+
+def _chat_batch_request_error(body):
+    """400 response for an invalid /chat/batch body, or None"""
+    questions = body.get('questions')
+    valid_questions = isinstance(questions, list) and questions and all(
+        isinstance(question, str) and question for question in questions
+    )
+    if not body.get('video_id') or not valid_questions:
+        return {
+            'statusCode': 400,
+            'headers': get_cors_headers(),
+            'body': json.dumps({'error': 'video_id and a non-empty list of questions are required'})
+        }
+
+    max_questions = int(os.getenv('CHAT_BATCH_MAX_QUESTIONS', 100))
+    if len(questions) > max_questions:
+        return {
+            'statusCode': 400,
+            'headers': get_cors_headers(),
+            'body': json.dumps({'error': f'At most {max_questions} questions per request'})
+        }
+    return None
+
+
+def _video_not_found():
+    """404 response for a video without an index"""
+    return {
+        'statusCode': 404,
+        'headers': get_cors_headers(),
+        'body': json.dumps({'error': 'Video not found. Please ingest the video first.'})
+    }
+
+
+def _chat_response(answer_result, video_id=None):
+    """/chat response for a RAGEngine answer (video_id is left out for catalog answers)"""
+    if not answer_result['success']:
+        return {
+            'statusCode': 500,
+            'headers': get_cors_headers(),
+            'body': json.dumps({'error': answer_result['error']})
+        }
+
+    response = {
+        'success': True,
+        'answer': answer_result['answer'],
+        'context_used': answer_result['context_used'],
+        'context_tokens': answer_result.get('context_tokens', 0),
+        'sources': answer_result.get('chunks', []),
+        'cached': answer_result.get('cached', False),
+        'prompt_tokens': answer_result.get('prompt_tokens', 0)
+    }
+    if video_id is not None:
+        response['video_id'] = video_id
+    return {
+        'statusCode': 200,
+        'headers': get_cors_headers(),
+        'body': json.dumps(response)
+    }
+
+
+def _chat_batch_response(questions, answer_results, video_id):
+    """/chat/batch response for RAGEngine answers aligned with questions"""
+    results = []
+    for question, answer_result in zip(questions, answer_results):
+        if answer_result['success']:
+            results.append({
+                'question': question,
+                'success': True,
+                'answer': answer_result['answer'],
+                'context_used': answer_result['context_used'],
+                'context_tokens': answer_result.get('context_tokens', 0),
+                'sources': answer_result.get('chunks', []),
+                'cached': answer_result.get('cached', False),
+                'prompt_tokens': answer_result.get('prompt_tokens', 0)
+            })
+        else:
+            results.append({'question': question, 'success': False, 'error': answer_result['error']})
+
+    answered = sum(result['success'] for result in results)
+    return {
+        'statusCode': 200,
+        'headers': get_cors_headers(),
+        'body': json.dumps({
+            'success': True,
+            'video_id': video_id,
+            'results': results,
+            'answered': answered,
+            'failed': len(results) - answered
+        })
+    }
+
+
+def _internal_error(handler_name, error):
+    print(f"Error in {handler_name}: {str(error)}")
+    return {
+        'statusCode': 500,
+        'headers': get_cors_headers(),
+        'body': json.dumps({'error': f'Internal error: {str(error)}'})
+    }
+
+
+@tracing.traced_request('chat')
 def chat(event, context):
     """
     Endpoint: POST /chat
     Answer questions based on video transcript
 
     Input: {"video_id": "...", "question": "What is this video about?"}
-    Output: {"success": true, "answer": "...", "context_used": 3}
+    Output: {"success": true, "answer": "...", "context_used": 3, "context_tokens": 1204, "sources": [...], "prompt_tokens": 1642}
+    Sources carry start/end seconds for videos ingested with timestamps
     """
+    from utils.rag_engine import get_rag_engine
+    from utils.store_cache import get_store_cache
+
     try:
         # Parse request body
         body = json.loads(event.get('body', '{}'))
-        video_id = body.get('video_id')
-        question = body.get('question')
-
-        if not video_id or not question:
-            return {
-                'statusCode': 400,
-                'headers': get_cors_headers(),
-                'body': json.dumps({'error': 'video_id and question are required'})
-            }
+        error = _chat_request_error(body)
+        if error:
+            return error
 
+        video_id = body['video_id']
+        question = body['question']
         print(f"Processing question for video {video_id}: {question}")
 
-        # Load vector store from S3
+        # Load vector store (served from the warm-container cache when possible)
         bucket_name = os.getenv('S3_BUCKET_NAME')
-        vector_store = VectorStore.load_from_s3(bucket_name, video_id)
+        store_cache = get_store_cache()
+        vector_store = store_cache.get(bucket_name, video_id)
 
         if not vector_store:
-            return {
-                'statusCode': 404,
-                'headers': get_cors_headers(),
-                'body': json.dumps({'error': 'Video not found. Please ingest the video first.'})
-            }
+            return _video_not_found()
 
-        # Use RAGEngine to handle the complete RAG workflow
+        # Shared RAGEngine handles the complete RAG workflow
         llm_model = os.getenv('LLM_MODEL', 'gpt-3.5-turbo')
-        rag_engine = RAGEngine(model=llm_model)
+        rag_engine = get_rag_engine(llm_model)
 
-        answer_result = rag_engine.answer_question(question, vector_store, video_id)
+        return _chat_response(rag_engine.answer_question(question, vector_store, video_id), video_id)
 
-        if not answer_result['success']:
+    except Exception as e:
+        return _internal_error('chat', e)
+
+
+@tracing.traced_request('chat')
+async def chat_async(event, context):
+    """
+    Async form of chat() for the ASGI server (local_dev/asgi_server.py):
+    the store loads on the blocking pool and OpenAI calls go through
+    AsyncOpenAI, so concurrent chats share one event loop
+    """
+    from utils.rag_engine import get_async_rag_engine
+    from utils.store_cache import get_store_cache
+
+    try:
+        body = json.loads(event.get('body', '{}'))
+        error = _chat_request_error(body)
+        if error:
+            return error
+
+        video_id = body['video_id']
+        vector_store = await get_store_cache().aget(os.getenv('S3_BUCKET_NAME'), video_id)
+        if not vector_store:
+            return _video_not_found()
+
+        rag_engine = get_async_rag_engine(os.getenv('LLM_MODEL', 'gpt-3.5-turbo'))
+        return _chat_response(await rag_engine.answer_question(body['question'], vector_store, video_id), video_id)
+
+    except Exception as e:
+        return _internal_error('chat_async', e)
+
+
+@tracing.traced_request('chat_batch')
+def chat_batch(event, context):
+    """
+    Endpoint: POST /chat/batch
+    Answer many questions about one video in a single call
+
+    Input: {"video_id": "...", "questions": ["...", "..."]}
+    Output: {"success": true, "video_id": "...", "results": [...], "answered": 2, "failed": 0}
+    Results are in question order; a failed question carries its own error
+    """
+    from utils.rag_engine import get_rag_engine
+    from utils.store_cache import get_store_cache
+
+    try:
+        body = json.loads(event.get('body', '{}'))
+        error = _chat_batch_request_error(body)
+        if error:
+            return error
+
+        video_id = body['video_id']
+        questions = body['questions']
+        print(f"Processing {len(questions)} questions for video {video_id}")
+
+        # One store load for the whole batch
+        bucket_name = os.getenv('S3_BUCKET_NAME')
+        vector_store = get_store_cache().get(bucket_name, video_id)
+
+        if not vector_store:
+            return _video_not_found()
+
+        llm_model = os.getenv('LLM_MODEL', 'gpt-3.5-turbo')
+        rag_engine = get_rag_engine(llm_model)
+
+        return _chat_batch_response(questions, rag_engine.answer_questions(questions, vector_store, video_id), video_id)
+
+    except Exception as e:
+        return _internal_error('chat_batch', e)
+
+
+@tracing.traced_request('chat_batch')
+async def chat_batch_async(event, context):
+    """
+    Async form of chat_batch() for the ASGI server
+    """
+    from utils.rag_engine import get_async_rag_engine
+    from utils.store_cache import get_store_cache
+
+    try:
+        body = json.loads(event.get('body', '{}'))
+        error = _chat_batch_request_error(body)
+        if error:
+            return error
+
+        video_id = body['video_id']
+        questions = body['questions']
+        vector_store = await get_store_cache().aget(os.getenv('S3_BUCKET_NAME'), video_id)
+        if not vector_store:
+            return _video_not_found()
+
+        rag_engine = get_async_rag_engine(os.getenv('LLM_MODEL', 'gpt-3.5-turbo'))
+        answer_results = await rag_engine.answer_questions(questions, vector_store, video_id)
+        return _chat_batch_response(questions, answer_results, video_id)
+
+    except Exception as e:
+        return _internal_error('chat_batch_async', e)
+
+
+@tracing.traced_request('chat_catalog')
+def chat_catalog(event, context):
+    """
+    Endpoint: POST /chat/catalog
+    Answer questions across several videos (a course, a channel)
+
+    Input: {"question": "...", "video_ids": ["id1", "id2"]}
+       or: {"question": "...", "collection": "course-101", "video_ids": [optional filter]}
+    Output: {"success": true, "answer": "...", "context_used": 3, "context_tokens": 1204, "sources": [...], "prompt_tokens": 1642}
+    """
+    from utils.rag_engine import get_rag_engine
+    from utils.store_cache import get_store_cache
+    from utils.catalog_index import VideoSetSearcher, get_catalog
+
+    try:
+        body = json.loads(event.get('body', '{}'))
+        question = body.get('question')
+        collection = body.get('collection')
+        video_ids = body.get('video_ids') or []
+
+        if not question or not (collection or video_ids):
             return {
-                'statusCode': 500,
+                'statusCode': 400,
                 'headers': get_cors_headers(),
-                'body': json.dumps({'error': answer_result['error']})
+                'body': json.dumps({'error': 'question and either collection or video_ids are required'})
             }
 
+        bucket_name = os.getenv('S3_BUCKET_NAME')
+
+        if collection:
+            # Prebuilt sharded catalog; video_ids (if any) act as a filter
+            catalog = get_catalog(bucket_name, collection)
+            if not catalog:
+                return {
+                    'statusCode': 404,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({'error': f'Collection not found: {collection}'})
+                }
+            missing = sorted(set(video_ids) - set(catalog.video_ids))
+            if missing:
+                # A filter outside the collection would search no shard
+                return {
+                    'statusCode': 404,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({'error': f'Videos not in collection {collection}: {", ".join(missing)}'})
+                }
+            searcher = catalog.filtered(video_ids) if video_ids else catalog
+            scope = collection
+        else:
+            # Ad-hoc list: one shard per video, served from the store cache
+            max_videos = int(os.getenv('CATALOG_MAX_ADHOC_VIDEOS', 20))
+            if len(video_ids) > max_videos:
+                return {
+                    'statusCode': 400,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({'error': f'At most {max_videos} video_ids per request; build a collection instead'})
+                }
+
+            store_cache = get_store_cache()
+            stores = {video_id: store_cache.get(bucket_name, video_id) for video_id in video_ids}
+            missing = [video_id for video_id, store in stores.items() if not store]
+            if missing:
+                return {
+                    'statusCode': 404,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({'error': f'Videos not found: {", ".join(missing)}'})
+                }
+            try:
+                searcher = VideoSetSearcher(stores)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': get_cors_headers(),
+                    'body': json.dumps({'error': str(e)})
+                }
+            scope = ','.join(sorted(video_ids))
+
+        llm_model = os.getenv('LLM_MODEL', 'gpt-3.5-turbo')
+        rag_engine = get_rag_engine(llm_model)
+
+        return _chat_response(rag_engine.answer_question(question, searcher, scope))
+
+    except Exception as e:
+        return _internal_error('chat_catalog', e)
+
+
+def format_sse(event):
+    """Serialize a RAGEngine stream event as a server-sent event frame"""
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def iter_chat_stream(body, request_id=None):
+    """
+    Yield SSE frames answering a chat request body
+    Shared by the Lambda handler and the local Flask server
+    """
+    with tracing.request('chat_stream', request_id=request_id):
+        yield from _chat_stream_frames(body)
+
+
+def _chat_stream_frames(body):
+    """SSE frames for one chat request (see iter_chat_stream)"""
+    from utils.rag_engine import get_rag_engine
+    from utils.store_cache import get_store_cache
+
+    video_id = body.get('video_id')
+    question = body.get('question')
+
+    if not video_id or not question:
+        yield format_sse({'event': 'error', 'data': {'error': 'video_id and question are required'}})
+        return
+
+    bucket_name = os.getenv('S3_BUCKET_NAME')
+    vector_store = get_store_cache().get(bucket_name, video_id)
+
+    if not vector_store:
+        yield format_sse({'event': 'error', 'data': {'error': 'Video not found. Please ingest the video first.'}})
+        return
+
+    llm_model = os.getenv('LLM_MODEL', 'gpt-3.5-turbo')
+    rag_engine = get_rag_engine(llm_model)
+
+    for event in rag_engine.stream_answer(question, vector_store, video_id):
+        yield format_sse(event)
+
+
+async def iter_chat_stream_async(body, request_id=None):
+    """
+    Async form of iter_chat_stream() for the ASGI server
+    """
+    from utils.rag_engine import get_async_rag_engine
+    from utils.store_cache import get_store_cache
+
+    with tracing.request('chat_stream', request_id=request_id):
+        video_id = body.get('video_id')
+        question = body.get('question')
+
+        if not video_id or not question:
+            yield format_sse({'event': 'error', 'data': {'error': 'video_id and question are required'}})
+            return
+
+        vector_store = await get_store_cache().aget(os.getenv('S3_BUCKET_NAME'), video_id)
+        if not vector_store:
+            yield format_sse({'event': 'error', 'data': {'error': 'Video not found. Please ingest the video first.'}})
+            return
+
+        rag_engine = get_async_rag_engine(os.getenv('LLM_MODEL', 'gpt-3.5-turbo'))
+        async for event in rag_engine.stream_answer(question, vector_store, video_id):
+            yield format_sse(event)
+
+
+def chat_stream(event, context):
+    """
+    Endpoint: POST /chat/stream
+    Same as /chat but answers as server-sent events:
+    metadata (chunks used, scores) first, then token events, then done
+
+    The Python managed runtime has no native response streaming, so this
+    handler returns the SSE frames in one body; behind a streaming front
+    (Lambda Web Adapter or local_server.py) the same generator is flushed
+    frame by frame.
+    """
+    try:
+        body = json.loads(event.get('body', '{}'))
+        headers = get_cors_headers()
+        headers.update({
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache'
+        })
+
         return {
             'statusCode': 200,
-            'headers': get_cors_headers(),
-            'body': json.dumps({
-                'success': True,
-                'answer': answer_result['answer'],
-                'context_used': answer_result['context_used'],
-                'video_id': video_id
-            })
+            'headers': headers,
+            'body': ''.join(iter_chat_stream(body, getattr(context, 'aws_request_id', None)))
         }
 
     except Exception as e:
-        print(f"Error in chat: {str(e)}")
+        print(f"Error in chat_stream: {str(e)}")
         return {
             'statusCode': 500,
             'headers': get_cors_headers(),
@@ -194,8 +662,16 @@ def handler(event, context):
     # Route based on path
     path = event.get('path', '')
 
-    if '/ingest' in path:
+    if '/ingest/status' in path:
+        return ingest_status(event, context)
+    elif '/ingest' in path:
         return ingest_video(event, context)
+    elif '/chat/batch' in path:
+        return chat_batch(event, context)
+    elif '/chat/catalog' in path:
+        return chat_catalog(event, context)
+    elif '/chat/stream' in path:
+        return chat_stream(event, context)
     elif '/chat' in path:
         return chat(event, context)
     else:
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Local async server - serves the Lambda handlers as an ASGI app
+Same routes as local_server.py, but /chat, /chat/batch and /chat/stream
+use the async handlers (AsyncOpenAI, store loads and FAISS search on the
+blocking pool), so one process keeps hundreds of chats in flight.
+Ingest, status and catalog requests run the sync handlers on the blocking pool.
+
+Run: python asgi_server.py [--port 5000]   (or: uvicorn asgi_server:app)
+"""
+import os
+import sys
+import json
+import inspect
+import argparse
+from urllib.parse import parse_qsl
+from dotenv import load_dotenv
+
+# Load environment variables from parent directory
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(parent_dir, '.env'))
+
+# Add parent directory to path
+sys.path.insert(0, parent_dir)
+
+from lambda_function import (
+    ingest_video, ingest_status, chat_catalog, chat_async, chat_batch_async,
+    iter_chat_stream_async, get_cors_headers
+)
+from utils import tracing
+from utils.aio import run_blocking
+
+# path -> (methods, handler); async handlers are awaited, sync ones run on the blocking pool
+ROUTES = {
+    '/ingest': (('POST',), ingest_video),
+    '/ingest/status': (('GET', 'POST'), ingest_status),
+    '/chat': (('POST',), chat_async),
+    '/chat/batch': (('POST',), chat_batch_async),
+    '/chat/catalog': (('POST',), chat_catalog),
+}
+
+
+def lambda_event_from_scope(scope, body):
+    """Convert an ASGI request to Lambda event format"""
+    return {
+        'httpMethod': scope['method'],
+        'path': scope['path'],
+        'body': body.decode('utf-8'),
+        'headers': {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']},
+        'queryStringParameters': dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    }
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def start_response(send, status, headers):
+    """Send the status line with CORS headers plus headers"""
+    headers = dict(get_cors_headers(), **headers)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+    })
+
+
+async def send_response(send, status, body, headers=None):
+    body = body.encode('utf-8')
+    headers = dict({'Content-Type': 'application/json'}, **(headers or {}))
+    headers['Content-Length'] = str(len(body))
+    await start_response(send, status, headers)
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_json(send, status, payload):
+    await send_response(send, status, json.dumps(payload))
+
+
+async def stream_chat(send, body):
+    try:
+        request = json.loads(body or b'{}')
+    except ValueError:
+        request = {}
+
+    await start_response(send, 200, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+    frames = iter_chat_stream_async(request)
+    try:
+        async for frame in frames:
+            await send({'type': 'http.response.body', 'body': frame.encode('utf-8'), 'more_body': True})
+    finally:
+        await frames.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    method, path = scope['method'], scope['path'].rstrip('/') or '/'
+    if method == 'OPTIONS':
+        return await send_response(send, 200, '')
+
+    body = await read_body(receive)
+
+    if path == '/chat/stream' and method == 'POST':
+        return await stream_chat(send, body)
+
+    if path == '/metrics' and method == 'GET':
+        # Per-stage p50/p95/p99 (run with TRACING_ENABLED=true TRACING_EXPORTERS=local)
+        return await send_json(send, 200, {'enabled': tracing.enabled(), 'metrics': tracing.summary()})
+
+    route = ROUTES.get(path)
+    if not route:
+        return await send_json(send, 404, {'error': 'Endpoint not found'})
+    methods, handler = route
+    if method not in methods:
+        return await send_json(send, 405, {'error': 'Method not allowed'})
+
+    event = lambda_event_from_scope(scope, body)
+    if inspect.iscoroutinefunction(handler):
+        response = await handler(event, {})
+    else:
+        response = await run_blocking(handler, event, {})
+
+    await send_response(send, response.get('statusCode', 200), response.get('body', ''), response.get('headers'))
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Local async (ASGI) development server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("Local Async Development Server")
+    print("="*60)
+    print(f"Server running at: http://localhost:{args.port}")
+    print(f"Chat endpoint: http://localhost:{args.port}/chat")
+    print(f"Streaming chat endpoint: http://localhost:{args.port}/chat/stream")
+    print(f"Stage metrics: http://localhost:{args.port}/metrics")
+    print("\nPress Ctrl+C to stop")
+    print("="*60 + "\n")
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
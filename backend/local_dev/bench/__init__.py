@@ -0,0 +1 @@
+# Offline benchmark suite (fake OpenAI, fake S3, synthetic transcripts)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Diff two run_bench.py result files
+Prints every numeric metric per video duration with its relative change and
+flags regressions beyond a threshold: latency (_ms), memory (_mb) and prompt
+size (prompt_tokens) metrics regress when they grow, throughput (_per_sec)
+metrics when they shrink.
+Sub-millisecond jitter is ignored via --min-delta.
+
+Usage:
+    python3 bench/compare.py baseline.json candidate.json [--threshold 10] [--min-delta 1] [--fail-on-regression]
+"""
+import sys
+import json
+import argparse
+
+
+def flatten(value, prefix=''):
+    """
+    Nested result dict -> {'stages.embed.ms': 211.4, ...} (numbers only)
+    """
+    metrics = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            metrics.update(flatten(item, f'{prefix}.{key}' if prefix else key))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        metrics[prefix] = value
+    return metrics
+
+
+def direction(metric):
+    """
+    +1 if bigger is worse, -1 if smaller is worse, 0 if informational
+    """
+    name = metric.rsplit('.', 1)[-1]
+    if name.endswith('_per_sec'):
+        return -1
+    if name == 'ms' or name.endswith('_ms') or name.endswith('_mb') or name == 'prompt_tokens':
+        return 1
+    return 0
+
+
+def load_results(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {result['minutes']: flatten(result) for result in report['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='regression threshold in percent')
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help='ignore latency/memory changes smaller than this many ms or MB')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on any regression')
+    parser.add_argument('--all', action='store_true', help='also list metrics within the threshold')
+    args = parser.parse_args()
+
+    base_report, base = load_results(args.baseline)
+    new_report, new = load_results(args.candidate)
+    print(f"baseline {base_report.get('revision')} ({base_report.get('timestamp')}) -> "
+          f"candidate {new_report.get('revision')} ({new_report.get('timestamp')})")
+
+    regressions = []
+    for minutes in sorted(set(base) & set(new)):
+        print(f"\n{minutes:g} minute video")
+        print(f"  {'metric':<40} {'baseline':>12} {'candidate':>12} {'change':>9}")
+
+        for metric in sorted(set(base[minutes]) & set(new[minutes])):
+            old_value, new_value = base[minutes][metric], new[minutes][metric]
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            sign = direction(metric)
+            if sign > 0 and abs(new_value - old_value) < args.min_delta:
+                sign = 0
+            regressed = sign and change * sign > args.threshold
+            improved = sign and change * sign < -args.threshold
+
+            if regressed:
+                regressions.append((minutes, metric, change))
+            if regressed or improved or args.all:
+                marker = ' REGRESSION' if regressed else (' improved' if improved else '')
+                print(f"  {metric:<40} {old_value:>12,.2f} {new_value:>12,.2f} {change:>+8.1f}%{marker}")
+
+    missing = sorted(set(base) ^ set(new))
+    if missing:
+        print(f"\nDurations present in only one file: {', '.join(f'{m:g}' for m in missing)}")
+
+    print(f"\n{len(regressions)} regression(s) beyond {args.threshold:g}%")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI API server for offline benchmarks
+Serves /v1/embeddings and /v1/chat/completions (plain and stream=True)
+with configurable latency and a request rate limit that answers 429.
+
+Point the OpenAI SDK at it with OPENAI_BASE_URL=http://127.0.0.1:PORT/v1
+
+Embeddings are deterministic per text (seeded by its hash) so repeated runs
+produce identical indexes; their values carry no meaning.
+"""
+import json
+import time
+import uuid
+import base64
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+DEFAULT_DIMENSIONS = {
+    'text-embedding-3-small': 1536,
+    'text-embedding-3-large': 3072,
+    'text-embedding-ada-002': 1536
+}
+ANSWER_WORDS = (
+    "Based on the transcript the speaker explains that the model learns from data "
+    "by following the gradient and that understanding the basics matters before "
+    "moving on to advanced topics such as attention and retrieval"
+).split()
+
+
+class RateLimiter:
+    """
+    Token bucket over requests; rps <= 0 disables limiting
+    """
+
+    def __init__(self, rps, burst=None):
+        self.rps = rps
+        self.capacity = burst or max(rps, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one request slot; returns 0 on success or seconds to wait
+        """
+        if self.rps <= 0:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rps)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rps
+
+
+def fake_embedding(text, dimensions):
+    """
+    Unit-length float32 vector seeded by the text
+    """
+    seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype('float32')
+    return vector / np.linalg.norm(vector)
+
+
+def approx_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # avoid 40 ms delayed-ACK stalls on keep-alive
+    config = None  # set by make_server
+    limiter = None
+    stats = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _count(self, name, amount=1):
+        with self.stats['lock']:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send_json(200, {k: v for k, v in self.stats.items() if k != 'lock'})
+        else:
+            self._send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        wait = self.limiter.acquire()
+        if wait:
+            self._count('rate_limited')
+            self._send_json(429, {'error': {
+                'message': 'Rate limit reached for requests',
+                'type': 'requests',
+                'code': 'rate_limit_exceeded'
+            }}, headers={'retry-after-ms': str(int(wait * 1000) + 1)})
+            return
+
+        if self.path.endswith('/embeddings'):
+            self._embeddings(request)
+        elif self.path.endswith('/chat/completions'):
+            self._chat(request)
+        else:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+
+    def _embeddings(self, request):
+        texts = request.get('input', [])
+        if isinstance(texts, str):
+            texts = [texts]
+        model = request.get('model', 'text-embedding-3-small')
+        dimensions = request.get('dimensions') or DEFAULT_DIMENSIONS.get(model, 1536)
+        tokens = sum(approx_tokens(text) for text in texts)
+
+        time.sleep((self.config['embed_latency_ms'] + self.config['embed_ms_per_1k_tokens'] * tokens / 1000) / 1000)
+
+        data = []
+        for i, text in enumerate(texts):
+            vector = fake_embedding(text, dimensions)
+            if request.get('encoding_format') == 'base64':
+                embedding = base64.b64encode(vector.tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({'object': 'embedding', 'index': i, 'embedding': embedding})
+
+        self._count('embedding_requests')
+        self._count('embedding_inputs', len(texts))
+        self._count('embedding_tokens', tokens)
+        self._send_json(200, {
+            'object': 'list',
+            'data': data,
+            'model': model,
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        })
+
+    def _chat(self, request):
+        model = request.get('model', 'gpt-3.5-turbo')
+        prompt_tokens = sum(approx_tokens(message.get('content') or '') for message in request.get('messages', []))
+        words = ANSWER_WORDS[:min(len(ANSWER_WORDS), request.get('max_tokens') or len(ANSWER_WORDS))]
+        completion_id = f'chatcmpl-{uuid.uuid4().hex}'
+        created = int(time.time())
+        token_delay = 1.0 / self.config['chat_tokens_per_second']
+
+        self._count('chat_requests')
+        self._count('chat_prompt_tokens', prompt_tokens)
+        time.sleep(self.config['chat_ttft_ms'] / 1000)
+
+        if not request.get('stream'):
+            time.sleep(token_delay * len(words))
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': created,
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': ' '.join(words)},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': len(words),
+                    'total_tokens': prompt_tokens + len(words)
+                }
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+
+        event({'role': 'assistant', 'content': ''})
+        for i, word in enumerate(words):
+            event({'content': word if i == 0 else ' ' + word})
+            time.sleep(token_delay)
+        event({}, finish_reason='stop')
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    # Load tests open hundreds of connections at once; the default backlog is 5
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def make_server(port=0, embed_latency_ms=50, embed_ms_per_1k_tokens=5, chat_ttft_ms=300,
+                chat_tokens_per_second=60, rate_limit_rps=0):
+    """
+    Build (not start) a FakeOpenAIServer; port 0 picks a free port
+    """
+    handler = type('ConfiguredFakeOpenAIHandler', (FakeOpenAIHandler,), {
+        'config': {
+            'embed_latency_ms': embed_latency_ms,
+            'embed_ms_per_1k_tokens': embed_ms_per_1k_tokens,
+            'chat_ttft_ms': chat_ttft_ms,
+            'chat_tokens_per_second': chat_tokens_per_second
+        },
+        'limiter': RateLimiter(rate_limit_rps),
+        'stats': {'lock': threading.Lock()}
+    })
+    return FakeOpenAIServer(('127.0.0.1', port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--embed-latency-ms', type=float, default=50)
+    parser.add_argument('--embed-ms-per-1k-tokens', type=float, default=5)
+    parser.add_argument('--chat-ttft-ms', type=float, default=300)
+    parser.add_argument('--chat-tokens-per-second', type=float, default=60)
+    parser.add_argument('--rate-limit-rps', type=float, default=0, help='0 disables 429 responses')
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.embed_latency_ms, args.embed_ms_per_1k_tokens,
+                         args.chat_ttft_ms, args.chat_tokens_per_second, args.rate_limit_rps)
+    # First line is machine-readable so a parent process can pick up the port
+    print(f"READY {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
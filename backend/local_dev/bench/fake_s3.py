@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Minimal in-memory S3 stand-in for offline benchmarks
+Path-style REST subset used by the backend: buckets, Get/Put/Head/Delete
+object (with Range, If-None-Match and If-Match), CopyObject, DeleteObjects,
+ListObjectsV2 and multipart uploads (including UploadPartCopy).
+
+Point boto3 at it with AWS_ENDPOINT_URL_S3=http://127.0.0.1:PORT
+(any access key works; signatures are not checked).
+"""
+import re
+import time
+import uuid
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate
+from urllib.parse import urlsplit, parse_qs, unquote
+from xml.sax.saxutils import escape, unescape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+XML_NS = 'http://s3.amazonaws.com/doc/2006-03-01/'
+
+
+class S3Data:
+    """
+    Buckets, objects and in-progress multipart uploads
+    """
+
+    def __init__(self):
+        self.buckets = {}  # name -> {key: object dict}
+        self.uploads = {}  # upload id -> {'bucket', 'key', 'parts': {number: bytes}}
+        self.lock = threading.Lock()
+
+
+def _error_xml(code, message):
+    return (f'<?xml version="1.0" encoding="UTF-8"?>'
+            f'<Error><Code>{code}</Code><Message>{escape(message)}</Message></Error>').encode('utf-8')
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # avoid 40 ms delayed-ACK stalls on keep-alive
+    data = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    # Request helpers
+
+    def _parse(self):
+        parts = urlsplit(self.path)
+        bucket, _, key = parts.path.lstrip('/').partition('/')
+        return unquote(bucket), unquote(key), {k: v[0] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+
+    def _read_http_chunked(self):
+        body = bytearray()
+        while True:
+            size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+            if size == 0:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return bytes(body)
+            body += self.rfile.read(size)
+            self.rfile.readline()
+
+    @staticmethod
+    def _decode_aws_chunked(raw):
+        """
+        Strip aws-chunked framing (used by boto3 for streaming checksums)
+        """
+        body = bytearray()
+        position = 0
+        while True:
+            line_end = raw.index(b'\r\n', position)
+            size = int(raw[position:line_end].split(b';')[0], 16)
+            position = line_end + 2
+            if size == 0:
+                return bytes(body)
+            body += raw[position:position + size]
+            position += size + 2
+
+    def _read_body(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            body = self._read_http_chunked()
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if ('aws-chunked' in self.headers.get('Content-Encoding', '')
+                or self.headers.get('x-amz-content-sha256', '').startswith('STREAMING-')):
+            body = self._decode_aws_chunked(body)
+        return body
+
+    def _send(self, status, body=b'', headers=None, content_type='application/xml'):
+        self.send_response(status)
+        if body or status not in (204, 304):
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, code, message):
+        if self.command == 'HEAD':
+            self._send(status)
+        else:
+            self._send(status, _error_xml(code, message))
+
+    def _get_object(self, bucket, key):
+        objects = self.data.buckets.get(bucket)
+        if objects is None:
+            self._error(404, 'NoSuchBucket', f'Bucket {bucket} does not exist')
+            return None
+        obj = objects.get(key)
+        if obj is None:
+            self._error(404, 'NoSuchKey', f'Key {key} does not exist')
+        return obj
+
+    @staticmethod
+    def _object_headers(obj):
+        return {
+            'ETag': obj['etag'],
+            'Last-Modified': formatdate(obj['modified'], usegmt=True),
+            'Accept-Ranges': 'bytes'
+        }
+
+    # Verbs
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        bucket, key, query = self._parse()
+
+        if not key:
+            if query.get('list-type') == '2' or 'prefix' in query:
+                self._list_objects(bucket, query)
+            elif bucket in self.data.buckets:
+                self._send(200)
+            else:
+                self._error(404, 'NoSuchBucket', f'Bucket {bucket} does not exist')
+            return
+
+        obj = self._get_object(bucket, key)
+        if obj is None:
+            return
+
+        headers = self._object_headers(obj)
+        body = obj['body']
+        byte_range = self.headers.get('Range')
+        if byte_range and byte_range.startswith('bytes='):
+            start, _, end = byte_range[len('bytes='):].partition('-')
+            if start:
+                start, end = int(start), min(int(end) if end else len(body) - 1, len(body) - 1)
+            else:
+                start, end = max(0, len(body) - int(end)), len(body) - 1
+            if start >= len(body):
+                self._error(416, 'InvalidRange', 'The requested range is not satisfiable')
+                return
+            headers['Content-Range'] = f'bytes {start}-{end}/{len(body)}'
+            self._send(206, body[start:end + 1], headers, obj['content_type'])
+        else:
+            self._send(200, body, headers, obj['content_type'])
+
+    def _copy_source(self):
+        """
+        Body of the object named by x-amz-copy-source (and its range), or None
+        after sending the error
+        """
+        source = unquote(self.headers['x-amz-copy-source'].split('?')[0]).lstrip('/')
+        source_bucket, _, source_key = source.partition('/')
+        obj = self._get_object(source_bucket, source_key)
+        if obj is None:
+            return None
+        byte_range = self.headers.get('x-amz-copy-source-range')
+        if byte_range:
+            start, _, end = byte_range[len('bytes='):].partition('-')
+            return obj['body'][int(start):int(end) + 1]
+        return obj['body']
+
+    def do_PUT(self):
+        bucket, key, query = self._parse()
+        body = self._read_body()
+        copy = 'x-amz-copy-source' in self.headers
+        if copy:
+            body = self._copy_source()
+            if body is None:
+                return
+
+        if not key:
+            with self.data.lock:
+                self.data.buckets.setdefault(bucket, {})
+            self._send(200, headers={'Location': f'/{bucket}'})
+            return
+
+        if 'uploadId' in query:
+            upload = self.data.uploads.get(query['uploadId'])
+            if upload is None:
+                self._error(404, 'NoSuchUpload', 'Upload does not exist')
+                return
+            upload['parts'][int(query['partNumber'])] = body
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if copy:
+                self._send(200, (
+                    f'<?xml version="1.0" encoding="UTF-8"?><CopyPartResult xmlns="{XML_NS}">'
+                    f'<ETag>{escape(etag)}</ETag></CopyPartResult>'
+                ).encode('utf-8'))
+            else:
+                self._send(200, headers={'ETag': etag})
+            return
+
+        with self.data.lock:
+            objects = self.data.buckets.get(bucket)
+            if objects is None:
+                self._error(404, 'NoSuchBucket', f'Bucket {bucket} does not exist')
+                return
+            if self.headers.get('If-None-Match') == '*' and key in objects:
+                self._error(412, 'PreconditionFailed', 'At least one of the pre-conditions you specified did not hold')
+                return
+            if_match = self.headers.get('If-Match')
+            if if_match and (key not in objects or objects[key]['etag'] != if_match):
+                self._error(412, 'PreconditionFailed', 'At least one of the pre-conditions you specified did not hold')
+                return
+            obj = self._store(objects, key, body, f'"{hashlib.md5(body).hexdigest()}"')
+        if copy:
+            self._send(200, (
+                f'<?xml version="1.0" encoding="UTF-8"?><CopyObjectResult xmlns="{XML_NS}">'
+                f'<ETag>{escape(obj["etag"])}</ETag>'
+                f'<LastModified>{time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(obj["modified"]))}</LastModified>'
+                f'</CopyObjectResult>'
+            ).encode('utf-8'))
+        else:
+            self._send(200, headers={'ETag': obj['etag']})
+
+    def _store(self, objects, key, body, etag):
+        obj = {
+            'body': body,
+            'etag': etag,
+            'modified': time.time(),
+            'content_type': self.headers.get('Content-Type') or 'binary/octet-stream'
+        }
+        objects[key] = obj
+        return obj
+
+    def do_POST(self):
+        bucket, key, query = self._parse()
+        body = self._read_body()
+
+        if 'uploads' in query:
+            upload_id = uuid.uuid4().hex
+            self.data.uploads[upload_id] = {'bucket': bucket, 'key': key, 'parts': {}}
+            self._send(200, (
+                f'<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult xmlns="{XML_NS}">'
+                f'<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><UploadId>{upload_id}</UploadId>'
+                f'</InitiateMultipartUploadResult>'
+            ).encode('utf-8'))
+            return
+
+        if 'uploadId' in query:
+            upload = self.data.uploads.pop(query['uploadId'], None)
+            if upload is None:
+                self._error(404, 'NoSuchUpload', 'Upload does not exist')
+                return
+            parts = [upload['parts'][number] for number in sorted(upload['parts'])]
+            digest = hashlib.md5(b''.join(hashlib.md5(part).digest() for part in parts)).hexdigest()
+            with self.data.lock:
+                objects = self.data.buckets.setdefault(bucket, {})
+                obj = self._store(objects, key, b''.join(parts), f'"{digest}-{len(parts)}"')
+            self._send(200, (
+                f'<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult xmlns="{XML_NS}">'
+                f'<Bucket>{escape(bucket)}</Bucket><Key>{escape(key)}</Key><ETag>{escape(obj["etag"])}</ETag>'
+                f'</CompleteMultipartUploadResult>'
+            ).encode('utf-8'))
+            return
+
+        if 'delete' in query:
+            keys = [unescape(key) for key in re.findall(r'<Key>(.*?)</Key>', body.decode('utf-8'))]
+            with self.data.lock:
+                objects = self.data.buckets.get(bucket, {})
+                for key in keys:
+                    objects.pop(key, None)
+            self._send(200, (
+                f'<?xml version="1.0" encoding="UTF-8"?><DeleteResult xmlns="{XML_NS}"></DeleteResult>'
+            ).encode('utf-8'))
+            return
+
+        self._error(400, 'NotImplemented', 'Unsupported POST request')
+
+    def do_DELETE(self):
+        bucket, key, query = self._parse()
+        if 'uploadId' in query:
+            self.data.uploads.pop(query['uploadId'], None)
+        else:
+            with self.data.lock:
+                self.data.buckets.get(bucket, {}).pop(key, None)
+        self._send(204)
+
+    def _list_objects(self, bucket, query):
+        objects = self.data.buckets.get(bucket)
+        if objects is None:
+            self._error(404, 'NoSuchBucket', f'Bucket {bucket} does not exist')
+            return
+
+        prefix = query.get('prefix', '')
+        start_after = query.get('continuation-token') or query.get('start-after', '')
+        max_keys = int(query.get('max-keys', 1000))
+        with self.data.lock:
+            keys = sorted(key for key in objects if key.startswith(prefix) and key > start_after)
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+
+        contents = ''.join(
+            f'<Contents><Key>{escape(key)}</Key><Size>{len(objects[key]["body"])}</Size>'
+            f'<ETag>{escape(objects[key]["etag"])}</ETag>'
+            f'<LastModified>{time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(objects[key]["modified"]))}</LastModified>'
+            f'<StorageClass>STANDARD</StorageClass></Contents>'
+            for key in page
+        )
+        token = f'<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>' if truncated else ''
+        self._send(200, (
+            f'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult xmlns="{XML_NS}">'
+            f'<Name>{escape(bucket)}</Name><Prefix>{escape(prefix)}</Prefix><KeyCount>{len(page)}</KeyCount>'
+            f'<MaxKeys>{max_keys}</MaxKeys><IsTruncated>{"true" if truncated else "false"}</IsTruncated>'
+            f'{contents}{token}</ListBucketResult>'
+        ).encode('utf-8'))
+
+
+def make_server(port=0, buckets=()):
+    """
+    Build (not start) a ThreadingHTTPServer with the given buckets created
+    """
+    data = S3Data()
+    for bucket in buckets:
+        data.buckets[bucket] = {}
+    handler = type('ConfiguredFakeS3Handler', (FakeS3Handler,), {'data': data})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--bucket', action='append', default=[], help='bucket to create at startup (repeatable)')
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.bucket)
+    # First line is machine-readable so a parent process can pick up the port
+    print(f"READY {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
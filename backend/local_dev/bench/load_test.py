@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Concurrent chat load test
+Ingests one synthetic video against the stand-ins (fake OpenAI, fake S3),
+starts a server in a child process and keeps --concurrency chats in flight
+until --requests have completed. Every question is unique, so each chat
+embeds its question and calls the chat model (no answer cache hits).
+
+Servers (--server, repeatable):
+- asgi: local_dev/asgi_server.py under uvicorn (async handlers, one event loop)
+- flask: local_dev/local_server.py's app on werkzeug's threaded server
+
+Reports per server: throughput, mean chats in flight (throughput x mean
+latency), latency p50/p95/max, server CPU time per chat, server peak RSS,
+embedding requests per chat and errors. --coalesce-window-ms runs the
+servers with request coalescing (CHAT_COALESCE_WINDOW_MS), which groups
+the questions of concurrent chats into shared embedding requests. The stand-ins and the client share the machine, so on few
+cores throughput is bounded by CPU per chat rather than by concurrency.
+
+Usage:
+    python3 bench/load_test.py --concurrency 200 --requests 1000 --server asgi flask
+    python3 bench/load_test.py --server asgi --coalesce-window-ms 0 10
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from types import SimpleNamespace
+from contextlib import redirect_stdout
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+local_dev_dir = os.path.dirname(bench_dir)
+backend_dir = os.path.dirname(local_dev_dir)
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, local_dev_dir)
+
+from bench.run_bench import (
+    start_stand_in, configure_environment, fetch_stand_in, bench_video_id, latency_summary
+)
+from bench.synthetic import synthetic_segments, synthetic_questions
+
+SERVER_COMMANDS = {
+    'asgi': lambda port: [sys.executable, os.path.join(local_dev_dir, 'asgi_server.py'), '--port', str(port)],
+    'flask': lambda port: [sys.executable, '-c', (
+        'import sys, logging; sys.path.insert(0, sys.argv[1]); '
+        'logging.getLogger("werkzeug").setLevel(logging.ERROR); '
+        'from local_server import app; app.run(port=int(sys.argv[2]), threaded=True)'
+    ), local_dev_dir, str(port)]
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name, env=None, timeout=30):
+    """
+    Launch a server as a child process and wait until it accepts connections
+    """
+    port = free_port()
+    process = subprocess.Popen(SERVER_COMMANDS[name](port), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env=dict(os.environ, **(env or {})))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{name} server failed to start")
+
+
+def embedding_requests(openai_url):
+    with urllib.request.urlopen(f'{openai_url}/stats') as response:
+        return json.loads(response.read()).get('embedding_requests', 0)
+
+
+def ingest(video_id, minutes):
+    """
+    Ingest one synthetic video in-process (index lands in the fake S3)
+    """
+    import lambda_function
+    from utils import transcript_extractor
+
+    transcript_extractor.get_transcript = fetch_stand_in({video_id: synthetic_segments(minutes)})
+    with redirect_stdout(sys.stderr):
+        response = lambda_function.ingest_video(
+            {'body': json.dumps({'url': f'https://www.youtube.com/watch?v={video_id}', 'wait': True, 'force': True})},
+            None
+        )
+    if response['statusCode'] != 200:
+        raise RuntimeError(f"ingest failed: {response['body']}")
+
+
+async def post(port, path, payload):
+    """
+    One HTTP/1.1 POST on its own connection; returns (status, body)
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(
+            f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1]) if head else 0
+    return status, content
+
+
+async def run_load(port, video_id, questions, concurrency):
+    """
+    Keep concurrency requests in flight until every question is asked
+    Returns (latencies ms, errors, wall seconds)
+    """
+    queue = list(reversed(questions))
+    latencies, errors = [], []
+
+    async def worker():
+        while queue:
+            question = queue.pop()
+            start = time.perf_counter()
+            try:
+                status, content = await post(port, '/chat', {'video_id': video_id, 'question': question})
+                if status != 200:
+                    errors.append(f'{status}: {content[:200].decode("utf-8", "replace")}')
+                    continue
+            except OSError as e:
+                errors.append(str(e))
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', nargs='+', default=['asgi'], choices=sorted(SERVER_COMMANDS))
+    parser.add_argument('--concurrency', type=int, default=200, help='chats in flight at once')
+    parser.add_argument('--requests', type=int, default=1000, help='chats per server')
+    parser.add_argument('--minutes', type=float, default=10, help='length of the synthetic video')
+    parser.add_argument('--chat-ttft-ms', type=float, default=300)
+    parser.add_argument('--chat-tokens-per-second', type=float, default=60)
+    parser.add_argument('--embed-latency-ms', type=float, default=50)
+    parser.add_argument('--coalesce-window-ms', type=float, nargs='+', default=[0],
+                        help='CHAT_COALESCE_WINDOW_MS values to run each server with (0 = off)')
+    parser.add_argument('--coalesce-max-batch', type=int, default=32)
+    args = parser.parse_args()
+
+    openai_process, openai_url = start_stand_in(
+        'fake_openai.py',
+        '--embed-latency-ms', str(args.embed_latency_ms),
+        '--chat-ttft-ms', str(args.chat_ttft_ms),
+        '--chat-tokens-per-second', str(args.chat_tokens_per_second)
+    )
+    s3_process, s3_url = start_stand_in('fake_s3.py', '--bucket', 'bench-bucket')
+    try:
+        configure_environment(openai_url, s3_url, SimpleNamespace(
+            embedding_cache=False, trace=False, embedding_model='text-embedding-3-small'
+        ))
+        video_id = bench_video_id(args.minutes)
+        ingest(video_id, args.minutes)
+
+        print(f"{args.requests} chats, {args.concurrency} in flight, "
+              f"stand-in ttft {args.chat_ttft_ms:g} ms at {args.chat_tokens_per_second:g} tokens/s")
+        print(f"{'server':>7} {'window':>7} {'chats/s':>8} {'in flight':>10} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'max ms':>8} {'cpu ms/chat':>12} {'rss MB':>8} {'embeds/chat':>12} {'errors':>7}")
+        runs = [(name, window) for name in args.server for window in args.coalesce_window_ms]
+        for round_number, (name, window) in enumerate(runs):
+            # Unique questions: every chat embeds and generates
+            questions = [f'{question} ({round_number}-{i})'
+                         for i, question in enumerate(synthetic_questions(args.requests))]
+            process, port = start_server(name, {
+                'CHAT_COALESCE_WINDOW_MS': str(window),
+                'CHAT_COALESCE_MAX_BATCH': str(args.coalesce_max_batch)
+            })
+            embeds_before = embedding_requests(openai_url)
+            try:
+                latencies, errors, wall = asyncio.run(run_load(port, video_id, questions, args.concurrency))
+            finally:
+                process.kill()
+                # rusage of the server process: CPU time and peak RSS
+                _, _, usage = os.wait4(process.pid, 0)
+            embeds = embedding_requests(openai_url) - embeds_before
+
+            summary = latency_summary(latencies) if latencies else {'mean_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'max_ms': 0}
+            rate = len(latencies) / wall
+            cpu_ms = (usage.ru_utime + usage.ru_stime) * 1000 / max(1, len(latencies))
+            # Little's law: mean chats in flight = throughput x mean latency
+            print(f"{name:>7} {window:>5g}ms {rate:>8.1f} {rate * summary['mean_ms'] / 1000:>10.0f} "
+                  f"{summary['p50_ms']:>8.0f} {summary['p95_ms']:>8.0f} {summary['max_ms']:>8.0f} {cpu_ms:>12.1f} "
+                  f"{usage.ru_maxrss / 1024:>8.0f} {embeds / max(1, len(latencies)):>12.2f} {len(errors):>7}")
+            for error in sorted(set(errors))[:3]:
+                print(f"        {error}")
+    finally:
+        openai_process.kill()
+        s3_process.kill()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Offline ingest + chat benchmark
+Runs the backend against local stand-ins (fake OpenAI, fake S3) on synthetic
+transcripts and writes machine-readable results for diffing between commits.
+
+For each video duration it reports:
+- stages: per-stage latency and peak memory for fetch, chunk, embed, index,
+  save, load, embed_query, search and generate (the per-query stages also
+  report p50/p95)
+- ingest_video: wall time of the /ingest handler (wait mode) and its job stage timings
+- chat: latency distribution of the /chat handler, cold first request included,
+  and mean prompt tokens per answer
+- chat_batch: wall time of one /chat/batch call with the same questions
+- throughput: tokens/sec, chunks/sec, chat requests/sec
+
+Usage:
+    python3 bench/run_bench.py --minutes 10 60 600 --output results.json
+    python3 bench/compare.py baseline.json results.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+from contextlib import contextmanager, redirect_stdout
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+local_dev_dir = os.path.dirname(bench_dir)
+backend_dir = os.path.dirname(local_dev_dir)
+sys.path.insert(0, backend_dir)
+sys.path.insert(0, local_dev_dir)
+
+import numpy as np
+from bench.synthetic import synthetic_segments, synthetic_questions
+
+BENCH_BUCKET = 'bench-bucket'
+RESULTS_SCHEMA = 1
+
+
+def _status_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """
+    Reset VmHWM so the next reading is the peak of one stage (Linux only)
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class StageRecorder:
+    """
+    Times named stages and records their peak resident memory
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        resettable = _reset_peak_rss()
+        baseline_kb = _status_kb('VmRSS') or 0
+        record = {}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['ms'] = round((time.perf_counter() - start) * 1000, 2)
+            if resettable:
+                peak_kb = _status_kb('VmHWM') or baseline_kb
+            else:
+                # ru_maxrss never resets: this is the process peak so far
+                peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            record['peak_rss_mb'] = round(peak_kb / 1024, 1)
+            record['peak_delta_mb'] = round(max(0, peak_kb - baseline_kb) / 1024, 1)
+            self.stages[name] = record
+
+
+def latency_summary(samples_ms):
+    samples = np.asarray(samples_ms, dtype=float)
+    return {
+        'count': int(len(samples)),
+        'mean_ms': round(float(samples.mean()), 2),
+        'p50_ms': round(float(np.percentile(samples, 50)), 2),
+        'p95_ms': round(float(np.percentile(samples, 95)), 2),
+        'max_ms': round(float(samples.max()), 2)
+    }
+
+
+def start_stand_in(script, *args):
+    """
+    Launch a fake server as a child process; returns (process, base url)
+    Servers run out of process so their CPU and memory stay out of the results
+    """
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(bench_dir, script), *args],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    line = process.stdout.readline().split()
+    if len(line) != 2 or line[0] != 'READY':
+        process.kill()
+        raise RuntimeError(f"{script} failed to start")
+    return process, f'http://127.0.0.1:{line[1]}'
+
+
+def configure_environment(openai_url, s3_url, args):
+    """
+    Point the backend at the stand-ins; must run before utils is imported
+    because several modules read their settings at import time
+    """
+    os.environ.update({
+        'OPENAI_API_KEY': 'bench',
+        'OPENAI_BASE_URL': f'{openai_url}/v1',
+        'AWS_ENDPOINT_URL_S3': s3_url,
+        'AWS_ACCESS_KEY_ID': 'bench',
+        'AWS_SECRET_ACCESS_KEY': 'bench',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+        'AWS_REQUEST_CHECKSUM_CALCULATION': 'when_required',
+        'S3_BUCKET_NAME': BENCH_BUCKET,
+        'EMBEDDING_CACHE_ENABLED': 'true' if args.embedding_cache else 'false',
+        'TRACING_ENABLED': 'true' if args.trace else 'false',
+        'TRACING_EXPORTERS': 'local',
+        'EMBEDDING_MODEL': args.embedding_model
+    })
+    # Run ingest jobs in-process, never on a real queue
+    os.environ.pop('INGEST_QUEUE_URL', None)
+
+
+def bench_video_id(minutes):
+    """
+    11 characters, like a real YouTube id, so /ingest accepts the URL
+    """
+    return f'bench-{int(minutes):05d}'
+
+
+def fetch_stand_in(transcripts):
+    """
+    Replacement for get_transcript serving synthetic transcripts by video id
+    transcripts maps video id -> caption segments as youtube-transcript-api returns them
+    (video URLs look like https://www.youtube.com/watch?v=bench-00060)
+    """
+    from utils.segments import SegmentTable
+
+    def get_transcript(url, languages=None, use_cache=True):
+        video_id = url.rsplit('v=', 1)[-1]
+        segments = SegmentTable.from_segments(transcripts[video_id])
+        return {'success': True, 'video_id': video_id, 'segments': segments,
+                'transcript': segments.text, 'length': len(segments.text)}
+    return get_transcript
+
+
+def bench_duration(minutes, questions, transcripts, top_k):
+    """
+    Benchmark one synthetic video; returns its result dict
+    """
+    import lambda_function
+    from utils import ingest_pipeline, transcript_extractor
+    from utils.text_processor import chunk_segments, count_tokens
+    from utils.embeddings import EmbeddingGenerator
+    from utils.vector_store import VectorStore
+    from utils.rag_engine import RAGEngine, query_embedding_cache, answer_cache
+    from utils.store_cache import get_store_cache
+    from utils import tracing
+
+    video_id = bench_video_id(minutes)
+    recorder = StageRecorder()
+    get_transcript = fetch_stand_in(transcripts)
+    transcript_extractor.get_transcript = get_transcript
+    tracing.reset()
+
+    # Stage drivers: each stage in isolation, in pipeline order
+
+    with recorder.stage('fetch') as record:
+        segments = get_transcript(f'https://www.youtube.com/watch?v={video_id}')['segments']
+    transcript = segments.text
+    record.update(segments=len(segments), segments_mb=round(segments.nbytes / 1e6, 2))
+
+    with recorder.stage('chunk') as record:
+        chunks, time_ranges = chunk_segments(segments,
+                                             chunk_size=int(os.getenv('CHUNK_SIZE', 500)),
+                                             overlap=int(os.getenv('CHUNK_OVERLAP', 50)))
+    tokens = count_tokens(transcript)
+    record.update(chunks=len(chunks), tokens_per_sec=round(tokens / (record['ms'] / 1000), 1))
+
+    with recorder.stage('embed') as record:
+        embeddings_result = EmbeddingGenerator().generate_embeddings(chunks)
+    if not embeddings_result['success']:
+        raise RuntimeError(embeddings_result['error'])
+    record.update(batches=embeddings_result['batches'],
+                  chunks_per_sec=round(len(chunks) / (record['ms'] / 1000), 1))
+
+    with recorder.stage('index'):
+        store = VectorStore(dimension=embeddings_result['dimension'],
+                            embedding_backend=embeddings_result['backend'])
+        store.add_vectors(embeddings_result['embeddings'], chunks, time_ranges)
+    del embeddings_result
+
+    with recorder.stage('save'):
+        if not store.save_to_s3(BENCH_BUCKET, video_id):
+            raise RuntimeError('save_to_s3 failed')
+    del store
+
+    with recorder.stage('load'):
+        store = VectorStore.load_from_s3(BENCH_BUCKET, video_id)
+
+    engine = RAGEngine(model=os.getenv('LLM_MODEL', 'gpt-3.5-turbo'))
+    query_embeddings, samples = [], []
+    with recorder.stage('embed_query') as record:
+        for question in questions:
+            start = time.perf_counter()
+            query_embeddings.append(engine.embedding_gen.generate_single_embedding(question)['embedding'])
+            samples.append((time.perf_counter() - start) * 1000)
+    record.update(latency_summary(samples))
+
+    samples = []
+    with recorder.stage('search') as record:
+        for query in query_embeddings:
+            start = time.perf_counter()
+            hits = store.search(query, top_k=top_k)
+            samples.append((time.perf_counter() - start) * 1000)
+    record.update(latency_summary(samples))
+
+    samples, prompt_tokens = [], []
+    with recorder.stage('generate') as record:
+        for question in questions:
+            start = time.perf_counter()
+            answer = engine.generate_answer(question, hits)
+            samples.append((time.perf_counter() - start) * 1000)
+            if not answer['success']:
+                raise RuntimeError(answer['error'])
+            prompt_tokens.append(answer['prompt_tokens'])
+    record.update(latency_summary(samples), prompt_tokens=round(float(np.mean(prompt_tokens)), 1))
+    del store
+
+    # Handler drivers: the same work end to end through lambda_function
+
+    start = time.perf_counter()
+    response = lambda_function.ingest_video(
+        # force: the stage drivers above already saved an up-to-date index
+        {'body': json.dumps({'url': f'https://www.youtube.com/watch?v={video_id}', 'wait': True, 'force': True})},
+        None
+    )
+    ingest_ms = (time.perf_counter() - start) * 1000
+    body = json.loads(response['body'])
+    if response['statusCode'] != 200:
+        raise RuntimeError(f"ingest_video failed: {body.get('error')}")
+    job = ingest_pipeline.get_job_backend()[0].get_job(body['job_id'])
+
+    # Start chat cold: no warm store, no cached query embeddings or answers
+    get_store_cache().clear()
+    query_embedding_cache.clear()
+    answer_cache.clear()
+
+    samples, cached, prompt_tokens = [], 0, []
+    for question in questions:
+        start = time.perf_counter()
+        response = lambda_function.chat({'body': json.dumps({'video_id': video_id, 'question': question})}, None)
+        samples.append((time.perf_counter() - start) * 1000)
+        body = json.loads(response['body'])
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"chat failed: {body.get('error')}")
+        cached += bool(body.get('cached'))
+        if not body.get('cached'):
+            prompt_tokens.append(body['prompt_tokens'])
+
+    chat = dict(latency_summary(samples), cold_ms=round(samples[0], 2), cached_answers=cached,
+                prompt_tokens=round(float(np.mean(prompt_tokens)), 1) if prompt_tokens else 0.0)
+    if len(samples) > 1:
+        chat['warm'] = latency_summary(samples[1:])
+
+    # The same questions in one /chat/batch call, again without cached answers
+    get_store_cache().clear()
+    query_embedding_cache.clear()
+    answer_cache.clear()
+
+    start = time.perf_counter()
+    response = lambda_function.chat_batch({'body': json.dumps({'video_id': video_id, 'questions': questions})}, None)
+    batch_ms = (time.perf_counter() - start) * 1000
+    body = json.loads(response['body'])
+    if response['statusCode'] != 200 or body['failed']:
+        raise RuntimeError(f"chat_batch failed: {body.get('error') or body['results']}")
+
+    result = {
+        'minutes': minutes,
+        'video_id': video_id,
+        'transcript_chars': len(transcript),
+        'tokens': tokens,
+        'chunks': len(chunks),
+        'stages': recorder.stages,
+        'ingest_video': {
+            'ms': round(ingest_ms, 2),
+            'stages_ms': {name: info.get('duration_ms') for name, info in job['stages'].items()}
+        },
+        'chat': chat,
+        'chat_batch': {'ms': round(batch_ms, 2), 'questions': len(questions)},
+        'throughput': {
+            'ingest_tokens_per_sec': round(tokens / (ingest_ms / 1000), 1),
+            'ingest_chunks_per_sec': round(len(chunks) / (ingest_ms / 1000), 1),
+            'chat_requests_per_sec': round(len(samples) / (sum(samples) / 1000), 2),
+            'chat_batch_questions_per_sec': round(len(questions) / (batch_ms / 1000), 2)
+        }
+    }
+    if tracing.enabled():
+        # Span percentiles across the stage drivers and handler runs above
+        result['tracing'] = tracing.summary()
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=backend_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, nargs='+', default=[10, 60, 600],
+                        help='synthetic video durations (default: 10 minutes to 10 hours)')
+    parser.add_argument('--questions', type=int, default=20, help='chat questions per video')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--embedding-cache', action='store_true', help='enable the embedding cache (off by default)')
+    parser.add_argument('--embedding-model', default='text-embedding-3-small',
+                        help='EMBEDDING_MODEL for ingest and queries, e.g. local-hashing')
+    parser.add_argument('--trace', action='store_true', help='include utils.tracing span percentiles per duration')
+    parser.add_argument('--embed-latency-ms', type=float, default=50)
+    parser.add_argument('--embed-ms-per-1k-tokens', type=float, default=5)
+    parser.add_argument('--chat-ttft-ms', type=float, default=300)
+    parser.add_argument('--chat-tokens-per-second', type=float, default=60)
+    parser.add_argument('--rate-limit-rps', type=float, default=0, help='fake OpenAI request limit (0 = none)')
+    args = parser.parse_args()
+
+    openai_process, openai_url = start_stand_in(
+        'fake_openai.py',
+        '--embed-latency-ms', str(args.embed_latency_ms),
+        '--embed-ms-per-1k-tokens', str(args.embed_ms_per_1k_tokens),
+        '--chat-ttft-ms', str(args.chat_ttft_ms),
+        '--chat-tokens-per-second', str(args.chat_tokens_per_second),
+        '--rate-limit-rps', str(args.rate_limit_rps)
+    )
+    s3_process, s3_url = start_stand_in('fake_s3.py', '--bucket', BENCH_BUCKET)
+
+    try:
+        configure_environment(openai_url, s3_url, args)
+        questions = synthetic_questions(args.questions)
+        transcripts = {bench_video_id(minutes): synthetic_segments(minutes) for minutes in args.minutes}
+
+        results = []
+        # Backend progress prints go to stderr so stdout stays pure JSON
+        with redirect_stdout(sys.stderr):
+            for minutes in args.minutes:
+                print(f"Benchmarking {minutes:g} minute video...")
+                results.append(bench_duration(minutes, questions, transcripts, args.top_k))
+    finally:
+        openai_process.kill()
+        s3_process.kill()
+
+    report = {
+        'schema': RESULTS_SCHEMA,
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': results
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
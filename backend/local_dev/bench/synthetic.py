@@ -0,0 +1,74 @@
+"""
+Synthetic transcript generator
+Produces caption-like segments for videos from minutes to many hours long
+"""
+import random
+
+WORDS_PER_MINUTE = 150  # typical speaking rate
+VOCABULARY = (
+    "so today we are going to talk about how neural networks learn from data and "
+    "why the gradient matters when you train a model on a large dataset you know "
+    "it is really important to understand the basics before moving to advanced topics "
+    "like attention transformers embeddings retrieval vector search and evaluation"
+).split()
+
+
+def synthetic_segments(minutes, seed=42):
+    """
+    Caption segments as dicts with 'text', 'start', 'duration'
+    (the shape youtube-transcript-api's to_raw_data() returns)
+    Sentences of 6-24 words are split across segments of 3-8 words
+    """
+    rng = random.Random(seed)
+    total_words = int(minutes * WORDS_PER_MINUTE)
+    seconds_per_word = 60.0 / WORDS_PER_MINUTE
+
+    segments = []
+    words = []
+    sentence_left = rng.randint(6, 24)
+    clock = 0.0
+
+    for _ in range(total_words):
+        word = rng.choice(VOCABULARY)
+        if sentence_left == rng.randint(6, 24) or not words and not segments:
+            word = word.capitalize()
+        sentence_left -= 1
+        if sentence_left == 0:
+            word += rng.choice('...?!')
+            sentence_left = rng.randint(6, 24)
+        words.append(word)
+
+        if len(words) >= rng.randint(3, 8):
+            duration = round(len(words) * seconds_per_word, 2)
+            segments.append({'text': ' '.join(words), 'start': round(clock, 2), 'duration': duration})
+            clock += duration
+            words = []
+
+    if words:
+        segments.append({'text': ' '.join(words), 'start': round(clock, 2),
+                         'duration': round(len(words) * seconds_per_word, 2)})
+    return segments
+
+
+def synthetic_transcript(minutes, seed=42):
+    """
+    Joined transcript text, as get_transcript returns it
+    """
+    return ' '.join(segment['text'] for segment in synthetic_segments(minutes, seed))
+
+
+def synthetic_questions(count, seed=7):
+    """
+    Short questions built from the same vocabulary
+    """
+    rng = random.Random(seed)
+    templates = [
+        "What does the speaker say about {}?",
+        "How is {} explained?",
+        "Why does {} matter?",
+        "Summarize the part about {} and {}."
+    ]
+    return [
+        rng.choice(templates).format(rng.choice(VOCABULARY), rng.choice(VOCABULARY))
+        for _ in range(count)
+    ]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Chunking throughput benchmark
+Times chunk_text on synthetic 1h and 10h transcripts and reports tokens/sec
+
+--check compares chunk_text against the previous per-sentence counting on
+the real tiktoken encoding, for transcripts with and without a final
+terminator and with extra whitespace between sentences, and exits non-zero
+when they drift apart
+"""
+import os
+import sys
+import time
+import argparse
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+from utils.text_processor import (
+    chunk_text, count_tokens, get_encoding, pack_sentences, sentence_spans, sentence_token_counts
+)
+from bench.synthetic import synthetic_transcript
+
+
+def per_sentence_baseline(text):
+    """
+    Previous strategy: one count_tokens call per sentence
+    """
+    starts, ends = sentence_spans(text)
+    return [count_tokens(text[s:e] + '.') for s, e in zip(starts.tolist(), ends.tolist())]
+
+
+def baseline_chunks(text, chunk_size=500, overlap=50):
+    """
+    chunk_text as it was with per-sentence counting
+    """
+    starts, ends = sentence_spans(text)
+    starts, ends = starts.tolist(), ends.tolist()
+    return [
+        ' '.join(text[starts[i]:ends[i]] + '.' for i in range(first, last))
+        for first, last in pack_sentences(per_sentence_baseline(text), chunk_size, overlap)
+    ]
+
+
+def check_variants(text):
+    """
+    The transcript with and without a final terminator, and with extra
+    whitespace between sentences (whitespace-only tokens)
+    """
+    body = text.rstrip().rstrip('.!?')
+    return {
+        'terminated': body + '.',
+        'unterminated': body,
+        'spaced': body.replace('. ', '.  \n') + '\n',
+    }
+
+
+def check(hours, tolerance):
+    """
+    Compare single-pass against per-sentence counting and their chunks
+    Returns False when total tokens or chunk count drift more than
+    tolerance, or the last sentence is counted differently
+    """
+    ok = True
+    for variant, text in check_variants(synthetic_transcript(hours * 60)).items():
+        starts, ends = sentence_spans(text)
+        old_counts = per_sentence_baseline(text)
+        new_counts = sentence_token_counts(text, starts, ends).tolist()
+        old_chunks = baseline_chunks(text)
+        new_chunks = chunk_text(text)
+
+        same_counts = sum(a == b for a, b in zip(old_counts, new_counts))
+        last_equal = old_counts[-1:] == new_counts[-1:]
+        token_drift = abs(sum(new_counts) - sum(old_counts)) / max(1, sum(old_counts))
+        same_chunks = len(set(old_chunks) & set(new_chunks))
+        chunk_drift = abs(len(new_chunks) - len(old_chunks)) / max(1, len(old_chunks))
+        largest = max((count_tokens(chunk) for chunk in new_chunks), default=0)
+
+        print(f"{hours:g}h {variant}: {same_counts:,}/{len(old_counts):,} sentence counts equal "
+              f"(last {'equal' if last_equal else 'DIFFERENT'}), "
+              f"tokens {sum(old_counts):,} -> {sum(new_counts):,} ({token_drift:.2%}), "
+              f"chunks {len(old_chunks):,} -> {len(new_chunks):,} ({same_chunks:,} identical), "
+              f"largest chunk {largest:,} tokens")
+        ok = ok and last_equal and token_drift <= tolerance and chunk_drift <= tolerance
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hours', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--baseline', action='store_true',
+                        help='also time per-sentence token counting')
+    parser.add_argument('--check', action='store_true',
+                        help='compare chunk_text with per-sentence counting instead of timing it')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='largest allowed relative drift in tokens and chunk count (default: 0.01)')
+    args = parser.parse_args()
+
+    try:
+        encoding = get_encoding()
+    except Exception as e:
+        # count_tokens would fall back to len // 4, which says nothing about tiktoken
+        print(f"Error: tiktoken encoding unavailable: {e}")
+        sys.exit(1)
+
+    if args.check:
+        results = [check(hours, args.tolerance) for hours in args.hours]
+        if not all(results):
+            print(f"FAIL: drift above {args.tolerance:.2%}")
+            sys.exit(1)
+        print("OK")
+        return
+
+    print(f"{'hours':>6} {'chars':>12} {'tokens':>10} {'chunks':>8} {'seconds':>9} {'tokens/sec':>12}")
+    for hours in args.hours:
+        text = synthetic_transcript(hours * 60)
+        tokens = len(encoding.encode_ordinary(text))
+
+        start = time.perf_counter()
+        chunks = chunk_text(text)
+        elapsed = time.perf_counter() - start
+        print(f"{hours:>6g} {len(text):>12,} {tokens:>10,} {len(chunks):>8,} "
+              f"{elapsed:>9.3f} {tokens / elapsed:>12,.0f}")
+
+        if args.baseline:
+            start = time.perf_counter()
+            per_sentence_baseline(text)
+            elapsed = time.perf_counter() - start
+            print(f"{'':>6} per-sentence counting baseline: {elapsed:.3f}s "
+                  f"({tokens / elapsed:,.0f} tokens/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Embedding decode benchmark
+CPU time and peak allocations per 1,000 chunks of turning an embeddings API
+response into normalized float32 vectors ready for the index:
+
+- lists: the SDK's default decode to Python float lists, then
+  np.array(...).astype('float32') and normalization (previous path)
+- matrix: base64 rows decoded straight into one preallocated float32 matrix,
+  normalized in place (OpenAIEmbeddingBackend.embed + VectorStore.add_vectors)
+
+Responses are built in process (no network), so only decoding is measured.
+"""
+import os
+import sys
+import gc
+import time
+import base64
+import argparse
+import tracemalloc
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+import faiss
+from openai import omit
+from openai.types import CreateEmbeddingResponse, Embedding
+from openai.types.create_embedding_response import Usage
+from openai.lib._parsing._embeddings import parse_embedding_response
+from utils.embedding_backends import OpenAIEmbeddingBackend
+
+
+def make_response(count, dimensions):
+    """
+    API response with base64 rows, as the SDK requests by default
+    """
+    vectors = np.random.default_rng(0).standard_normal((count, dimensions)).astype('<f4')
+    return CreateEmbeddingResponse.construct(
+        data=[
+            Embedding.construct(embedding=base64.b64encode(vector.tobytes()).decode('ascii'),
+                                index=i, object='embedding')
+            for i, vector in enumerate(vectors)
+        ],
+        model='text-embedding-3-small',
+        object='list',
+        usage=Usage.construct(prompt_tokens=0, total_tokens=0)
+    )
+
+
+class StubEmbeddings:
+    def __init__(self, response):
+        self.response = response
+
+    def create(self, **kwargs):
+        return self.response
+
+
+def decode_lists(response):
+    parse_embedding_response(response, encoding_format=omit)
+    embeddings = [item.embedding for item in response.data]
+    array = np.array(embeddings).astype('float32')
+    faiss.normalize_L2(array)
+    return array
+
+
+def decode_matrix(response, backend):
+    backend.client.embeddings = StubEmbeddings(response)
+    matrix = backend.embed([''] * len(response.data))
+    faiss.normalize_L2(matrix)
+    return matrix
+
+
+def measure(decode, count, dimensions, runs):
+    """
+    (best CPU seconds, peak traced bytes) of decode over fresh responses
+    """
+    cpu = []
+    for _ in range(runs):
+        response = make_response(count, dimensions)
+        gc.collect()
+        start = time.process_time()
+        decode(response)
+        cpu.append(time.process_time() - start)
+
+    response = make_response(count, dimensions)
+    gc.collect()
+    tracemalloc.start()
+    decode(response)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(cpu), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=1000)
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    backend = OpenAIEmbeddingBackend('text-embedding-3-small', api_key='bench')
+    paths = {
+        'lists': decode_lists,
+        'matrix': lambda response: decode_matrix(response, backend)
+    }
+
+    scale = 1000 / args.chunks
+    print(f"{args.chunks:,} chunks x {args.dimensions} dimensions (figures per 1,000 chunks)")
+    print(f"{'path':>8} {'cpu ms':>10} {'peak alloc MB':>15}")
+    results = {}
+    for name, decode in paths.items():
+        cpu, peak = measure(decode, args.chunks, args.dimensions, args.runs)
+        results[name] = (cpu, peak)
+        print(f"{name:>8} {cpu * 1000 * scale:>10.1f} {peak / 2 ** 20 * scale:>15.1f}")
+
+    (lists_cpu, lists_peak), (matrix_cpu, matrix_peak) = results['lists'], results['matrix']
+    print(f"matrix vs lists: {lists_cpu / matrix_cpu:.1f}x less CPU, {lists_peak / matrix_peak:.1f}x smaller peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Index format benchmark
+Compares load time and peak RSS of the legacy faiss.index + texts.pkl pair
+against the memory-mapped VTX file, mirroring what load_from_s3 does with
+the downloaded bytes. Each load runs in a fresh subprocess.
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from io import BytesIO
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+import faiss
+from utils.vector_store import VectorStore
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    """
+    Resident set size now (Linux /proc); mapped file pages count once touched
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def build_files(directory, chunks, dimension):
+    rng = np.random.default_rng(0)
+    store = VectorStore(dimension=dimension)
+    store.add_vectors(
+        list(rng.standard_normal((chunks, dimension), dtype='float32')),
+        [f"Chunk {i}: " + "transcript text " * 120 for i in range(chunks)]
+    )
+
+    with open(os.path.join(directory, 'faiss.index'), 'wb') as f:
+        faiss.write_index(store.index, faiss.BufferedIOWriter(faiss.PyCallbackIOWriter(f.write)))
+    with open(os.path.join(directory, 'texts.pkl'), 'wb') as f:
+        pickle.dump(store.texts, f)
+    with open(os.path.join(directory, 'index.vtx'), 'wb') as f:
+        store.save_to_file(f)
+
+
+def load_once(directory, fmt):
+    """
+    Runs inside the child process; prints one JSON result line
+    """
+    baseline = current_rss_mb()
+
+    start = time.perf_counter()
+    if fmt == 'legacy':
+        with open(os.path.join(directory, 'faiss.index'), 'rb') as f:
+            index_buffer = BytesIO(f.read())
+        index = faiss.read_index(faiss.BufferedIOReader(faiss.PyCallbackIOReader(index_buffer.read)))
+        with open(os.path.join(directory, 'texts.pkl'), 'rb') as f:
+            texts = pickle.load(BytesIO(f.read()))
+        store = VectorStore(dimension=index.d)
+        store.index, store.texts = index, texts
+    else:
+        # Same path as load_from_s3: stream the object to local disk, then mmap
+        with open(os.path.join(directory, 'index.vtx'), 'rb') as src, \
+                tempfile.NamedTemporaryFile(dir=directory) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+            dst.flush()
+            store = VectorStore.load_from_file(dst.name)
+    load_seconds = time.perf_counter() - start
+
+    query = np.random.default_rng(1).standard_normal(store.index.d).tolist()
+    start = time.perf_counter()
+    store.search(query, top_k=3)
+    search_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        'format': fmt,
+        'load_ms': round(load_seconds * 1000, 2),
+        'first_search_ms': round(search_seconds * 1000, 2),
+        'rss_delta_mb': round(current_rss_mb() - baseline, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=int, default=20000)
+    parser.add_argument('--dimension', type=int, default=1536)
+    parser.add_argument('--child', nargs=2, metavar=('DIR', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        load_once(*args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_files(directory, args.chunks, args.dimension)
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) / 1e6
+                 for name in ('faiss.index', 'texts.pkl', 'index.vtx')}
+        print(f"{args.chunks:,} chunks x {args.dimension} dims; "
+              f"legacy {sizes['faiss.index'] + sizes['texts.pkl']:.1f} MB, vtx {sizes['index.vtx']:.1f} MB")
+
+        for fmt in ('legacy', 'vtx'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', directory, fmt],
+                check=True, capture_output=True, text=True
+            ).stdout
+            print(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
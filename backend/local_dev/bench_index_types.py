@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Index type benchmark
+Recall@k, search latency, load time and size of each INDEX_TYPE
+(flat, sq8, ivfpq, hnsw-sq) against exact flat search, on:
+
+- synthetic: clustered random unit vectors (--vectors rows, --dimensions)
+- text: local-hashing embeddings of synthetic transcript passages,
+  queried with synthetic questions
+- index: the vectors of an existing VTX index (--index, e.g. a downloaded
+  indexes/{video_id}/index.vtx), queried with perturbed rows
+
+Each type is built with build_index, uploaded to the S3 stand-in from
+bench/ and loaded back the way a cold /chat request does: load is
+load_from_s3_key (download + map/deserialize) plus the first search.
+Search latency is per single query, as /chat searches. Recall counts a
+returned row as correct when it is no farther than the exact k-th
+neighbour, so ties between equidistant rows are not misses.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from types import SimpleNamespace
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+import faiss
+from utils.vector_store import VectorStore, INDEX_TYPES, build_index, index_type_name
+
+
+def normalized(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def synthetic_set(count, dimensions, queries, seed=0):
+    """
+    Embedding-like unit vectors: count // 50 clusters in a 128-dimensional
+    subspace, randomly rotated into the full dimension, plus a little noise
+    in every dimension; queries are further points of the same clusters
+    """
+    rng = np.random.default_rng(seed)
+    latent = min(128, dimensions)
+    centres = rng.standard_normal((max(1, count // 50), latent)).astype(np.float32)
+    labels = rng.integers(len(centres), size=count + queries)
+    points = centres[labels] + 0.7 * rng.standard_normal((count + queries, latent)).astype(np.float32)
+    rotation = np.linalg.qr(rng.standard_normal((dimensions, latent)))[0].astype(np.float32)
+    points = normalized(points @ rotation.T)
+    points += 0.01 * rng.standard_normal(points.shape).astype(np.float32)
+    points = normalized(points)
+    return points[:count], points[count:]
+
+
+def text_set(hours, dimensions, queries):
+    """
+    Hashing embeddings of ~400-word passages of a synthetic transcript
+    """
+    from bench.synthetic import synthetic_segments, synthetic_questions
+    from utils.embedding_backends import HashingEmbeddingBackend
+
+    segments = synthetic_segments(hours * 60)
+    passages, words = [], []
+    for segment in segments:
+        words.extend(segment['text'].split())
+        if len(words) >= 400:
+            passages.append(' '.join(words))
+            words = []
+    backend = HashingEmbeddingBackend(dimensions)
+    return normalized(backend.embed(passages)), normalized(backend.embed(synthetic_questions(queries)))
+
+
+def index_set(path, queries, seed=0):
+    """
+    Rows of a VTX index; queries are sampled rows plus noise
+    """
+    store = VectorStore.load_from_file(path)
+    vectors = normalized(store.index.reconstruct_n(0, store.index.ntotal))
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.integers(len(vectors), size=queries)]
+    return vectors, normalized(sample + 0.05 * rng.standard_normal(sample.shape).astype(np.float32))
+
+
+def measure(index_type, vectors, queries, truth, k):
+    store = VectorStore(vectors.shape[1])
+    start = time.perf_counter()
+    store.index = build_index(vectors, index_type)
+    build_seconds = time.perf_counter() - start
+    store.texts = [''] * len(vectors)
+
+    bucket_name = os.environ['S3_BUCKET_NAME']
+    key = f'bench/index-types/{index_type}.vtx'
+    with tempfile.TemporaryFile() as f:
+        store.save_to_file(f)
+        size = f.tell()
+        f.seek(0)
+        VectorStore.upload_index_file(bucket_name, key, f)
+
+    start = time.perf_counter()
+    loaded = VectorStore.load_from_s3_key(bucket_name, key)
+    loaded.index.search(queries[:1], k)
+    load_seconds = time.perf_counter() - start
+
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, indices = loaded.index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(indices[0])
+
+    # Exact distance of every returned row against the exact k-th distance
+    distances, _ = truth
+    hits = 0
+    for query, row, kth in zip(queries, found, distances[:, -1]):
+        row = row[row >= 0]
+        exact = ((vectors[row] - query) ** 2).sum(axis=1)
+        hits += int((exact <= kth + 1e-5).sum())
+    return {
+        'type': index_type_name(loaded.index),
+        'bytes': size,
+        'build_ms': build_seconds * 1000,
+        'load_ms': load_seconds * 1000,
+        'search_p50_ms': float(np.median(latencies)) * 1000,
+        'recall': hits / (len(queries) * k)
+    }
+
+
+def report(name, vectors, queries, k, index_types):
+    truth = faiss.knn(queries, vectors, k)
+    print(f"\n{name}: {len(vectors):,} vectors x {vectors.shape[1]}, {len(queries)} queries, recall@{k}")
+    print(f"{'type':>8} {'MB':>8} {'size':>6} {'build ms':>9} {'load ms':>8} {'speedup':>8} "
+          f"{'p50 ms':>7} {'speedup':>8} {'recall':>7}")
+    baseline = None
+    for index_type in index_types:
+        result = measure(index_type, vectors, queries, truth, k)
+        baseline = baseline or result
+        print(f"{index_type:>8} {result['bytes'] / 2 ** 20:>8.2f} {baseline['bytes'] / result['bytes']:>5.1f}x "
+              f"{result['build_ms']:>9.0f} {result['load_ms']:>8.2f} "
+              f"{baseline['load_ms'] / result['load_ms']:>7.1f}x {result['search_p50_ms']:>7.3f} "
+              f"{baseline['search_p50_ms'] / result['search_p50_ms']:>7.1f}x {result['recall']:>7.3f}"
+              + ('' if result['type'] == index_type else f"  (stayed {result['type']}: too few vectors)"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vectors', type=int, nargs='+', default=[2000, 20000],
+                        help='synthetic set sizes')
+    parser.add_argument('--dimensions', type=int, default=1536)
+    parser.add_argument('--hours', type=float, default=100,
+                        help='length of the synthetic transcript of the text set (0 to skip)')
+    parser.add_argument('--index', help='VTX index file to add as a set')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--types', nargs='+', default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    args = parser.parse_args()
+
+    from bench.run_bench import start_stand_in, configure_environment, BENCH_BUCKET
+
+    s3_process, s3_url = start_stand_in('fake_s3.py', '--bucket', BENCH_BUCKET)
+    try:
+        # No OpenAI calls are made; the text set embeds with local-hashing
+        configure_environment('http://127.0.0.1:9', s3_url, SimpleNamespace(
+            embedding_cache=False, trace=False, embedding_model='local-hashing'
+        ))
+        run(args)
+    finally:
+        s3_process.kill()
+
+
+def run(args):
+    index_types = ['flat'] + [index_type for index_type in args.types if index_type != 'flat']
+    for count in args.vectors:
+        report('synthetic', *synthetic_set(count, args.dimensions, args.queries), args.k, index_types)
+    if args.hours:
+        report(f'text ({args.hours:g} h transcript)', *text_set(args.hours, args.dimensions, args.queries),
+               args.k, index_types)
+    if args.index:
+        report(os.path.basename(args.index), *index_set(args.index, args.queries), args.k, index_types)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Build a named multi-video catalog from already ingested videos
+Usage: python3 build_catalog.py COLLECTION VIDEO_ID [VIDEO_ID ...]
+       python3 build_catalog.py COLLECTION --file video_ids.txt
+"""
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+# Load environment
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(parent_dir, '.env'))
+sys.path.insert(0, parent_dir)
+
+from utils.catalog_index import CatalogIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a cross-video catalog index")
+    parser.add_argument('collection', help='catalog name used as "collection" in /chat/catalog')
+    parser.add_argument('video_ids', nargs='*')
+    parser.add_argument('--file', help='text file with one video_id per line')
+    args = parser.parse_args()
+
+    video_ids = list(args.video_ids)
+    if args.file:
+        with open(args.file) as f:
+            video_ids.extend(line.strip() for line in f if line.strip())
+
+    if not video_ids:
+        parser.error('no video_ids given')
+
+    bucket_name = os.getenv('S3_BUCKET_NAME')
+    if not bucket_name:
+        print("❌ Error: S3_BUCKET_NAME not set")
+        return
+
+    catalog = CatalogIndex.build(bucket_name, args.collection, video_ids)
+    shards = catalog.manifest['shards']
+    print(f"\n✅ Catalog '{args.collection}': {len(catalog.video_ids)} videos in {len(shards)} shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Bulk offline ingestion
+Ingests a list of YouTube URLs (one per line, '#' starts a comment) into
+S3_BUCKET_NAME, producing the same indexes as POST /ingest:
+
+- fetch: transcripts are fetched concurrently (--fetch-workers threads)
+- chunk: transcripts are chunked and token-counted in a process pool
+  (--chunk-workers, default one per core)
+- embed: chunks of many videos are packed into full embedding batches
+  (EMBEDDING_BATCH_TOKENS / EMBEDDING_BATCH_SIZE), --embed-workers requests
+  at a time, instead of every video ending on a partial batch
+- upload: indexes (INDEX_TYPE) are built and uploaded in parallel
+  (--upload-workers)
+
+Each stage checkpoints its output per video under --checkpoint-dir, written
+atomically, so a rerun after a failure or Ctrl+C skips the stages and the
+videos that already completed. Videos whose stored index is compatible
+(same embedding model and chunking) are skipped unless --force. At most
+--max-videos-in-flight videos are between fetch and upload at once, which
+bounds memory however long the list.
+
+Ends with a throughput summary: videos/min and chunk tokens embedded/sec.
+
+Usage:
+    python3 bulk_ingest.py urls.txt [--checkpoint-dir .bulk_ingest]
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+from dotenv import load_dotenv
+
+
+def read_urls(path):
+    """
+    URLs of a list file (or '-' for stdin), blank lines and comments skipped
+    """
+    f = sys.stdin if path == '-' else open(path)
+    try:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class Checkpoint:
+    """
+    Stage outputs of one video under {root}/{video_id}/:
+    transcript.json, chunks.json, vectors.npy and done.json
+    Files are written to a temporary name and renamed, so an interrupted
+    run never leaves a partial checkpoint behind
+    """
+
+    def __init__(self, root, video_id):
+        self.dir = os.path.join(root, video_id)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def has(self, name):
+        return os.path.exists(self.path(name))
+
+    def _replace(self, name, write):
+        os.makedirs(self.dir, exist_ok=True)
+        temp = self.path(f'.{name}.tmp')
+        with open(temp, 'wb') as f:
+            write(f)
+        os.replace(temp, self.path(name))
+
+    def write_json(self, name, value):
+        self._replace(name, lambda f: f.write(json.dumps(value).encode('utf-8')))
+
+    def read_json(self, name):
+        try:
+            with open(self.path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_vectors(self, vectors):
+        self._replace('vectors.npy', lambda f: np.save(f, vectors))
+
+    def read_vectors(self):
+        try:
+            return np.load(self.path('vectors.npy'))
+        except (OSError, ValueError):
+            return None
+
+
+def chunk_video(root, video_id, chunking):
+    """
+    Process pool worker: chunk a checkpointed transcript, count the tokens
+    of each chunk and checkpoint the chunks
+    """
+    from utils.segments import SegmentTable
+    from utils.text_processor import chunk_segments, count_tokens
+
+    checkpoint = Checkpoint(root, video_id)
+    segments = SegmentTable.from_dict(checkpoint.read_json('transcript.json'))
+    chunks, time_ranges = chunk_segments(segments, **chunking)
+    result = {
+        'chunking': chunking,
+        'chunks': chunks,
+        'time_ranges': time_ranges.tolist(),
+        'token_counts': [count_tokens(chunk) for chunk in chunks]
+    }
+    checkpoint.write_json('chunks.json', result)
+    return result
+
+
+class Video:
+    """
+    One video moving through the pipeline
+    """
+
+    def __init__(self, url, video_id, checkpoint):
+        self.url = url
+        self.video_id = video_id
+        self.checkpoint = checkpoint
+        self.chunks = None
+        self.time_ranges = None
+        self.token_counts = None
+        self.vectors = None
+        self.embedded = 0
+
+
+class BulkIngest:
+    """
+    Fetch and chunk run ahead on their pools and hand videos to the main
+    thread through a queue; the main thread packs their chunks into
+    embedding rounds and hands finished videos to the upload pool
+    """
+
+    def __init__(self, args):
+        from utils.ingest_pipeline import chunking_params
+        from utils.embeddings import EmbeddingGenerator
+        from utils.embedding_cache import EmbeddingCache
+
+        self.args = args
+        self.bucket_name = os.getenv('S3_BUCKET_NAME')
+        self.chunking = chunking_params()
+
+        embedding_cache = None
+        if os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true':
+            embedding_cache = EmbeddingCache(bucket_name=self.bucket_name)
+        self.embedder = EmbeddingGenerator(model=os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small'),
+                                           cache=embedding_cache)
+        if args.embed_workers:
+            self.embedder.max_workers = args.embed_workers
+        self.backend = self.embedder.backend.spec()
+
+        self.fetch_pool = ThreadPoolExecutor(max_workers=args.fetch_workers, thread_name_prefix='fetch')
+        self.chunk_pool = ProcessPoolExecutor(max_workers=args.chunk_workers or os.cpu_count())
+        self.upload_pool = ThreadPoolExecutor(max_workers=args.upload_workers, thread_name_prefix='upload')
+        self.slots = threading.BoundedSemaphore(args.max_videos_in_flight)
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+
+        # Videos admitted and not yet back on the main thread (fetching or chunking)
+        self.upstream = 0
+        self.total = None
+        self.pending = []
+        self.uploads = []
+        self.stats = {
+            'ingested': 0, 'skipped': 0, 'failed': [], 'chunks': 0, 'tokens': 0,
+            'batches': 0, 'batch_tokens': 0, 'requests': 0, 'fetch_s': 0.0, 'embed_s': 0.0, 'upload_s': 0.0
+        }
+
+    # Fetch and chunk (pool threads)
+
+    def plan(self, urls):
+        """
+        Videos of the URL list, once per video id; invalid URLs fail here
+        """
+        from utils.transcript_extractor import extract_video_id
+
+        videos = {}
+        for url in urls:
+            try:
+                video_id = extract_video_id(url)
+            except ValueError as e:
+                self.stats['failed'].append((url, 'fetch', str(e)))
+                continue
+            if video_id not in videos:
+                videos[video_id] = Video(url, video_id, Checkpoint(self.args.checkpoint_dir, video_id))
+        return list(videos.values())
+
+    def feed(self, videos):
+        """
+        Feeder thread: admit videos while slots are free
+        """
+        for video in videos:
+            self.slots.acquire()
+            with self.lock:
+                self.upstream += 1
+            self.fetch_pool.submit(self.fetch, video)
+        self.events.put(('fed', None, None))
+
+    def fetch(self, video):
+        from utils import transcript_extractor
+        from utils.ingest_pipeline import find_compatible_index
+        from utils.embedding_backends import same_space
+
+        try:
+            done = video.checkpoint.read_json('done.json')
+            if not self.args.force and done and self.compatible(done) and done['bucket'] == self.bucket_name:
+                return self.events.put(('skipped', video, 'done in an earlier run'))
+
+            chunks = video.checkpoint.read_json('chunks.json')
+            if chunks and chunks['chunking'] == self.chunking:
+                vectors = video.checkpoint.read_vectors()
+                embedded = video.checkpoint.read_json('embedded.json')
+                if vectors is not None and embedded and same_space(embedded['backend'], self.backend):
+                    return self.events.put(('embedded', video, (chunks, vectors)))
+                return self.events.put(('chunked', video, chunks))
+
+            if not self.args.force and find_compatible_index(self.bucket_name, video.video_id):
+                return self.events.put(('skipped', video, 'already ingested'))
+
+            if not video.checkpoint.has('transcript.json'):
+                start = time.perf_counter()
+                result = transcript_extractor.get_transcript(video.url)
+                with self.lock:
+                    self.stats['fetch_s'] += time.perf_counter() - start
+                if not result['success']:
+                    raise RuntimeError(result['error'])
+                video.checkpoint.write_json('transcript.json', result['segments'].to_dict())
+
+        except Exception as e:
+            return self.events.put(('failed', video, ('fetch', str(e))))
+
+        future = self.chunk_pool.submit(chunk_video, self.args.checkpoint_dir, video.video_id, self.chunking)
+        future.add_done_callback(lambda done: self.chunked(video, done))
+
+    def chunked(self, video, future):
+        try:
+            self.events.put(('chunked', video, future.result()))
+        except Exception as e:
+            self.events.put(('failed', video, ('chunk', str(e))))
+
+    def compatible(self, record):
+        from utils.embedding_backends import same_space
+        return record.get('chunking') == self.chunking and same_space(record.get('backend'), self.backend)
+
+    # Embed (main thread)
+
+    def run(self, urls):
+        start = time.perf_counter()
+        videos = self.plan(urls)
+        self.total = len(videos) + len(self.stats['failed'])
+        threading.Thread(target=self.feed, args=(videos,), daemon=True, name='feed').start()
+
+        fed = False
+        while True:
+            try:
+                kind, video, payload = self.events.get(timeout=0.1)
+            except queue.Empty:
+                kind = None
+
+            if kind == 'fed':
+                fed = True
+            elif kind:
+                with self.lock:
+                    self.upstream -= 1
+                self.handle(kind, video, payload)
+
+            with self.lock:
+                upstream = self.upstream
+            # Nothing can arrive until a video finishes: embed what is pending
+            drained = upstream == 0 and self.events.empty()
+            if self.pending and (kind == 'chunked' or drained):
+                self.embed_round(flush=drained)
+            if fed and drained and not self.pending:
+                break
+
+        wait(self.uploads)
+        self.stats['wall_s'] = time.perf_counter() - start
+        return self.stats
+
+    def handle(self, kind, video, payload):
+        if kind == 'skipped':
+            self.finish(video, 'skipped', payload)
+        elif kind == 'failed':
+            stage, error = payload
+            self.finish(video, 'failed', f'{stage}: {error}', stage=stage)
+        elif kind == 'embedded':
+            chunks, vectors = payload
+            self.take_chunks(video, chunks)
+            video.vectors, video.embedded = vectors, len(vectors)
+            self.upload(video)
+        else:
+            self.take_chunks(video, payload)
+            if not video.chunks:
+                return self.finish(video, 'failed', 'chunk: No chunks to embed', stage='chunk')
+            self.pending.extend((video, position) for position in range(len(video.chunks)))
+
+    @staticmethod
+    def take_chunks(video, chunks):
+        video.chunks = chunks['chunks']
+        video.time_ranges = np.asarray(chunks['time_ranges'], dtype=np.float32).reshape(-1, 2)
+        video.token_counts = chunks['token_counts']
+
+    def embed_round(self, flush):
+        """
+        Embed the pending chunks of full batches (all of them when flush);
+        the last, partial batch waits for the chunks of the next videos
+        """
+        texts = [video.chunks[position] for video, position in self.pending]
+        token_counts = [video.token_counts[position] for video, position in self.pending]
+        batches = self.embedder.make_batches(texts, token_counts)
+        if not flush:
+            if len(batches) <= self.embedder.max_workers:
+                return
+            batches = batches[:-1]
+        end = batches[-1][1]
+
+        start = time.perf_counter()
+        result = self.embedder.generate_embeddings(texts[:end])
+        self.stats['embed_s'] += time.perf_counter() - start
+        round_chunks, self.pending = self.pending[:end], self.pending[end:]
+        if not result['success']:
+            failed = {id(video): video for video, _ in round_chunks}
+            self.pending = [(video, position) for video, position in self.pending if id(video) not in failed]
+            for video in failed.values():
+                self.finish(video, 'failed', f"embed: {result['error']}", stage='embed')
+            return
+
+        self.stats['batches'] += len(batches)
+        self.stats['batch_tokens'] += sum(token_counts[:end])
+        # Cache hits and repeated chunks are not sent, so there may be fewer requests
+        self.stats['requests'] += result['batches']
+        embeddings = result['embeddings']
+        row = 0
+        while row < end:
+            # Rows of one video are contiguous
+            video, first = round_chunks[row]
+            count = 1
+            while row + count < end and round_chunks[row + count][0] is video:
+                count += 1
+            if video.vectors is None:
+                video.vectors = np.empty((len(video.chunks), embeddings.shape[1]), dtype=np.float32)
+            video.vectors[first:first + count] = embeddings[row:row + count]
+            video.embedded += count
+            row += count
+
+            if video.embedded == len(video.chunks):
+                video.checkpoint.write_vectors(video.vectors)
+                video.checkpoint.write_json('embedded.json', {'backend': self.backend})
+                self.stats['tokens'] += sum(video.token_counts)
+                self.upload(video)
+
+    # Upload (upload pool)
+
+    def upload(self, video):
+        self.uploads.append(self.upload_pool.submit(self.save, video))
+
+    def save(self, video):
+        from utils.vector_store import VectorStore
+        from utils.index_deltas import base_key, clear_deltas
+
+        try:
+            start = time.perf_counter()
+            store = VectorStore(dimension=video.vectors.shape[1], embedding_backend=self.backend)
+            store.chunking = self.chunking
+            store.add_vectors(video.vectors, video.chunks, video.time_ranges)
+            store.quantize()
+            store.save_to_s3_key(self.bucket_name, base_key(video.video_id))
+            # Deltas of a previous base no longer apply
+            clear_deltas(self.bucket_name, video.video_id)
+            video.checkpoint.write_json('done.json', {
+                'bucket': self.bucket_name, 'chunking': self.chunking, 'backend': self.backend,
+                'chunks_count': len(video.chunks), 'finished_at': time.time()
+            })
+            with self.lock:
+                self.stats['upload_s'] += time.perf_counter() - start
+                self.stats['chunks'] += len(video.chunks)
+            self.finish(video, 'ingested', f'{len(video.chunks)} chunks')
+        except Exception as e:
+            self.finish(video, 'failed', f'upload: {str(e)}', stage='upload')
+
+    def finish(self, video, outcome, detail, stage=None):
+        with self.lock:
+            if outcome == 'failed':
+                self.stats['failed'].append((video.url, stage, detail))
+            else:
+                self.stats[outcome] += 1
+            done = self.stats['ingested'] + self.stats['skipped'] + len(self.stats['failed'])
+            print(f"[{done}/{self.total}] {video.video_id} {outcome}: {detail}")
+        # Drop the video's chunks and vectors before admitting the next one
+        video.chunks = video.vectors = video.time_ranges = None
+        self.slots.release()
+
+    def close(self):
+        self.fetch_pool.shutdown(cancel_futures=True)
+        self.chunk_pool.shutdown(cancel_futures=True)
+        self.upload_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def print_summary(stats, embedder):
+    wall = stats['wall_s']
+    print("\n" + "=" * 60)
+    print(f"Ingested {stats['ingested']}, skipped {stats['skipped']}, failed {len(stats['failed'])} "
+          f"in {wall:.1f}s")
+    print(f"Throughput: {stats['ingested'] / wall * 60:.1f} videos/min, "
+          f"{stats['tokens'] / wall:,.0f} tokens/sec ({stats['chunks']:,} chunks, {stats['tokens']:,} tokens)")
+    if stats['batches']:
+        fill = stats['batch_tokens'] / (stats['batches'] * embedder.batch_tokens)
+        print(f"Embedding: {stats['batches']} batches, mean fill {fill:.0%} of {embedder.batch_tokens:,} tokens "
+              f"({stats['requests']} requests after cache hits and repeated chunks)")
+    print(f"Stage time: fetch {stats['fetch_s']:.1f}s (summed over threads), embed {stats['embed_s']:.1f}s, "
+          f"upload {stats['upload_s']:.1f}s (summed over threads)")
+    for url, stage, error in stats['failed']:
+        print(f"  failed: {url} ({error})")
+    print("=" * 60)
+
+
+def main():
+    load_dotenv(os.path.join(parent_dir, '.env'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls', help="file with one YouTube URL per line ('-' for stdin)")
+    parser.add_argument('--checkpoint-dir', default='.bulk_ingest')
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    parser.add_argument('--chunk-workers', type=int, default=0, help='chunking processes (0 = one per core)')
+    parser.add_argument('--embed-workers', type=int, default=0,
+                        help='concurrent embedding requests (0 = EMBEDDING_MAX_WORKERS)')
+    parser.add_argument('--upload-workers', type=int, default=4)
+    parser.add_argument('--max-videos-in-flight', type=int, default=64)
+    parser.add_argument('--force', action='store_true', help='re-ingest videos that are already indexed (checkpoints are still reused)')
+    args = parser.parse_args()
+
+    if not os.getenv('S3_BUCKET_NAME'):
+        sys.exit("❌ Error: S3_BUCKET_NAME not set")
+
+    urls = read_urls(args.urls)
+    print(f"{len(urls)} URLs, checkpoints in {os.path.abspath(args.checkpoint_dir)}")
+
+    ingest = BulkIngest(args)
+    try:
+        stats = ingest.run(urls)
+    except KeyboardInterrupt:
+        print("\nInterrupted; rerun to resume from the checkpoints")
+        sys.exit(130)
+    finally:
+        ingest.close()
+
+    print_summary(stats, ingest.embedder)
+    sys.exit(1 if stats['failed'] else 0)
+
+
+if __name__ == "__main__":
+    main()
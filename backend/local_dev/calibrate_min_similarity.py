@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+MIN_SIMILARITY calibration
+Scores questions that the video answers and questions it does not against
+one index, and recommends the highest cutoff that still keeps --keep of the
+answerable questions. Reports, per candidate cutoff, the share of
+answerable questions kept and of off-topic ones answered without an LLM
+call, plus the effect of MMR (--mmr-lambda) on the retrieved context.
+
+Index (one of):
+- --video-id: an ingested video, loaded from S3_BUCKET_NAME
+- --index: a VTX index file (e.g. a downloaded indexes/{video_id}/index.vtx)
+- neither: a synthetic transcript indexed in memory with local-hashing
+
+Questions are files with one question per line (--questions, --off-topic);
+the synthetic index defaults to questions naming words of its chunks and
+a built-in off-topic list. Questions are embedded with the index's own backend, so
+OpenAI-built indexes need OPENAI_API_KEY. Scores follow SEARCH_SCORE.
+"""
+import os
+import sys
+import argparse
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+import numpy as np
+from dotenv import load_dotenv
+
+OFF_TOPIC_QUESTIONS = [
+    "What is the best recipe for sourdough bread?",
+    "Who won the football world cup in 1998?",
+    "How do I change a flat tyre on my bicycle?",
+    "What will the weather be like in Paris tomorrow?",
+    "When was the Eiffel Tower built?",
+    "How many calories are in a banana?",
+    "What is the capital city of Australia?",
+    "How do I repot an orchid?",
+    "Which guitar strings are best for beginners?",
+    "How long should I boil an egg?",
+    "What are the rules of cricket?",
+    "Where can I buy cheap concert tickets?",
+    "How do I remove a red wine stain from a carpet?",
+    "What is the plot of Hamlet?",
+    "How often should I water cactus plants?",
+    "Who painted the Mona Lisa?",
+]
+
+
+def floor(value):
+    """
+    Cutoff rounded down to 3 decimals, so it keeps at least its share
+    """
+    return float(np.floor(value * 1000) / 1000)
+
+
+def read_questions(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def synthetic_store(minutes):
+    """
+    VectorStore of a synthetic transcript embedded with local-hashing
+    """
+    from bench.synthetic import synthetic_segments
+    from utils.segments import SegmentTable
+    from utils.text_processor import chunk_segments
+    from utils.embeddings import EmbeddingGenerator
+    from utils.vector_store import VectorStore
+
+    chunks, time_ranges = chunk_segments(SegmentTable.from_segments(synthetic_segments(minutes)),
+                                         chunk_size=int(os.getenv('CHUNK_SIZE', 500)),
+                                         overlap=int(os.getenv('CHUNK_OVERLAP', 50)))
+    result = EmbeddingGenerator(model='local-hashing').generate_embeddings(chunks)
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    store = VectorStore(dimension=result['dimension'], embedding_backend=result['backend'])
+    store.add_vectors(result['embeddings'], chunks, time_ranges)
+    return store
+
+
+def transcript_questions(store, count, seed=7):
+    """
+    Questions naming content words (5+ letters) of random chunks of the store
+    """
+    rng = np.random.default_rng(seed)
+    questions = []
+    for row in rng.choice(len(store.texts), size=count):
+        words = sorted({word.strip('.,?!').lower() for word in store.texts[int(row)].split() if len(word) >= 5})
+        picked = rng.choice(words, size=min(3, len(words)), replace=False)
+        questions.append(f"What does the speaker say about {', '.join(picked)}?")
+    return questions
+
+
+def load_store(args):
+    if args.video_id:
+        from utils.index_deltas import load_video_index
+        store = load_video_index(os.getenv('S3_BUCKET_NAME'), args.video_id)
+        if store is None:
+            sys.exit(f"Video {args.video_id} is not ingested")
+        return store
+    if args.index:
+        from utils.vector_store import VectorStore
+        return VectorStore.load_from_file(args.index)
+    return synthetic_store(args.minutes)
+
+
+def embed(store, questions):
+    from utils.embeddings import EmbeddingGenerator
+
+    spec = store.embedding_backend or {}
+    generator = EmbeddingGenerator(model=spec.get('model'), dimensions=spec.get('dimensions'))
+    result = generator.generate_embeddings(questions)
+    if not result['success']:
+        sys.exit(f"Embedding failed: {result['error']}")
+    return result['embeddings']
+
+
+def retrieve(store, embeddings, top_k, mmr_lambda):
+    """
+    Hit lists per question with MMR_LAMBDA set to mmr_lambda
+    """
+    previous = os.environ.get('MMR_LAMBDA')
+    os.environ['MMR_LAMBDA'] = str(mmr_lambda)
+    try:
+        return store.search_batch(embeddings, top_k=top_k)
+    finally:
+        if previous is None:
+            del os.environ['MMR_LAMBDA']
+        else:
+            os.environ['MMR_LAMBDA'] = previous
+
+
+def context_report(store, hit_lists, embeddings_of):
+    """
+    (mean pairwise similarity of the hits, mean packed context tokens)
+    """
+    from utils.context_packer import pack_context
+
+    redundancy, tokens = [], []
+    for hits in hit_lists:
+        if len(hits) > 1:
+            vectors = embeddings_of(np.array([hit['index'] for hit in hits]))
+            pairwise = vectors @ vectors.T
+            redundancy.append(float(pairwise[np.triu_indices(len(hits), 1)].mean()))
+        tokens.append(pack_context(hits)['tokens'])
+    return float(np.mean(redundancy)) if redundancy else 0.0, float(np.mean(tokens))
+
+
+def main():
+    load_dotenv(os.path.join(parent_dir, '.env'))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--video-id')
+    parser.add_argument('--index', help='VTX index file')
+    parser.add_argument('--minutes', type=float, default=60, help='length of the synthetic transcript')
+    parser.add_argument('--questions', help='answerable questions, one per line')
+    parser.add_argument('--off-topic', help='questions the video does not answer, one per line')
+    parser.add_argument('--keep', type=float, default=0.95, help='share of answerable questions to keep')
+    parser.add_argument('--top-k', type=int, default=int(os.getenv('TOP_K_RESULTS', 3)))
+    parser.add_argument('--mmr-lambda', type=float, default=float(os.getenv('MMR_LAMBDA', 1)),
+                        help='report the effect of MMR at this lambda (default: MMR_LAMBDA, off)')
+    args = parser.parse_args()
+
+    store = load_store(args)
+    if args.questions:
+        questions = read_questions(args.questions)
+    elif args.video_id or args.index:
+        sys.exit("--questions is required with --video-id or --index")
+    else:
+        questions = transcript_questions(store, 100)
+    off_topic = read_questions(args.off_topic) if args.off_topic else OFF_TOPIC_QUESTIONS
+
+    answerable = embed(store, questions)
+    unanswerable = embed(store, off_topic)
+    hits = retrieve(store, answerable, args.top_k, 1)
+    off_hits = retrieve(store, unanswerable, args.top_k, 1)
+    best = np.array([max((hit['score'] for hit in row), default=0.0) for row in hits])
+    off_best = np.array([max((hit['score'] for hit in row), default=0.0) for row in off_hits])
+
+    print(f"{len(questions)} answerable, {len(off_topic)} off-topic questions, "
+          f"scores: {os.getenv('SEARCH_SCORE', 'ip')}, top_k {args.top_k}")
+    print(f"best-hit score  answerable p5/p50/p95 {np.percentile(best, 5):.3f} / {np.median(best):.3f} / "
+          f"{np.percentile(best, 95):.3f}")
+    print(f"                off-topic  p5/p50/p95 {np.percentile(off_best, 5):.3f} / {np.median(off_best):.3f} / "
+          f"{np.percentile(off_best, 95):.3f}")
+
+    print(f"\n{'cutoff':>8} {'kept':>7} {'gated off-topic':>16} {'hits dropped':>13}")
+    recommended = floor(np.quantile(best, 1 - args.keep, method='lower'))
+    all_scores = np.array([hit['score'] for row in hits for hit in row])
+    for cutoff in sorted({floor(value) for value in np.quantile(best, [0, 0.01, 0.05, 0.1, 0.25], method='lower')}
+                         | {recommended}):
+        marker = '  <- recommended' if cutoff == recommended else ''
+        print(f"{cutoff:>8.3f} {np.mean(best >= cutoff):>6.0%} {np.mean(off_best < cutoff):>16.0%} "
+              f"{np.mean(all_scores < cutoff):>13.0%}{marker}")
+    print(f"\nMIN_SIMILARITY={recommended:.3f}  (keeps {np.mean(best >= recommended):.0%} of answerable questions; "
+          f"{np.mean(off_best < recommended):.0%} of off-topic ones get the no-LLM answer)")
+
+    mmr_lambda = args.mmr_lambda
+    if mmr_lambda < 1:
+        embeddings_of = store.index.reconstruct_batch if hasattr(store, 'index') else store.reconstruct_batch
+        plain = context_report(store, hits, embeddings_of)
+        diverse = context_report(store, retrieve(store, answerable, args.top_k, mmr_lambda), embeddings_of)
+        print(f"\nMMR (lambda {mmr_lambda:g}): mean similarity between retrieved chunks "
+              f"{plain[0]:.3f} -> {diverse[0]:.3f}, packed context tokens {plain[1]:.0f} -> {diverse[1]:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check
+Measures, in a fresh interpreter, the time to import lambda_function and
+the latency of the first and second /chat requests, and fails (exit 1) when
+a budget is exceeded or a heavy dependency is imported at module load.
+
+The OpenAI and S3 stand-ins from bench/ run with zero latency, so the
+numbers are this code's own overhead: imports, client setup, index load.
+
+Usage:
+    python3 check_cold_start.py [--import-budget-ms 150] [--first-request-budget-ms 2000] [--runs 3]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from types import SimpleNamespace
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+# Must not be imported by `import lambda_function`
+HEAVY_MODULES = ('numpy', 'faiss', 'openai', 'tiktoken', 'boto3', 'youtube_transcript_api')
+VIDEO_ID = 'cold-start-check'
+# Distinct questions so the warm request is not served by the answer cache
+QUESTIONS = ('What does the speaker say about gradients?', 'Why do the basics matter?')
+
+
+def measure():
+    """
+    Runs inside the child process; prints one JSON result line
+    """
+    start = time.perf_counter()
+    import lambda_function
+    import_ms = (time.perf_counter() - start) * 1000
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    timings = []
+    for question in QUESTIONS:
+        event = {'body': json.dumps({'video_id': VIDEO_ID, 'question': question})}
+        start = time.perf_counter()
+        response = lambda_function.chat(event, None)
+        timings.append((time.perf_counter() - start) * 1000)
+        if response['statusCode'] != 200:
+            raise RuntimeError(f"chat failed: {response['body']}")
+
+    print(json.dumps({
+        'import_ms': round(import_ms, 1),
+        'heavy_modules_at_import': loaded,
+        'first_request_ms': round(timings[0], 1),
+        'warm_request_ms': round(timings[1], 1)
+    }))
+
+
+def prepare():
+    """
+    Ingest a small synthetic video into the fake S3 (not measured)
+    """
+    from bench.synthetic import synthetic_transcript
+    from utils.text_processor import chunk_text
+    from utils.embeddings import EmbeddingGenerator
+    from utils.vector_store import VectorStore
+
+    chunks = chunk_text(synthetic_transcript(10))
+    result = EmbeddingGenerator().generate_embeddings(chunks)
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    store = VectorStore(dimension=result['dimension'], embedding_backend=result['backend'])
+    store.add_vectors(result['embeddings'], chunks)
+    if not store.save_to_s3(os.environ['S3_BUCKET_NAME'], VIDEO_ID):
+        raise RuntimeError('save_to_s3 failed')
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--import-budget-ms', type=float, default=150)
+    parser.add_argument('--first-request-budget-ms', type=float, default=2000)
+    parser.add_argument('--warm-request-budget-ms', type=float, default=100)
+    parser.add_argument('--runs', type=int, default=3, help='fresh interpreters; the median is checked')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure()
+        return
+
+    from bench.run_bench import start_stand_in, configure_environment
+
+    openai_process, openai_url = start_stand_in(
+        'fake_openai.py', '--embed-latency-ms', '0', '--embed-ms-per-1k-tokens', '0',
+        '--chat-ttft-ms', '0', '--chat-tokens-per-second', '1000000'
+    )
+    s3_process, s3_url = start_stand_in('fake_s3.py', '--bucket', 'bench-bucket')
+
+    try:
+        configure_environment(openai_url, s3_url, SimpleNamespace(
+            embedding_cache=False, trace=False, embedding_model='text-embedding-3-small'
+        ))
+        prepare()
+
+        runs = []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child'],
+                check=True, capture_output=True, text=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        openai_process.kill()
+        s3_process.kill()
+
+    failures = []
+    loaded = sorted({name for run in runs for name in run['heavy_modules_at_import']})
+    if loaded:
+        failures.append(f"heavy modules imported by lambda_function at load: {', '.join(loaded)}")
+
+    for metric, budget in (('import_ms', args.import_budget_ms),
+                           ('first_request_ms', args.first_request_budget_ms),
+                           ('warm_request_ms', args.warm_request_budget_ms)):
+        value = median([run[metric] for run in runs])
+        status = 'ok' if value <= budget else 'OVER BUDGET'
+        print(f"{metric:<18} median {value:>8.1f} ms   budget {budget:>8.1f} ms   {status}")
+        if value > budget:
+            failures.append(f"{metric} {value:.1f} ms > {budget:.1f} ms")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("Cold-start budget check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Ingest memory check
+Runs the full ingest pipeline (/ingest in wait mode) on synthetic
+transcripts of increasing length, each in a fresh interpreter, and fails
+(exit 1) when peak resident memory grows with the transcript.
+
+Measured per run: peak RSS during the ingest minus RSS once the transcript
+is in memory, so the check covers what the pipeline adds on top of the
+transcript itself. The transcript and chunk texts are job artifacts and
+grow with the video (well under 1 MB per hour); vectors must not. The OpenAI
+and S3 stand-ins from bench/ run out of process.
+
+Usage:
+    python3 check_ingest_memory.py [--hours 2 20] [--max-growth-mb 24]
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from types import SimpleNamespace
+
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, parent_dir)
+
+
+def rss_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(hours):
+    """
+    Runs inside the child process; prints one JSON result line
+    """
+    from bench.synthetic import synthetic_segments
+    from bench.run_bench import fetch_stand_in
+    from utils import transcript_extractor
+    import lambda_function
+
+    video_id = f'mem-{int(hours):07d}'
+    transcript_extractor.get_transcript = fetch_stand_in({video_id: synthetic_segments(hours * 60)})
+    # Import the stage dependencies before the baseline is taken
+    import numpy, faiss, openai, boto3  # noqa: F401
+    from utils import ingest_pipeline, embeddings, vector_store, index_deltas  # noqa: F401
+
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    baseline_kb = rss_kb('VmRSS')
+
+    response = lambda_function.ingest_video(
+        {'body': json.dumps({'url': f'https://www.youtube.com/watch?v={video_id}', 'wait': True})}, None
+    )
+    body = json.loads(response['body'])
+    if response['statusCode'] != 200:
+        raise RuntimeError(f"ingest failed: {body.get('error')}")
+
+    print(json.dumps({
+        'hours': hours,
+        'chunks': body.get('chunks_count'),
+        'baseline_mb': round(baseline_kb / 1024, 1),
+        'peak_delta_mb': round((rss_kb('VmHWM') - baseline_kb) / 1024, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, nargs='+', default=[2, 20])
+    parser.add_argument('--max-growth-mb', type=float, default=24,
+                        help='allowed peak growth from the shortest to the longest transcript')
+    parser.add_argument('--child', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        measure(args.child)
+        return
+
+    from bench.run_bench import start_stand_in, configure_environment
+
+    openai_process, openai_url = start_stand_in(
+        'fake_openai.py', '--embed-latency-ms', '0', '--embed-ms-per-1k-tokens', '0'
+    )
+    s3_process, s3_url = start_stand_in('fake_s3.py', '--bucket', 'bench-bucket')
+
+    try:
+        configure_environment(openai_url, s3_url, SimpleNamespace(
+            embedding_cache=False, trace=False, embedding_model='text-embedding-3-small'
+        ))
+        runs = []
+        for hours in sorted(args.hours):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', str(hours)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            runs.append(run)
+            print(f"{run['hours']:>6g} h   {run['chunks']:>6} chunks   peak +{run['peak_delta_mb']:>7.1f} MB")
+    finally:
+        openai_process.kill()
+        s3_process.kill()
+
+    growth = runs[-1]['peak_delta_mb'] - runs[0]['peak_delta_mb']
+    if growth > args.max_growth_mb:
+        print(f"FAIL: peak memory grew {growth:.1f} MB from {runs[0]['hours']:g} h "
+              f"to {runs[-1]['hours']:g} h (budget {args.max_growth_mb:.1f} MB)")
+        sys.exit(1)
+    print(f"Ingest memory check passed (growth {growth:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@
 Local development server - wraps Lambda functions in Flask
 Run this to test the backend with the actual frontend
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import sys
@@ -17,7 +17,8 @@ load_dotenv(os.path.join(parent_dir, '.env'))
 sys.path.insert(0, parent_dir)
 
 # Import Lambda functions from parent directory
-from lambda_function import ingest_video, chat
+from lambda_function import ingest_video, ingest_status, chat, chat_batch, chat_catalog, iter_chat_stream
+from utils import tracing
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
@@ -47,6 +48,21 @@ def ingest_endpoint():
     return jsonify(body), response.get('statusCode', 200)
 
 
+@app.route('/ingest/status', methods=['GET', 'POST', 'OPTIONS'])
+def ingest_status_endpoint():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    event = lambda_event_from_flask(request)
+    event['queryStringParameters'] = dict(request.args)
+    response = ingest_status(event, {})
+
+    # Lambda returns body as JSON string, parse it
+    import json
+    body = json.loads(response.get('body', '{}'))
+    return jsonify(body), response.get('statusCode', 200)
+
+
 @app.route('/chat', methods=['POST', 'OPTIONS'])
 def chat_endpoint():
     if request.method == 'OPTIONS':
@@ -61,13 +77,63 @@ def chat_endpoint():
     return jsonify(body), response.get('statusCode', 200)
 
 
+@app.route('/chat/batch', methods=['POST', 'OPTIONS'])
+def chat_batch_endpoint():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    event = lambda_event_from_flask(request)
+    response = chat_batch(event, {})
+
+    # Lambda returns body as JSON string, parse it
+    import json
+    body = json.loads(response.get('body', '{}'))
+    return jsonify(body), response.get('statusCode', 200)
+
+
+@app.route('/chat/catalog', methods=['POST', 'OPTIONS'])
+def chat_catalog_endpoint():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    event = lambda_event_from_flask(request)
+    response = chat_catalog(event, {})
+
+    # Lambda returns body as JSON string, parse it
+    import json
+    body = json.loads(response.get('body', '{}'))
+    return jsonify(body), response.get('statusCode', 200)
+
+
+@app.route('/chat/stream', methods=['POST', 'OPTIONS'])
+def chat_stream_endpoint():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    body = request.get_json(silent=True) or {}
+    return Response(
+        stream_with_context(iter_chat_stream(body)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Per-stage p50/p95/p99 (run with TRACING_ENABLED=true TRACING_EXPORTERS=local)
+    return jsonify({'enabled': tracing.enabled(), 'metrics': tracing.summary()})
+
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("Local Development Server")
     print("="*60)
     print(f"Server running at: http://localhost:5000")
     print(f"Ingest endpoint: http://localhost:5000/ingest")
+    print(f"Ingest status endpoint: http://localhost:5000/ingest/status")
     print(f"Chat endpoint: http://localhost:5000/chat")
+    print(f"Streaming chat endpoint: http://localhost:5000/chat/stream")
+    print(f"Stage metrics: http://localhost:5000/metrics")
     print("\nUpdate frontend script.js:")
     print("const API_BASE_URL = 'http://localhost:5000';")
     print("\nPress Ctrl+C to stop")
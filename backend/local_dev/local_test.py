@@ -61,7 +61,8 @@ def test_pipeline(video_url: str, question: str):
 
     # Step 4: Create vector store (in-memory, no S3)
     print(f"\n4. Creating vector store...")
-    vector_store = VectorStore()  # Uses default dimension=1536
+    vector_store = VectorStore(dimension=embedding_result['dimension'],
+                               embedding_backend=embedding_result['backend'])
     vector_store.add_vectors(embeddings, chunks)
     print(f"✓ Vector store created with {len(chunks)} vectors")
 
@@ -49,7 +49,8 @@ def preprocess_and_upload(video_url, bucket_name):
     print(f"✓ Embeddings: {len(embeddings)}")
 
     # Create vector store
-    vector_store = VectorStore()
+    vector_store = VectorStore(dimension=embedding_result['dimension'],
+                               embedding_backend=embedding_result['backend'])
     vector_store.add_vectors(embeddings, chunks)
     print(f"✓ Vector store created")
 
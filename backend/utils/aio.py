@@ -0,0 +1,41 @@
+"""
+Async Support Module
+The async serving path (local_dev/asgi_server.py) runs blocking work (boto3
+calls, index loads, FAISS search) on one shared thread pool, so the event
+loop only ever waits on network I/O it owns
+"""
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from . import tracing
+
+_lock = threading.Lock()
+_executor = None
+
+
+def get_blocking_executor():
+    """
+    Process-wide pool for blocking calls (ASYNC_BLOCKING_WORKERS threads)
+    """
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv('ASYNC_BLOCKING_WORKERS', 32)),
+                    thread_name_prefix='blocking'
+                )
+    return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Await func(*args, **kwargs) run on the blocking pool, with the current
+    request trace carried into the worker thread
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_blocking_executor(), functools.partial(tracing.bind(func), *args, **kwargs)
+    )
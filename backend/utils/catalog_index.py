@@ -0,0 +1,433 @@
+"""
+Catalog Index Module
+Cross-video search over many per-video indexes (a course, a channel)
+
+Two ways to search several videos:
+- VideoSetSearcher: ad-hoc list of video_ids, one shard per video
+  (the existing indexes/{video_id}/ stores)
+- CatalogIndex: a named collection packed into size-bounded shards under
+  catalogs/{name}/, with HNSW once a shard is large
+
+Both expose search(query_embedding, top_k) and etag like VectorStore, so
+RAGEngine can answer over them unchanged.
+"""
+import os
+import json
+import heapq
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import faiss
+from .vector_store import VectorStore
+from .index_deltas import load_video_store
+from .embedding_backends import same_space
+from .store_cache import default_memory_budget
+from .ttl_cache import TTLCache
+from .clients import get_s3_client
+from . import tracing
+
+CATALOG_PREFIX = 'catalogs'
+
+# Loaded catalog manifests kept across warm invocations; their shards live
+# in the byte-bounded ShardCache below
+_catalog_cache = TTLCache(maxsize=16, ttl=float(os.getenv('CATALOG_CACHE_TTL_SECONDS', 300)))
+
+
+class ShardCache:
+    """
+    Process-level LRU cache of loaded catalog shards with a memory budget
+
+    - Keyed by (bucket, shard key, catalog ETag): a rebuilt catalog rewrites
+      its shard keys, and the new manifest ETag keeps old shards from being served
+    - Evicts least recently used shards by VectorStore.memory_bytes()
+    - Loads are single-flight: concurrent searches of a shard wait for one load
+    """
+
+    def __init__(self, memory_budget=None):
+        self.memory_budget = memory_budget or default_memory_budget(
+            float(os.getenv('CATALOG_CACHE_MEMORY_FRACTION', 0.2))
+        )
+        self._entries = OrderedDict()  # key -> (store, size)
+        self._loads = {}  # key -> Future of the in-flight load
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+
+    def get(self, key, load):
+        """
+        Return the cached shard for key, calling load() on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                tracing.incr('catalog_cache.hits')
+                return entry[0]
+            pending = self._loads.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._loads[key] = Future()
+
+        if not owner:
+            return pending.result()
+
+        tracing.incr('catalog_cache.misses')
+        try:
+            store = load()
+            self.put(key, store)
+            pending.set_result(store)
+            return store
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loads.pop(key, None)
+
+    def put(self, key, store):
+        """
+        Insert a shard and evict least recently used shards over budget
+        Shards larger than the whole budget are not cached
+        """
+        size = store.memory_bytes()
+        if size > self.memory_budget:
+            return False
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (store, size)
+            self.current_bytes += size
+
+            evicted = 0
+            while self.current_bytes > self.memory_budget and self._entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            current_bytes = self.current_bytes
+
+        if evicted:
+            tracing.incr('catalog_cache.evictions', evicted)
+        tracing.record('catalog_cache.bytes', current_bytes, 'Bytes')
+        return True
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.current_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+_shard_cache = ShardCache()
+
+
+def _normalized_query(query_embedding):
+    query_array = np.array(query_embedding, dtype=np.float32, ndmin=2)
+    faiss.normalize_L2(query_array)
+    return query_array
+
+
+def merge_hits(hit_lists, top_k):
+    """
+    Merge per-shard hit lists into the global top_k by score
+    """
+    return heapq.nlargest(top_k, (hit for hits in hit_lists for hit in hits), key=lambda hit: hit['score'])
+
+
+def combined_etag(etags):
+    """
+    Version of a multi-store view; None if any member has no known version
+    """
+    if not etags or any(etag is None for etag in etags):
+        return None
+    return hashlib.sha256('|'.join(etags).encode('utf-8')).hexdigest()
+
+
+class VideoSetSearcher:
+    """
+    Searches an ad-hoc set of per-video stores and merges the top_k
+    """
+
+    def __init__(self, stores):
+        """
+        stores: dict video_id -> VectorStore
+        Raises ValueError if the stores were built by different embedding backends
+        """
+        self.stores = stores
+        self.etag = combined_etag([stores[video_id].etag for video_id in sorted(stores)])
+
+        specs = [store.embedding_backend for store in stores.values()]
+        if any(not same_space(spec, specs[0]) for spec in specs[1:]):
+            raise ValueError("Videos were indexed with different embedding backends; "
+                             "re-ingest them with one EMBEDDING_MODEL")
+        self.embedding_backend = specs[0] if specs else None
+
+    @tracing.traced('catalog.search')
+    def search(self, query_embedding, top_k=3):
+        def search_one(item):
+            video_id, store = item
+            hits = store.search(query_embedding, top_k=top_k)
+            for hit in hits:
+                hit['video_id'] = video_id
+            return hits
+
+        workers = min(len(self.stores), int(os.getenv('CATALOG_SEARCH_WORKERS', 8))) or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return merge_hits(executor.map(tracing.bind(search_one), self.stores.items()), top_k)
+
+
+class CatalogIndex:
+    """
+    Named multi-video index packed into size-bounded shards
+
+    S3 layout:
+        catalogs/{name}/manifest.json
+        catalogs/{name}/shard-0000.vtx ...
+
+    Each shard lists the contiguous vector ranges of the videos it holds,
+    so a video_ids filter only touches shards containing those videos.
+    """
+
+    def __init__(self, bucket_name, name, manifest, etag=None):
+        self.bucket_name = bucket_name
+        self.name = name
+        self.manifest = manifest
+        self.etag = etag
+
+    @property
+    def embedding_backend(self):
+        return self.manifest.get('embedding_backend')
+
+    @property
+    def video_ids(self):
+        return [video['video_id'] for shard in self.manifest['shards'] for video in shard['videos']]
+
+    @staticmethod
+    def manifest_key(name):
+        return f'{CATALOG_PREFIX}/{name}/manifest.json'
+
+    @staticmethod
+    def build_shard_index(vectors):
+        """
+        Exact search for small shards, HNSW once a shard is large
+        """
+        dimension = vectors.shape[1]
+        ann_threshold = int(os.getenv('CATALOG_ANN_THRESHOLD', 20000))
+
+        if len(vectors) >= ann_threshold:
+            index = faiss.IndexHNSWFlat(dimension, int(os.getenv('CATALOG_HNSW_M', 32)))
+            index.hnsw.efConstruction = 80
+        else:
+            index = faiss.IndexFlatL2(dimension)
+
+        index.add(vectors)
+        return index
+
+    @classmethod
+    def build(cls, bucket_name, name, video_ids):
+        """
+        Pack the per-video indexes of video_ids into shards and save the catalog
+        Videos are never split across shards; all must share the embedding
+        backend of the first one, others are skipped
+        """
+        shard_max = int(os.getenv('CATALOG_SHARD_MAX_VECTORS', 100000))
+        shards = []
+        pending = {'videos': [], 'vectors': [], 'texts': [], 'time_ranges': [], 'count': 0}
+        embedding_backend = None
+
+        def flush():
+            if not pending['videos']:
+                return
+            vectors = np.vstack(pending['vectors'])
+            store = VectorStore(dimension=vectors.shape[1], embedding_backend=embedding_backend)
+            store.index = cls.build_shard_index(vectors)
+            store.texts = pending['texts']
+            if any(time_ranges is not None for time_ranges in pending['time_ranges']):
+                store.time_ranges = np.vstack([
+                    np.full((len(vectors), 2), np.nan, dtype=np.float32) if time_ranges is None else time_ranges
+                    for vectors, time_ranges in zip(pending['vectors'], pending['time_ranges'])
+                ])
+
+            key = f'{CATALOG_PREFIX}/{name}/shard-{len(shards):04d}.vtx'
+            store.save_to_s3_key(bucket_name, key)
+            shards.append({
+                'key': key,
+                'count': pending['count'],
+                'index_type': type(store.index).__name__,
+                'videos': pending['videos']
+            })
+            print(f"Catalog {name}: saved shard {key} ({pending['count']} vectors)")
+            pending.update(videos=[], vectors=[], texts=[], time_ranges=[], count=0)
+
+        for video_id in video_ids:
+            store = load_video_store(bucket_name, video_id)
+            if not store:
+                print(f"Catalog {name}: skipping {video_id} (not ingested)")
+                continue
+            if not pending['videos'] and not shards:
+                embedding_backend = store.embedding_backend
+            elif not same_space(store.embedding_backend, embedding_backend):
+                print(f"Catalog {name}: skipping {video_id} (embedding backend {store.embedding_backend} "
+                      f"differs from {embedding_backend})")
+                continue
+
+            count = store.index.ntotal
+            if pending['count'] and pending['count'] + count > shard_max:
+                flush()
+
+            pending['videos'].append({
+                'video_id': video_id,
+                'start': pending['count'],
+                'end': pending['count'] + count
+            })
+            pending['vectors'].append(store.index.reconstruct_n(0, count))
+            pending['texts'].extend(store.texts)
+            pending['time_ranges'].append(store.time_ranges)
+            pending['count'] += count
+
+        flush()
+
+        manifest = {'name': name, 'embedding_backend': embedding_backend, 'shards': shards}
+        response = get_s3_client().put_object(
+            Bucket=bucket_name,
+            Key=cls.manifest_key(name),
+            Body=json.dumps(manifest).encode('utf-8'),
+            ContentType='application/json'
+        )
+        return cls(bucket_name, name, manifest, etag=response.get('ETag'))
+
+    @classmethod
+    def load(cls, bucket_name, name):
+        """
+        Load a catalog manifest; shards are fetched lazily on first search
+        Returns None if the catalog does not exist
+        """
+        try:
+            obj = get_s3_client().get_object(Bucket=bucket_name, Key=cls.manifest_key(name))
+            manifest = json.loads(obj['Body'].read())
+            return cls(bucket_name, name, manifest, etag=obj.get('ETag'))
+
+        except Exception as e:
+            print(f"Error loading catalog {name}: {str(e)}")
+            return None
+
+    def _shard_store(self, number):
+        shard = self.manifest['shards'][number]
+
+        def load():
+            with tracing.span('catalog.load_shard'):
+                store = VectorStore.load_from_s3_key(self.bucket_name, shard['key'])
+            if hasattr(store.index, 'hnsw'):
+                store.index.hnsw.efSearch = int(os.getenv('CATALOG_HNSW_EF_SEARCH', 64))
+            return store
+
+        return _shard_cache.get((self.bucket_name, shard['key'], self.etag), load)
+
+    @tracing.traced('catalog.search_shard')
+    def _search_shard(self, number, query_array, top_k, video_filter):
+        """
+        Search one shard; with a filter, only the rows of the allowed videos
+        are searched (exactly below CATALOG_ANN_THRESHOLD rows, as unfiltered
+        shards of that size are)
+        """
+        shard = self.manifest['shards'][number]
+        store = self._shard_store(number)
+        videos = shard['videos']
+        starts = np.array([video['start'] for video in videos])
+
+        if video_filter is None:
+            k = min(top_k, shard['count'])
+            distances, indices = store.index.search(query_array, k)
+        else:
+            allowed = np.zeros(shard['count'], dtype=bool)
+            for video in videos:
+                if video['video_id'] in video_filter:
+                    allowed[video['start']:video['end']] = True
+            candidates = int(allowed.sum())
+            k = min(top_k, candidates)
+            if not k:
+                return []
+            # The selector reads the bitmap by pointer; keep it referenced
+            bitmap = np.packbits(allowed, bitorder='little')
+            selector = faiss.IDSelectorBitmap(len(allowed), faiss.swig_ptr(bitmap))
+
+            index = store.index
+            if hasattr(index, 'hnsw') and candidates >= int(os.getenv('CATALOG_ANN_THRESHOLD', 20000)):
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(index.hnsw.efSearch, k))
+            else:
+                if hasattr(index, 'hnsw'):
+                    # Brute force over the flat storage behind the graph
+                    index = faiss.downcast_index(index.storage)
+                params = faiss.SearchParameters(sel=selector)
+            distances, indices = index.search(query_array, k, params=params)
+
+        hits = []
+        for distance, idx in zip(distances[0], indices[0]):
+            if idx == -1:
+                continue
+            video = videos[int(np.searchsorted(starts, idx, side='right')) - 1]
+            hit = store.hit(idx, distance)
+            hit.update(index=int(idx - video['start']), video_id=video['video_id'])
+            hits.append(hit)
+        return hits
+
+    @tracing.traced('catalog.search')
+    def search(self, query_embedding, top_k=3, video_ids=None):
+        """
+        Top_k hits across the catalog, optionally restricted to video_ids
+        """
+        video_filter = set(video_ids) if video_ids else None
+        numbers = [
+            number for number, shard in enumerate(self.manifest['shards'])
+            if video_filter is None or any(video['video_id'] in video_filter for video in shard['videos'])
+        ]
+        if not numbers:
+            return []
+
+        query_array = _normalized_query(query_embedding)
+        workers = min(len(numbers), int(os.getenv('CATALOG_SEARCH_WORKERS', 8)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            hit_lists = executor.map(
+                tracing.bind(lambda number: self._search_shard(number, query_array, top_k, video_filter)),
+                numbers
+            )
+            return merge_hits(hit_lists, top_k)
+
+    def filtered(self, video_ids):
+        """
+        View of the catalog restricted to video_ids, usable by RAGEngine
+        """
+        return FilteredCatalog(self, video_ids)
+
+
+class FilteredCatalog:
+    """
+    A CatalogIndex with a fixed video_ids filter
+    """
+
+    def __init__(self, catalog, video_ids):
+        self.catalog = catalog
+        self.video_ids = sorted(set(video_ids))
+        self.etag = combined_etag([catalog.etag] + self.video_ids) if catalog.etag else None
+
+    @property
+    def embedding_backend(self):
+        return self.catalog.embedding_backend
+
+    def search(self, query_embedding, top_k=3):
+        return self.catalog.search(query_embedding, top_k=top_k, video_ids=self.video_ids)
+
+
+def get_catalog(bucket_name, name):
+    """
+    Return a CatalogIndex, reusing one loaded by an earlier warm invocation
+    """
+    catalog = _catalog_cache.get((bucket_name, name))
+    if catalog is None:
+        catalog = CatalogIndex.load(bucket_name, name)
+        if catalog:
+            _catalog_cache.set((bucket_name, name), catalog)
+    return catalog
@@ -0,0 +1,94 @@
+"""
+Shared Clients Module
+Process-wide OpenAI and AWS clients, created on first use and reused
+across warm Lambda invocations so their connection pools stay open
+
+The SDKs are imported lazily: a route that never calls OpenAI does not
+pay for importing it.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+_openai_clients = {}  # (api_key, max_retries) -> OpenAI
+_async_openai_clients = {}  # (api_key, max_retries) -> AsyncOpenAI
+_aws_clients = {}  # service name -> boto3 client
+
+
+def get_openai_client(api_key=None, max_retries=None):
+    """
+    Shared OpenAI client
+    Clients with a different max_retries are derived with with_options(),
+    which keeps the same underlying HTTP connection pool
+    """
+    api_key = api_key or os.getenv('OPENAI_API_KEY')
+    key = (api_key, max_retries)
+
+    client = _openai_clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            base = _openai_clients.get((api_key, None))
+            if base is None:
+                from openai import OpenAI
+                base = OpenAI(api_key=api_key)
+                _openai_clients[(api_key, None)] = base
+            client = base if max_retries is None else base.with_options(max_retries=max_retries)
+            _openai_clients[key] = client
+    return client
+
+
+def get_async_openai_client(api_key=None, max_retries=None):
+    """
+    Shared AsyncOpenAI client for the async serving path (see
+    get_openai_client); its connection pool belongs to the event loop that
+    first uses it, so one serving process runs one loop
+    """
+    api_key = api_key or os.getenv('OPENAI_API_KEY')
+    key = (api_key, max_retries)
+
+    client = _async_openai_clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _async_openai_clients.get(key)
+        if client is None:
+            base = _async_openai_clients.get((api_key, None))
+            if base is None:
+                from openai import AsyncOpenAI
+                base = AsyncOpenAI(api_key=api_key)
+                _async_openai_clients[(api_key, None)] = base
+            client = base if max_retries is None else base.with_options(max_retries=max_retries)
+            _async_openai_clients[key] = client
+    return client
+
+
+def get_aws_client(service):
+    """
+    Shared boto3 client with a pooled, keep-alive connection config
+    boto3 clients are thread-safe once created; creation itself is not
+    """
+    client = _aws_clients.get(service)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _aws_clients.get(service)
+        if client is None:
+            import boto3
+            from botocore.config import Config
+            client = boto3.client(service, config=Config(
+                max_pool_connections=int(os.getenv('AWS_MAX_POOL_CONNECTIONS', 32)),
+                tcp_keepalive=True,
+                retries={'mode': 'standard'}
+            ))
+            _aws_clients[service] = client
+    return client
+
+
+def get_s3_client():
+    return get_aws_client('s3')
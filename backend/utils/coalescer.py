@@ -0,0 +1,163 @@
+"""
+Query Coalescer Module
+Groups the retrievals of concurrent chat requests against the same loaded
+store: questions arriving within CHAT_COALESCE_WINDOW_MS of the first one
+(at most CHAT_COALESCE_MAX_BATCH) are embedded in one request and searched
+with one batched FAISS query (RAGEngine.retrieve_many), and each request
+gets its own retrieval back.
+
+Off unless CHAT_COALESCE_WINDOW_MS is set: a Lambda container serves one
+request at a time, so there is nothing to group and the window is pure
+delay. It pays off under the threaded and async local servers when many
+users ask about the same hot video.
+
+Metrics (tracing):
+- coalescer.batch_size: questions per batch
+- coalescer.batch_fill: batch size as a percentage of CHAT_COALESCE_MAX_BATCH
+- coalescer.queue_delay: time a request waited for its batch to be sent
+"""
+import os
+import time
+import asyncio
+import threading
+from . import tracing
+
+
+def coalesce_settings():
+    """
+    (window seconds, max batch size), or None when coalescing is off
+    """
+    window_ms = float(os.getenv('CHAT_COALESCE_WINDOW_MS', 0))
+    if window_ms <= 0:
+        return None
+    return window_ms / 1000, max(1, int(os.getenv('CHAT_COALESCE_MAX_BATCH', 32)))
+
+
+class _Batch:
+    """
+    Questions collected for one store during one window
+    """
+
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self.questions = []
+        self.full = None  # Event set once max_batch questions joined
+        self.done = None  # Event (threads) or Task (event loop) of the send
+        self.sent_at = None
+        self.retrievals = None
+
+
+class QueryCoalescer:
+    """
+    Coalescer for threaded servers: the first request of a batch waits out
+    the window (or until the batch is full) and runs retrieve_many for
+    everyone; the others wait for its result
+    """
+
+    def __init__(self, retrieve_many, window, max_batch):
+        """
+        retrieve_many: callable(questions, vector_store) -> retrieval dicts
+        """
+        self.retrieve_many = retrieve_many
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._open = {}  # id(vector_store) -> batch still taking questions
+
+    def _join(self, question, vector_store, new_batch):
+        """
+        Add question to the open batch of vector_store (opening one with
+        new_batch if there is none); the batch is closed once full
+        Returns (batch, position, opened)
+        """
+        key = id(vector_store)
+        batch = self._open.get(key)
+        opened = batch is None
+        if opened:
+            batch = self._open[key] = new_batch(vector_store)
+        batch.questions.append(question)
+        if len(batch.questions) >= self.max_batch:
+            del self._open[key]
+            batch.full.set()
+        return batch, len(batch.questions) - 1, opened
+
+    def _close(self, batch):
+        if self._open.get(id(batch.vector_store)) is batch:
+            del self._open[id(batch.vector_store)]
+        batch.sent_at = time.perf_counter()
+        tracing.record('coalescer.batch_size', len(batch.questions), 'None')
+        tracing.record('coalescer.batch_fill', 100 * len(batch.questions) / self.max_batch, 'Percent')
+
+    @staticmethod
+    def _failed(batch, error):
+        failure = {'success': False, 'error': f'RAG pipeline failed: {str(error)}'}
+        return [failure] * len(batch.questions)
+
+    def _result(self, batch, position, arrived):
+        tracing.record('coalescer.queue_delay', (batch.sent_at - arrived) * 1000)
+        return batch.retrievals[position]
+
+    def retrieve(self, question, vector_store):
+        """
+        Retrieval dict for question, as RAGEngine.retrieve returns it
+        """
+        arrived = time.perf_counter()
+
+        def new_batch(store):
+            batch = _Batch(store)
+            batch.full = threading.Event()
+            batch.done = threading.Event()
+            return batch
+
+        with self._lock:
+            batch, position, opened = self._join(question, vector_store, new_batch)
+
+        if not opened:
+            batch.done.wait()
+            return self._result(batch, position, arrived)
+
+        batch.full.wait(self.window)
+        with self._lock:
+            self._close(batch)
+        try:
+            with tracing.span('coalescer.retrieve'):
+                batch.retrievals = self.retrieve_many(batch.questions, batch.vector_store)
+        except Exception as e:
+            batch.retrievals = self._failed(batch, e)
+        finally:
+            batch.done.set()
+        return self._result(batch, position, arrived)
+
+
+class AsyncQueryCoalescer(QueryCoalescer):
+    """
+    Coalescer for the event loop: each batch is sent by its own task after
+    the window, so a cancelled request never strands the others
+    retrieve_many is a coroutine function; retrieve is a coroutine
+    """
+
+    async def _send(self, batch):
+        try:
+            await asyncio.wait_for(batch.full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        self._close(batch)
+        try:
+            with tracing.span('coalescer.retrieve'):
+                batch.retrievals = await self.retrieve_many(batch.questions, batch.vector_store)
+        except Exception as e:
+            batch.retrievals = self._failed(batch, e)
+
+    async def retrieve(self, question, vector_store):
+        arrived = time.perf_counter()
+
+        def new_batch(store):
+            batch = _Batch(store)
+            batch.full = asyncio.Event()
+            batch.done = asyncio.ensure_future(self._send(batch))
+            return batch
+
+        batch, position, _ = self._join(question, vector_store, new_batch)
+        # A cancelled request must not cancel the batch others await
+        await asyncio.shield(batch.done)
+        return self._result(batch, position, arrived)
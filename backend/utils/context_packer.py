@@ -0,0 +1,166 @@
+"""
+Context Packer Module
+Turns retrieved chunks into the context of the answer prompt
+
+Chunks are cut with an overlap (CHUNK_OVERLAP), so neighbouring hits repeat
+the same sentences. Neighbouring chunks of the same video are merged into
+one passage with the repeated span removed, and passages are packed
+best-first until CONTEXT_TOKEN_BUDGET tokens of context are used.
+
+Neighbours are found by time range when chunks have timestamps. Without
+them, consecutive indices only count when the texts actually overlap: rows
+of delta segments (index_deltas) are numbered after the base, so the next
+index can be any other part of the video.
+"""
+import os
+from .text_processor import count_tokens, get_encoding
+
+# Shorter suffix/prefix matches are coincidences, not chunk overlap
+MIN_OVERLAP_CHARS = 16
+# A passage cut to fewer tokens than this is left out instead
+MIN_PASSAGE_TOKENS = 64
+PASSAGE_SEPARATOR = '\n\n'
+
+
+def overlap_length(previous, following, min_chars=MIN_OVERLAP_CHARS):
+    """
+    Length of the longest suffix of previous that is also a prefix of following
+    """
+    probe = following[:min_chars]
+    if len(probe) < min_chars:
+        return 0
+
+    # The earliest match of the probe is the longest candidate overlap
+    position = previous.find(probe)
+    while position != -1:
+        if following.startswith(previous[position:]):
+            return len(previous) - position
+        position = previous.find(probe, position + 1)
+    return 0
+
+
+def _transcript_order(chunk):
+    """
+    Sort key placing a video's chunks by start time, or by index without timestamps
+    """
+    return (chunk.get('video_id') or '', chunk.get('start', chunk['index']), chunk['index'])
+
+
+def _is_covered(passage, chunk):
+    """
+    Whether chunk is already part of passage (the same hit twice)
+    """
+    if 'start' in chunk and 'end' in passage:
+        return chunk['end'] <= passage['end']
+    return chunk['index'] <= passage['last_index']
+
+
+def _continuation(passage, chunk):
+    """
+    Characters at the start of chunk repeated at the end of passage, or None
+    when chunk is not the passage's neighbour in the transcript
+    """
+    if 'start' in chunk and 'end' in passage:
+        if chunk['start'] > passage['end']:
+            return None
+        return overlap_length(passage['text'], chunk['text'])
+    if chunk['index'] != passage['last_index'] + 1:
+        return None
+    # Only a shared span shows the rows are transcript neighbours
+    return overlap_length(passage['text'], chunk['text']) or None
+
+
+def merge_chunks(chunks):
+    """
+    Group neighbouring chunks of each video into passages
+    Returns passages in transcript order: dicts with text, chunks, offsets
+    (where each chunk's text begins in the passage text), score (best chunk
+    score) and start/end when the chunks have timestamps
+    """
+    passages = []
+    for chunk in sorted(chunks, key=_transcript_order):
+        passage = passages[-1] if passages else None
+        if passage and passage['video_id'] == chunk.get('video_id'):
+            if _is_covered(passage, chunk):
+                continue
+            overlap = _continuation(passage, chunk)
+            if overlap is not None:
+                text = chunk['text']
+                if overlap:
+                    passage['offsets'].append(len(passage['text']) - overlap)
+                    passage['text'] += text[overlap:]
+                else:
+                    passage['offsets'].append(len(passage['text']) + 1)
+                    passage['text'] += ' ' + text
+                passage['last_index'] = chunk['index']
+                passage['chunks'].append(chunk)
+                passage['score'] = max(passage['score'], chunk.get('score', 0.0))
+                if 'end' in chunk:
+                    passage['end'] = chunk['end']
+                continue
+
+        passage = {
+            'video_id': chunk.get('video_id'),
+            'last_index': chunk['index'],
+            'text': chunk['text'],
+            'chunks': [chunk],
+            'offsets': [0],
+            'score': chunk.get('score', 0.0)
+        }
+        passage.update({key: chunk[key] for key in ('start', 'end') if key in chunk})
+        passages.append(passage)
+    return passages
+
+
+def truncate_tokens(text, max_tokens):
+    """
+    First max_tokens tokens of text
+    """
+    try:
+        encoding = get_encoding()
+        tokens = encoding.encode(text)
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    except Exception:
+        # Same estimate as count_tokens' fallback (1 token ≈ 4 characters)
+        return text[:max_tokens * 4]
+
+
+def pack_context(chunks, token_budget=None):
+    """
+    Build the prompt context from retrieved chunks
+    Passages go in order of relevance; one that does not fit the rest of the
+    budget is cut to it, or left out when less than MIN_PASSAGE_TOKENS remain
+    A cut passage keeps only the chunks whose text starts in the kept prefix
+    token_budget: context tokens (default CONTEXT_TOKEN_BUDGET; 0 = unlimited),
+    separators between passages included
+
+    Returns dict with context (text), chunks (the chunks packed), passages
+    and tokens (context tokens)
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', 1500))
+
+    passages = sorted(merge_chunks(chunks), key=lambda passage: -passage['score'])
+    separator_tokens = count_tokens(PASSAGE_SEPARATOR)
+    texts, packed, used = [], [], 0
+    for passage in passages:
+        text, chunks = passage['text'], passage['chunks']
+        tokens = count_tokens(text)
+        separator = separator_tokens if texts else 0
+        if token_budget and used + separator + tokens > token_budget:
+            remaining = token_budget - used - separator
+            if remaining < MIN_PASSAGE_TOKENS and texts:
+                continue
+            text = truncate_tokens(text, remaining)
+            tokens = count_tokens(text)
+            chunks = [chunk for chunk, offset in zip(chunks, passage['offsets']) if offset < len(text)]
+        texts.append(text)
+        packed.extend(chunks)
+        used += separator + tokens
+
+    return {
+        'context': PASSAGE_SEPARATOR.join(texts),
+        'chunks': packed,
+        'passages': len(texts),
+        'tokens': used
+    }
@@ -0,0 +1,219 @@
+"""
+Embedding Backends Module
+Interchangeable ways of turning texts into vectors, selected by EMBEDDING_MODEL
+
+- OpenAIEmbeddingBackend: text-embedding-3-small / -3-large / ada-002 via the API
+- HashingEmbeddingBackend ('local-hashing'): in-process NumPy feature hashing
+  of word unigrams and bigrams; no network, no model download, sub-millisecond
+  per question
+
+Every backend describes its vector space with spec() ({'model', 'dimensions'})
+and embeds into float32 matrices: embed(texts, out=None) fills out (or a new
+(len(texts), output_dimensions) matrix) and returns it; aembed() is its
+coroutine form for the async serving path.
+Indexes record the spec of the backend that built them, and queries are
+embedded with that same backend, so vector spaces are never mixed.
+"""
+import os
+import re
+import base64
+import hashlib
+from functools import lru_cache
+import numpy as np
+from .clients import get_openai_client
+
+LOCAL_HASHING_MODEL = 'local-hashing'
+# Native output sizes, so results can be preallocated before the first response
+OPENAI_DIMENSIONS = {
+    'text-embedding-3-small': 1536,
+    'text-embedding-3-large': 3072,
+    'text-embedding-ada-002': 1536
+}
+
+# Frequent function words carry no topical signal in a hashed bag of words
+STOPWORDS = frozenset("""
+a an and are as at be but by do does did for from had has have he her his how i if in into is it its
+me my of on or our she so than that the their them then there these they this to was we were what
+when where which who why will with you your
+""".split())
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+BIGRAM_WEIGHT = 0.5
+
+
+class OpenAIEmbeddingBackend:
+    """
+    Remote embeddings through the shared OpenAI client
+    Batching, concurrency, retries and caching are handled by EmbeddingGenerator
+    """
+
+    remote = True
+
+    def __init__(self, model, dimensions=None, api_key=None):
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OpenAI API key is required")
+
+        self.model = model
+        self.dimensions = dimensions
+        self.output_dimensions = dimensions or OPENAI_DIMENSIONS.get(model)
+        self.api_key = api_key
+        # Shared client (pooled connections); retries are handled per batch by the caller
+        self.client = get_openai_client(api_key, max_retries=0)
+
+    def spec(self):
+        return {'model': self.model, 'dimensions': self.dimensions}
+
+    def embed(self, texts, out=None):
+        """
+        Embeddings are requested base64-encoded (raw little-endian float32)
+        and decoded row by row straight into the matrix, never as Python floats
+        """
+        response = self.client.embeddings.create(**self._request(texts))
+        return self._decode(response, len(texts), out)
+
+    async def aembed(self, texts, out=None):
+        """
+        embed() through the shared AsyncOpenAI client
+        """
+        from .clients import get_async_openai_client
+
+        client = get_async_openai_client(self.api_key, max_retries=0)
+        response = await client.embeddings.create(**self._request(texts))
+        return self._decode(response, len(texts), out)
+
+    def _request(self, texts):
+        params = {'dimensions': self.dimensions} if self.dimensions else {}
+        return dict(input=texts, model=self.model, encoding_format='base64', **params)
+
+    @staticmethod
+    def _decode(response, count, out):
+        for item in response.data:
+            row = np.frombuffer(base64.b64decode(item.embedding), dtype='<f4')
+            if out is None:
+                out = np.empty((count, len(row)), dtype=np.float32)
+            out[item.index] = row
+        return out
+
+    @staticmethod
+    def is_retryable(error):
+        """
+        Rate limits, server errors and network failures are worth retrying
+        """
+        import openai
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code >= 500
+        return False
+
+
+@lru_cache(maxsize=1 << 18)
+def _feature_hash(feature):
+    """
+    Stable 64-bit hash of a feature string (Python's hash() is salted per process)
+    """
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _features(text):
+    """
+    Weighted unigram and bigram features of a text, stopwords removed
+    """
+    words = [word for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+    features = [(word, 1.0) for word in words]
+    features.extend((f'{first} {second}', BIGRAM_WEIGHT) for first, second in zip(words, words[1:]))
+    return features
+
+
+class HashingEmbeddingBackend:
+    """
+    Signed feature hashing into a fixed number of buckets, log-scaled counts,
+    L2-normalized rows
+
+    Lexical rather than semantic: paraphrases with no shared words score low.
+    Deterministic across processes and machines, so indexes built on one host
+    are searchable from another.
+    """
+
+    remote = False
+    BLOCK_ROWS = 1024  # rows hashed per dense block during bulk embedding
+
+    def __init__(self, dimensions=None):
+        self.model = LOCAL_HASHING_MODEL
+        self.dimensions = int(dimensions or os.getenv('LOCAL_EMBEDDING_DIMENSIONS', 512))
+        self.output_dimensions = self.dimensions
+
+    def spec(self):
+        return {'model': self.model, 'dimensions': self.dimensions}
+
+    def embed_matrix(self, texts, out=None):
+        """
+        Embed texts into a (len(texts), dimensions) float32 matrix (out if given)
+        """
+        if out is None:
+            matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        else:
+            matrix = out
+            matrix.fill(0)
+        for start in range(0, len(texts), self.BLOCK_ROWS):
+            block = texts[start:start + self.BLOCK_ROWS]
+            rows, columns, weights = [], [], []
+            for row, text in enumerate(block):
+                for feature, weight in _features(text):
+                    hashed = _feature_hash(feature)
+                    rows.append(row)
+                    columns.append(hashed % self.dimensions)
+                    # The top bit picks the sign so collisions cancel on average
+                    weights.append(weight if hashed >> 63 else -weight)
+
+            if not rows:
+                continue
+            flat = np.asarray(rows, dtype=np.int64) * self.dimensions + np.asarray(columns, dtype=np.int64)
+            counts = np.bincount(flat, weights=weights, minlength=len(block) * self.dimensions)
+            matrix[start:start + len(block)] = counts.reshape(len(block), self.dimensions)
+
+        np.copysign(np.log1p(np.abs(matrix)), matrix, out=matrix)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        # Texts without features stay all-zero rather than NaN
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed(self, texts, out=None):
+        return self.embed_matrix(texts, out)
+
+    async def aembed(self, texts, out=None):
+        # Sub-millisecond for questions; not worth a thread hop
+        return self.embed_matrix(texts, out)
+
+    @staticmethod
+    def is_retryable(error):
+        return False
+
+
+def get_embedding_backend(model=None, dimensions=None, api_key=None):
+    """
+    Backend for an EMBEDDING_MODEL value
+    """
+    model = model or os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+    if model == LOCAL_HASHING_MODEL:
+        return HashingEmbeddingBackend(dimensions)
+    return OpenAIEmbeddingBackend(model, dimensions, api_key)
+
+
+def backend_spec(model=None, dimensions=None):
+    """
+    Spec the backend for model would report, without constructing it
+    (no API key or client needed)
+    """
+    model = model or os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+    if model == LOCAL_HASHING_MODEL:
+        return {'model': model, 'dimensions': int(dimensions or os.getenv('LOCAL_EMBEDDING_DIMENSIONS', 512))}
+    return {'model': model, 'dimensions': dimensions}
+
+
+def same_space(spec, other):
+    """
+    Whether two backend specs produce comparable vectors
+    """
+    spec, other = spec or {}, other or {}
+    return (spec.get('model'), spec.get('dimensions')) == (other.get('model'), other.get('dimensions'))
@@ -0,0 +1,252 @@
+"""
+Embedding Cache Module
+Content-addressed cache of chunk embeddings shared across ingests
+"""
+import os
+import hashlib
+import threading
+import numpy as np
+from .clients import get_s3_client
+from . import tracing
+
+
+def embedding_key(model, dimensions, text):
+    """
+    Cache key: hash of (model, dimensions, chunk text)
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{model}\0{dimensions or 'default'}\0".encode('utf-8'))
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache
+    - Local disk (e.g. Lambda /tmp) for repeat work inside a warm container,
+      capped at EMBEDDING_CACHE_MAX_BYTES: the least recently used files are
+      evicted, since /tmp is shared with the index spill files
+    - S3 under the existing bucket: one pack object per name (the video_id
+      for ingest jobs) holding a sorted key index and the vectors of every
+      chunk the ingests of that name embedded. An S3 request costs about as
+      much as embedding one chunk, so per-chunk objects would cost what they
+      save; a pack is one GET and at most one PUT per ingest
+    Vectors are stored as raw little-endian float32 bytes
+    Failed reads and writes never fail an ingest; each call logs one summary
+    warning for them
+    """
+
+    def __init__(self, bucket_name=None, cache_dir=None, prefix='embedding-cache', pack=None):
+        """
+        bucket_name: S3 bucket for the shared tier (None disables it)
+        cache_dir: local directory for the disk tier
+        pack: name of the S3 pack to read and extend (None disables the S3
+        tier); call flush() once everything is embedded
+        """
+        self.bucket_name = bucket_name
+        self.cache_dir = cache_dir or os.getenv('EMBEDDING_CACHE_DIR', '/tmp/embedding-cache')
+        self.prefix = prefix
+        self.pack = pack
+        # 0 disables the disk tier
+        self.max_bytes = int(os.getenv('EMBEDDING_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        self.s3_client = get_s3_client() if bucket_name and pack else None
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # measured on first write
+        self._pack_lock = threading.Lock()
+        self._packs = {}  # (model, dimensions) -> (sorted binary keys, vectors) of the S3 pack
+        self._pending = {}  # (model, dimensions) -> {binary key: data} the pack lacks
+
+    def _local_files(self):
+        """
+        (mtime, size, path) of every file of the disk tier
+        """
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _reserve_local(self, size):
+        """
+        Account for size new bytes on disk, evicting the least recently used
+        files down to 80% of max_bytes when the cap would be exceeded
+        The running total is approximate (overwrites, failed writes) and is
+        re-measured from the directory whenever eviction runs
+        """
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(file_size for _, file_size, _ in self._local_files())
+            self._disk_bytes += size
+            if self._disk_bytes <= self.max_bytes:
+                return
+
+            evicted = 0
+            target = int(self.max_bytes * 0.8)
+            files = sorted(self._local_files())
+            self._disk_bytes = sum(file_size for _, file_size, _ in files) + size
+            for _, file_size, path in files:
+                if self._disk_bytes <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                self._disk_bytes -= file_size
+                evicted += 1
+        tracing.incr('embedding_cache.disk_evictions', evicted)
+
+    def _local_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.f32')
+
+    def _s3_key(self, model, dimensions):
+        return f"{self.prefix}/{model}/{dimensions or 'default'}/packs/{self.pack}.pack"
+
+    def _read_local(self, key):
+        if not self.max_bytes:
+            return None
+        path = self._local_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Mark as recently used for eviction
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write_local(self, key, data):
+        """
+        Returns the error, or None
+        """
+        if not self.max_bytes:
+            return None
+        path = self._local_path(key)
+        try:
+            self._reserve_local(len(data))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            return None
+        except OSError as e:
+            return e
+
+    def _load_pack(self, model, dimensions):
+        """
+        (sorted binary keys, float32 vectors) of the S3 pack, empty when it
+        does not exist yet; fetched once per cache
+        Pack layout: count and dimension (uint32), count 32-byte keys, vectors
+        """
+        with self._pack_lock:
+            pack = self._packs.get((model, dimensions))
+            if pack is not None:
+                return pack
+
+            pack = (np.empty(0, dtype='S32'), np.empty((0, 0), dtype='<f4'))
+            try:
+                obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=self._s3_key(model, dimensions))
+                data = obj['Body'].read()
+                count, dimension = (int(value) for value in np.frombuffer(data, dtype='<u4', count=2))
+                keys = np.frombuffer(data, dtype='S32', count=count, offset=8)
+                vectors = np.frombuffer(data, dtype='<f4', offset=8 + 32 * count).reshape(count, dimension)
+                pack = (keys, vectors)
+            except self.s3_client.exceptions.NoSuchKey:
+                pass
+            except Exception as e:
+                self._warn('S3 read', [e], 1)
+            self._packs[(model, dimensions)] = pack
+            return pack
+
+    def _add_pending(self, model, dimensions, binary_key, data):
+        with self._pack_lock:
+            self._pending.setdefault((model, dimensions), {})[bytes(binary_key)] = data
+
+    def flush(self):
+        """
+        Write the S3 pack extended with the embeddings it lacked, one PUT per
+        model; nothing is written when the pack already had everything
+        """
+        if not self.s3_client:
+            return
+        with self._pack_lock:
+            pending, self._pending = self._pending, {}
+
+        for (model, dimensions), entries in pending.items():
+            keys = np.array(list(entries), dtype='S32')
+            vectors = np.vstack([np.frombuffer(data, dtype='<f4') for data in entries.values()])
+            pack_keys, pack_vectors = self._packs.get((model, dimensions), (None, None))
+            if pack_keys is not None and len(pack_keys):
+                keys = np.concatenate([pack_keys, keys])
+                vectors = np.vstack([pack_vectors, vectors])
+            order = np.argsort(keys)
+            keys, vectors = keys[order], np.ascontiguousarray(vectors[order], dtype='<f4')
+
+            body = np.array(vectors.shape, dtype='<u4').tobytes() + keys.tobytes() + vectors.tobytes()
+            try:
+                self.s3_client.put_object(Bucket=self.bucket_name, Key=self._s3_key(model, dimensions), Body=body)
+                self._packs[(model, dimensions)] = (keys, vectors)
+                tracing.record('embedding_cache.pack_bytes', len(body), 'Bytes')
+            except Exception as e:
+                self._warn('S3 write', [e], len(entries))
+
+    @staticmethod
+    def _warn(operation, errors, total):
+        """
+        One warning per call for the failed reads or writes of a tier
+        """
+        errors = [error for error in errors if error is not None]
+        if errors:
+            tracing.incr('embedding_cache.errors', len(errors))
+            print(f"Warning: embedding cache {operation} failed for {len(errors)}/{total} "
+                  f"embeddings: {str(errors[0])}")
+
+    @tracing.traced('embedding_cache.get')
+    def get_many(self, model, dimensions, texts):
+        """
+        Look up embeddings for texts
+        Returns a list aligned with texts: vector (read-only float32 array) or None on miss
+        """
+        keys = [embedding_key(model, dimensions, text) for text in texts]
+        found = [self._read_local(key) for key in keys]
+
+        if self.s3_client and keys:
+            # Second tier: local misses come from the S3 pack; local hits the
+            # pack lacks are added to it for ingests on other containers
+            pack_keys, pack_vectors = self._load_pack(model, dimensions)
+            binary_keys = np.array([bytes.fromhex(key) for key in keys], dtype='S32')
+            positions = np.searchsorted(pack_keys, binary_keys)
+            disk_errors = []
+            for i, position in enumerate(positions):
+                in_pack = position < len(pack_keys) and pack_keys[position] == binary_keys[i]
+                if in_pack and found[i] is None:
+                    found[i] = pack_vectors[position].tobytes()
+                    disk_errors.append(self._write_local(keys[i], found[i]))
+                elif not in_pack and found[i] is not None:
+                    self._add_pending(model, dimensions, binary_keys[i], found[i])
+            self._warn('disk write', disk_errors, len(disk_errors))
+
+        return [
+            np.frombuffer(data, dtype='<f4') if data is not None else None
+            for data in found
+        ]
+
+    @tracing.traced('embedding_cache.put')
+    def put_many(self, model, dimensions, texts, embeddings):
+        """
+        Store freshly generated embeddings on disk; they reach S3 in the pack
+        written by flush()
+        """
+        disk_errors = []
+        for text, embedding in zip(texts, embeddings):
+            key = embedding_key(model, dimensions, text)
+            data = np.asarray(embedding, dtype='<f4').tobytes()
+            disk_errors.append(self._write_local(key, data))
+            if self.s3_client:
+                self._add_pending(model, dimensions, bytes.fromhex(key), data)
+        self._warn('disk write', disk_errors, len(disk_errors))
@@ -1,51 +1,176 @@
 """
 Embeddings Module
-Handles creation of vector embeddings using OpenAI API
+Handles creation of vector embeddings through a pluggable backend
+(OpenAI API or in-process, see embedding_backends.py)
 """
 import os
-from openai import OpenAI
+import time
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .text_processor import count_tokens
+from .embedding_backends import get_embedding_backend
+from .aio import run_blocking
+from . import tracing
+
+# OpenAI limits: 2048 inputs and 300k tokens per request, 8191 tokens per input
+MAX_INPUTS_PER_REQUEST = 2048
 
 
 class EmbeddingGenerator:
     """
-    Generates embeddings for text chunks using OpenAI's embedding models
+    Generates embeddings for text chunks with the backend chosen by model
     """
 
-    def __init__(self, api_key=None, model="text-embedding-3-small"):
+    def __init__(self, api_key=None, model=None, dimensions=None, cache=None):
         """
-        Initialize with OpenAI API key
-        model options:
+        model options (default: EMBEDDING_MODEL, else text-embedding-3-small):
         - text-embedding-3-small: 1536 dimensions, $0.02/1M tokens
         - text-embedding-3-large: 3072 dimensions, $0.13/1M tokens
+        - local-hashing: in-process, LOCAL_EMBEDDING_DIMENSIONS (512) dimensions, free
+        dimensions: optional output size (text-embedding-3 models and local-hashing)
+        cache: optional EmbeddingCache; only cache misses are sent to the API
+        (ignored for in-process backends, which are cheaper than a lookup)
+        """
+        self.backend = get_embedding_backend(model, dimensions, api_key)
+        self.model = self.backend.model
+        self.dimensions = self.backend.dimensions
+        self.cache = cache if self.backend.remote else None
+
+        # Batching and concurrency limits
+        self.batch_tokens = int(os.getenv('EMBEDDING_BATCH_TOKENS', 20000))
+        self.batch_size = min(int(os.getenv('EMBEDDING_BATCH_SIZE', 256)), MAX_INPUTS_PER_REQUEST)
+        self.max_workers = int(os.getenv('EMBEDDING_MAX_WORKERS', 4))
+        self.max_retries = int(os.getenv('EMBEDDING_MAX_RETRIES', 5))
+
+    def make_batches(self, texts, token_counts=None):
+        """
+        Split texts into batches bounded by token count and input count
+        token_counts: tokens of each text when already known (else counted)
+        Returns list of (start, end) index ranges into texts
+        """
+        batches = []
+        start = 0
+        batch_tokens = 0
+
+        for i, text in enumerate(texts):
+            tokens = count_tokens(text) if token_counts is None else token_counts[i]
+            batch_full = (
+                batch_tokens + tokens > self.batch_tokens or
+                i - start >= self.batch_size
+            )
+            if batch_full and i > start:
+                batches.append((start, i))
+                start = i
+                batch_tokens = 0
+            batch_tokens += tokens
+
+        if start < len(texts):
+            batches.append((start, len(texts)))
+
+        return batches
+
+    def _embed_batch(self, texts, out=None):
+        """
+        Embed one batch into out (or a new float32 matrix), retrying with
+        exponential backoff on 429/5xx
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with tracing.span('embeddings.request'):
+                    return self.backend.embed(texts, out)
+
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, e))
+
+    def _retry_delay(self, attempt, error):
         """
-        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
-        if not self.api_key:
-            raise ValueError("OpenAI API key is required")
+        Backoff before retrying a failed batch; re-raises errors that are
+        not retryable or out of attempts
+        """
+        if attempt >= self.max_retries or not self.backend.is_retryable(error):
+            raise error
+        tracing.incr('embeddings.retries')
+        delay = min(0.5 * (2 ** attempt), 20) * (0.5 + random.random())
+        print(f"Embedding batch failed ({type(error).__name__}), retrying in {delay:.1f}s")
+        return delay
 
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = model
+    def _plan_batches(self, texts):
+        """
+        Batches of texts to send; a token is at least one UTF-8 byte, so
+        inputs that fit one batch by byte count (e.g. questions) skip token
+        counting entirely
+        """
+        fits_one_batch = (
+            len(texts) <= self.batch_size and
+            sum(len(text.encode('utf-8')) for text in texts) <= self.batch_tokens
+        )
+        return [(0, len(texts))] if fits_one_batch else self.make_batches(texts)
 
+    def _embed_texts(self, texts):
+        """
+        Embed texts via the API in token-bounded batches sent concurrently,
+        each decoded into its rows of one preallocated float32 matrix
+        In-process backends embed everything in one vectorized call
+        Returns (matrix in input order, number of batches)
+        """
+        if not texts:
+            return np.zeros((0, self.backend.output_dimensions or 0), dtype=np.float32), 0
+
+        if not self.backend.remote:
+            return self._embed_batch(texts), 1
+
+        batches = self._plan_batches(texts)
+
+        pending = batches
+        if self.backend.output_dimensions:
+            matrix = np.empty((len(texts), self.backend.output_dimensions), dtype=np.float32)
+        else:
+            # Model of unknown size: the first batch tells
+            start, end = batches[0]
+            first = self._embed_batch(texts[start:end])
+            matrix = np.empty((len(texts), first.shape[1]), dtype=np.float32)
+            matrix[start:end] = first
+            pending = batches[1:]
+
+        def embed(batch):
+            self._embed_batch(texts[batch[0]:batch[1]], matrix[batch[0]:batch[1]])
+
+        if len(pending) == 1:
+            embed(pending[0])
+        elif pending:
+            workers = min(self.max_workers, len(pending))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Batches write disjoint row ranges of the matrix
+                list(executor.map(tracing.bind(embed), pending))
+
+        return matrix, len(batches)
+
+    @tracing.traced('embeddings.generate')
     def generate_embeddings(self, texts):
         """
         Generate embeddings for list of text chunks
-        Returns list of embedding vectors
+        Cached chunks are reused; the rest are split into token-bounded
+        batches sent concurrently
+        Returns the embeddings as one (len(texts), dimension) float32 matrix
+        in the original order
         """
         try:
-            # OpenAI API accepts list of texts
-            response = self.client.embeddings.create(
-                input=texts,
-                model=self.model
-            )
+            if self.cache and texts:
+                cached = self.cache.get_many(self.model, self.dimensions, texts)
+            else:
+                cached = [None] * len(texts)
 
-            # Extract embedding vectors
-            embeddings = [item.embedding for item in response.data]
+            misses = self._group_misses(texts, cached)
+            miss_texts = list(misses)
+            fresh, batch_count = self._embed_texts(miss_texts)
+            embeddings = self._assemble(texts, cached, misses, fresh)
 
-            return {
-                'success': True,
-                'embeddings': embeddings,
-                'dimension': len(embeddings[0]) if embeddings else 0,
-                'count': len(embeddings)
-            }
+            if self.cache and miss_texts:
+                self.cache.put_many(self.model, self.dimensions, miss_texts, fresh)
+
+            return self._result(texts, embeddings, misses, batch_count)
 
         except Exception as e:
             return {
@@ -53,6 +178,69 @@ class EmbeddingGenerator:
                 'error': f'Embedding generation failed: {str(e)}'
             }
 
+    @staticmethod
+    def _group_misses(texts, cached):
+        """
+        Texts without a cached embedding, grouped so repeated chunks are
+        embedded once: {text: [positions]}
+        """
+        misses = {}
+        for i, embedding in enumerate(cached):
+            if embedding is None:
+                misses.setdefault(texts[i], []).append(i)
+        return misses
+
+    @staticmethod
+    def _assemble(texts, cached, misses, fresh):
+        """
+        Result matrix in input order from cache hits and fresh embeddings
+        (fresh rows follow the order of misses)
+        """
+        if len(misses) == len(texts):
+            # Nothing cached, nothing repeated: the batches already decoded
+            # into the result in input order
+            return fresh
+
+        dimension = fresh.shape[1] if misses else len(next(e for e in cached if e is not None))
+        embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+        for i, embedding in enumerate(cached):
+            if embedding is not None:
+                embeddings[i] = embedding
+        if misses:
+            positions = [i for indices in misses.values() for i in indices]
+            rows = [row for row, indices in enumerate(misses.values()) for _ in indices]
+            embeddings[positions] = fresh[rows]
+        return embeddings
+
+    def _result(self, texts, embeddings, misses, batch_count):
+        cache_hits = len(texts) - sum(len(indices) for indices in misses.values())
+        if self.cache:
+            tracing.incr('embeddings.cache_hits', cache_hits)
+
+        return {
+            'success': True,
+            'embeddings': embeddings,
+            'dimension': embeddings.shape[1] if len(texts) else 0,
+            'count': len(texts),
+            'batches': batch_count,
+            'backend': self.backend.spec(),
+            'cache_hits': cache_hits,
+            'cache_hit_ratio': cache_hits / len(texts) if texts else 0.0
+        }
+
+    def embed_blocks(self, blocks):
+        """
+        Embed an iterable of text blocks one block at a time, so only one
+        block of vectors is held at once (streaming ingest)
+        Yields (float32 matrix, generate_embeddings result) per block;
+        raises RuntimeError on the first failed block
+        """
+        for texts in blocks:
+            result = self.generate_embeddings(texts)
+            if not result['success']:
+                raise RuntimeError(result['error'])
+            yield result.pop('embeddings'), result
+
     def generate_single_embedding(self, text):
         """
         Generate embedding for single text
@@ -65,3 +253,91 @@ class EmbeddingGenerator:
                 'embedding': result['embeddings'][0]
             }
         return result
+
+
+class AsyncEmbeddingGenerator(EmbeddingGenerator):
+    """
+    EmbeddingGenerator for the async serving path: the same batching, retries
+    and caching, with requests sent through AsyncOpenAI and concurrent
+    batches run as tasks (at most EMBEDDING_MAX_WORKERS in flight)
+    generate_embeddings, generate_single_embedding and embed_blocks are
+    coroutines (an async generator for embed_blocks)
+    """
+
+    async def _embed_batch(self, texts, out=None):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with tracing.span('embeddings.request'):
+                    return await self.backend.aembed(texts, out)
+
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+
+    async def _embed_texts(self, texts):
+        if not texts:
+            return np.zeros((0, self.backend.output_dimensions or 0), dtype=np.float32), 0
+
+        if not self.backend.remote:
+            return await self._embed_batch(texts), 1
+
+        batches = self._plan_batches(texts)
+
+        pending = batches
+        if self.backend.output_dimensions:
+            matrix = np.empty((len(texts), self.backend.output_dimensions), dtype=np.float32)
+        else:
+            start, end = batches[0]
+            first = await self._embed_batch(texts[start:end])
+            matrix = np.empty((len(texts), first.shape[1]), dtype=np.float32)
+            matrix[start:end] = first
+            pending = batches[1:]
+
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def embed(batch):
+            async with slots:
+                await self._embed_batch(texts[batch[0]:batch[1]], matrix[batch[0]:batch[1]])
+
+        await asyncio.gather(*(embed(batch) for batch in pending))
+        return matrix, len(batches)
+
+    @tracing.traced('embeddings.generate')
+    async def generate_embeddings(self, texts):
+        try:
+            if self.cache and texts:
+                cached = await run_blocking(self.cache.get_many, self.model, self.dimensions, texts)
+            else:
+                cached = [None] * len(texts)
+
+            misses = self._group_misses(texts, cached)
+            miss_texts = list(misses)
+            fresh, batch_count = await self._embed_texts(miss_texts)
+            embeddings = self._assemble(texts, cached, misses, fresh)
+
+            if self.cache and miss_texts:
+                await run_blocking(self.cache.put_many, self.model, self.dimensions, miss_texts, fresh)
+
+            return self._result(texts, embeddings, misses, batch_count)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Embedding generation failed: {str(e)}'
+            }
+
+    async def embed_blocks(self, blocks):
+        for texts in blocks:
+            result = await self.generate_embeddings(texts)
+            if not result['success']:
+                raise RuntimeError(result['error'])
+            yield result.pop('embeddings'), result
+
+    async def generate_single_embedding(self, text):
+        result = await self.generate_embeddings([text])
+
+        if result['success']:
+            return {
+                'success': True,
+                'embedding': result['embeddings'][0]
+            }
+        return result
@@ -0,0 +1,389 @@
+"""
+Index Deltas Module
+Incremental updates of a per-video index: delta segments, tombstones, compaction
+
+S3 layout next to the base index:
+    indexes/{video_id}/index.vtx              base segment (full ingest or compaction)
+    indexes/{video_id}/deltas/000001.vtx ...  appended segments, VTX files as well
+    indexes/{video_id}/manifest.json          live view of base + deltas
+
+Manifest:
+    {"version": 3, "base_etag": "...", "base_count": 1200,
+     "deltas": [{"key": "...", "count": 12}], "tombstones": [17, 18, 1203]}
+
+Rows are numbered globally across base then deltas in manifest order; a
+tombstone hides a replaced or deleted row. The manifest only applies to the
+base whose ETag it names, so a full re-ingest or a compaction that rewrote
+index.vtx makes a stale manifest inert.
+
+An update diffs the new chunks against the live ones by chunk_ids
+(index_format.chunk_ids, read with ranged GETs), embeds only the new chunks,
+uploads them as one delta and tombstones the rows that disappeared.
+Compaction folds deltas and tombstones back into a single base.
+"""
+import os
+import json
+import time
+import numpy as np
+from .vector_store import VectorStore, INDEX_FILE, mmr_settings, diversify
+from .index_format import chunk_ids
+from .clients import get_s3_client
+from . import tracing
+
+MANIFEST_FILE = 'manifest.json'
+DELTA_DIR = 'deltas'
+
+
+def base_key(video_id):
+    return f'indexes/{video_id}/{INDEX_FILE}'
+
+
+def manifest_key(video_id):
+    return f'indexes/{video_id}/{MANIFEST_FILE}'
+
+
+def delta_key(video_id, version):
+    return f'indexes/{video_id}/{DELTA_DIR}/{version:06d}.vtx'
+
+
+def read_manifest(bucket_name, video_id):
+    """
+    Returns (manifest, ETag), or (None, None) when the video has no deltas
+    """
+    s3_client = get_s3_client()
+    try:
+        obj = s3_client.get_object(Bucket=bucket_name, Key=manifest_key(video_id))
+        return json.loads(obj['Body'].read()), obj.get('ETag')
+    except s3_client.exceptions.NoSuchKey:
+        return None, None
+
+
+def write_manifest(bucket_name, video_id, manifest, expected_etag):
+    """
+    Replace the manifest only if it is still the one the update was planned
+    against (If-Match, or If-None-Match when there was none)
+    Raises RuntimeError when another update got there first
+    """
+    from botocore.exceptions import ClientError, ParamValidationError
+
+    s3_client = get_s3_client()
+    condition = {'IfMatch': expected_etag} if expected_etag else {'IfNoneMatch': '*'}
+    params = {
+        'Bucket': bucket_name,
+        'Key': manifest_key(video_id),
+        'Body': json.dumps(manifest).encode('utf-8'),
+        'ContentType': 'application/json'
+    }
+    try:
+        return s3_client.put_object(**params, **condition).get('ETag')
+    except ParamValidationError:
+        # botocore without conditional writes; the ingest lock still serializes updates
+        return s3_client.put_object(**params).get('ETag')
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+            raise RuntimeError(f'Index of {video_id} changed during the update; re-submit the ingest')
+        raise
+
+
+def clear_deltas(bucket_name, video_id):
+    """
+    Delete the manifest and delta segments (after a full ingest wrote a new base)
+    Raises RuntimeError when a key could not be deleted; the manifest left
+    behind names the old base ETag, so it no longer applies, but its delta
+    segments stay in the bucket
+    """
+    s3_client = get_s3_client()
+    keys = [manifest_key(video_id)]
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=f'indexes/{video_id}/{DELTA_DIR}/'):
+        keys.extend(item['Key'] for item in page.get('Contents', []))
+    for start in range(0, len(keys), 1000):
+        response = s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]], 'Quiet': True}
+        )
+        # Quiet mode only lists the keys that failed
+        errors = response.get('Errors', [])
+        if errors:
+            raise RuntimeError(f"Failed to delete {len(errors)} index delta objects of {video_id}: "
+                               f"{errors[0].get('Key')}: {errors[0].get('Message')}")
+
+
+def _segment_chunk_ids(bucket_name, key):
+    """
+    chunk_ids of a stored segment and its ETag; ranged reads only, unless
+    the file predates the chunk_ids section
+    """
+    header, data_start, etag = VectorStore.read_s3_header(bucket_name, key)
+    ids = VectorStore.read_s3_section(bucket_name, key, header, data_start, 'chunk_ids')
+    if ids is None:
+        store = VectorStore.load_from_s3_key(bucket_name, key)
+        ids = chunk_ids(store.texts, store.time_ranges)
+    return ids, etag
+
+
+@tracing.traced('index_deltas.plan')
+def plan_update(bucket_name, video_id, chunks, time_ranges=None):
+    """
+    Diff new chunks against the live rows of the stored index
+    Returns {'added': [chunk positions to embed], 'removed': [global rows to
+    tombstone], 'base_etag', 'manifest_etag', 'version'}; None when an
+    incremental update does not pay off (more than INDEX_DELTA_MAX_FRACTION
+    of the chunks changed) and the video should be re-ingested in full
+    """
+    manifest, manifest_etag = read_manifest(bucket_name, video_id)
+    base_ids, base_etag = _segment_chunk_ids(bucket_name, base_key(video_id))
+    if manifest and manifest['base_etag'] != base_etag:
+        # Left over from before the base was rewritten; replaced on apply
+        manifest = None
+
+    live_ids = [base_ids]
+    for delta in (manifest or {}).get('deltas', []):
+        live_ids.append(_segment_chunk_ids(bucket_name, delta['key'])[0])
+    live_ids = np.concatenate(live_ids)
+    alive = np.ones(len(live_ids), dtype=bool)
+    alive[(manifest or {}).get('tombstones', [])] = False
+
+    # Multiset match: each new chunk claims one live row with the same id
+    rows_by_id = {}
+    for row in np.flatnonzero(alive)[::-1]:
+        rows_by_id.setdefault(int(live_ids[row]), []).append(int(row))
+
+    added = []
+    if time_ranges is not None:
+        time_ranges = np.asarray(time_ranges, dtype=np.float32)
+    for position, chunk_id in enumerate(chunk_ids(chunks, time_ranges)):
+        rows = rows_by_id.get(int(chunk_id))
+        if rows:
+            rows.pop()
+        else:
+            added.append(position)
+    removed = sorted(row for rows in rows_by_id.values() for row in rows)
+
+    max_fraction = float(os.getenv('INDEX_DELTA_MAX_FRACTION', 0.5))
+    if chunks and len(added) > max_fraction * len(chunks):
+        return None
+
+    return {
+        'added': added,
+        'removed': removed,
+        'base_etag': base_etag,
+        'base_count': int(len(base_ids)),
+        'manifest_etag': manifest_etag,
+        'version': (manifest or {}).get('version', 0) + 1
+    }
+
+
+@tracing.traced('index_deltas.apply')
+def apply_update(bucket_name, video_id, plan, delta_count=0):
+    """
+    Publish a manifest with the new tombstones and, when chunks were added,
+    the delta segment of delta_count rows already uploaded to
+    delta_key(video_id, plan['version'])
+    Returns the new manifest
+    """
+    manifest, _ = read_manifest(bucket_name, video_id)
+    if not manifest or manifest['base_etag'] != plan['base_etag']:
+        manifest = {'base_etag': plan['base_etag'], 'base_count': plan['base_count'],
+                    'deltas': [], 'tombstones': []}
+
+    manifest = dict(manifest, version=plan['version'], updated_at=time.time())
+    if delta_count:
+        key = delta_key(video_id, plan['version'])
+        manifest['deltas'] = manifest['deltas'] + [{'key': key, 'count': int(delta_count)}]
+    manifest['tombstones'] = sorted(set(manifest['tombstones']) | set(plan['removed']))
+
+    write_manifest(bucket_name, video_id, manifest, plan['manifest_etag'])
+    return manifest
+
+
+def needs_compaction(manifest):
+    """
+    Whether deltas or tombstones have grown enough to fold into the base
+    (INDEX_COMPACT_MAX_DELTAS segments, INDEX_COMPACT_TOMBSTONE_FRACTION dead rows)
+    """
+    if not manifest:
+        return False
+    total = manifest['base_count'] + sum(delta['count'] for delta in manifest['deltas'])
+    return (len(manifest['deltas']) >= int(os.getenv('INDEX_COMPACT_MAX_DELTAS', 4))
+            or len(manifest['tombstones']) > float(os.getenv('INDEX_COMPACT_TOMBSTONE_FRACTION', 0.2)) * total)
+
+
+@tracing.traced('index_deltas.compact')
+def compact(bucket_name, video_id):
+    """
+    Rewrite base + deltas - tombstones as a single base and drop the deltas
+    Returns the number of live rows, or None if there was nothing to compact
+    """
+    store = load_video_index(bucket_name, video_id)
+    if not isinstance(store, SegmentedVectorStore):
+        return None
+
+    merged = store.flattened()
+    merged.quantize()
+    if not merged.save_to_s3(bucket_name, video_id):
+        raise RuntimeError('Failed to save compacted index to S3')
+    # The manifest now names an old base ETag and no longer applies
+    clear_deltas(bucket_name, video_id)
+    return int(merged.index.ntotal)
+
+
+class SegmentedVectorStore:
+    """
+    Read-only union of a base VectorStore and its delta segments, minus
+    tombstoned rows; search merges per-segment results by distance (then
+    MMR re-ranks them like VectorStore.search)
+    Offers the search API of VectorStore (search, search_batch, hit,
+    memory_bytes, etag, embedding_backend)
+    """
+
+    def __init__(self, segments, tombstones, etag=None):
+        self.segments = segments
+        self.starts = np.cumsum([0] + [segment.index.ntotal for segment in segments])
+        self.dead = np.zeros(self.starts[-1], dtype=bool)
+        self.dead[list(tombstones)] = True
+        self.etag = etag
+        self.embedding_backend = segments[0].embedding_backend
+        self.chunking = segments[0].chunking
+
+    @property
+    def ntotal(self):
+        return int(self.starts[-1] - self.dead.sum())
+
+    def hit(self, idx, distance):
+        number = int(np.searchsorted(self.starts, idx, side='right')) - 1
+        result = self.segments[number].hit(idx - self.starts[number], distance)
+        result['index'] = int(idx)
+        return result
+
+    @tracing.traced('vector_store.search')
+    def search(self, query_embedding, top_k=3):
+        return self._search_matrix([query_embedding], top_k)[0]
+
+    @tracing.traced('vector_store.search_batch')
+    def search_batch(self, query_embeddings, top_k=3):
+        return self._search_matrix(query_embeddings, top_k)
+
+    def _search_matrix(self, query_embeddings, top_k):
+        if len(query_embeddings) == 0:
+            return []
+
+        query_array = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        dimension = self.segments[0].index.d
+        if query_array.shape[1] != dimension:
+            raise ValueError(f"Query has {query_array.shape[1]} dimensions, index has {dimension}; "
+                             "it was built with a different embedding backend")
+        query_array /= np.maximum(np.linalg.norm(query_array, axis=1, keepdims=True), 1e-12)
+
+        settings = mmr_settings(top_k)
+        fetch = settings[1] if settings else top_k
+        all_distances, all_rows = [], []
+        for number, segment in enumerate(self.segments):
+            start, end = int(self.starts[number]), int(self.starts[number + 1])
+            # Over-fetch by the dead rows of this segment so enough live rows survive
+            k = min(fetch + int(self.dead[start:end].sum()), end - start)
+            if k == 0:
+                continue
+            distances, indices = segment.index.search(query_array, k)
+            all_distances.append(distances)
+            all_rows.append(np.where(indices == -1, -1, indices + start))
+
+        if not all_distances:
+            return [[] for _ in range(len(query_embeddings))]
+        distances = np.hstack(all_distances)
+        rows = np.hstack(all_rows)
+
+        results = []
+        for row_distances, row_indices in zip(distances, rows):
+            order = np.argsort(row_distances, kind='stable')
+            live = [position for position in order
+                    if row_indices[position] != -1 and not self.dead[row_indices[position]]]
+            live = np.array(live[:fetch], dtype=np.int64)
+            candidates, candidate_distances = diversify(row_indices[live], row_distances[live], top_k,
+                                                        self.reconstruct_batch)
+            results.append([self.hit(idx, distance) for idx, distance in zip(candidates, candidate_distances)])
+        return results
+
+    def reconstruct_batch(self, rows):
+        """
+        Vectors of global rows (MMR candidates)
+        """
+        numbers = np.searchsorted(self.starts, rows, side='right') - 1
+        vectors = np.empty((len(rows), self.segments[0].index.d), dtype=np.float32)
+        for number in np.unique(numbers):
+            mask = numbers == number
+            vectors[mask] = self.segments[number].index.reconstruct_batch(rows[mask] - self.starts[number])
+        return vectors
+
+    def memory_bytes(self):
+        return sum(segment.memory_bytes() for segment in self.segments) + self.dead.nbytes
+
+    def flattened(self):
+        """
+        Live rows copied into one in-memory VectorStore (compaction, catalogs)
+        """
+        base = self.segments[0]
+        merged = VectorStore(dimension=base.index.d, embedding_backend=base.embedding_backend)
+        merged.chunking = base.chunking
+        for number, segment in enumerate(self.segments):
+            start, end = int(self.starts[number]), int(self.starts[number + 1])
+            live = np.flatnonzero(~self.dead[start:end])
+            if len(live) == 0:
+                continue
+            vectors = segment.index.reconstruct_n(0, end - start)[live]
+            time_ranges = segment.time_ranges[live] if segment.time_ranges is not None else None
+            merged.add_vectors(vectors, [segment.texts[int(i)] for i in live], time_ranges)
+        return merged
+
+
+@tracing.traced('index_deltas.load')
+def load_video_index(bucket_name, video_id):
+    """
+    Searchable index of a video: a plain VectorStore, or a
+    SegmentedVectorStore when deltas apply to the stored base
+    Returns None if the video has not been ingested
+    """
+    base = VectorStore.load_from_s3(bucket_name, video_id)
+    if base is None:
+        return None
+
+    try:
+        manifest, manifest_etag = read_manifest(bucket_name, video_id)
+    except Exception as e:
+        print(f"Warning: failed to read index manifest of {video_id}: {str(e)}")
+        return base
+    if not manifest or manifest['base_etag'] != base.etag:
+        return base
+
+    segments = [base] + [VectorStore.load_from_s3_key(bucket_name, delta['key']) for delta in manifest['deltas']]
+    return SegmentedVectorStore(segments, manifest['tombstones'], etag=manifest_etag)
+
+
+def load_video_store(bucket_name, video_id):
+    """
+    Like load_video_index, but always a single VectorStore (deltas merged)
+    """
+    store = load_video_index(bucket_name, video_id)
+    if isinstance(store, SegmentedVectorStore):
+        return store.flattened()
+    return store
+
+
+def video_index_etag(bucket_name, video_id):
+    """
+    Version of the live index, as load_video_index would set it: the
+    manifest ETag while the manifest applies to the stored base, otherwise
+    the base ETag (a manifest naming another base is ignored, like on load)
+    """
+    base_etag = VectorStore.get_s3_etag(bucket_name, video_id)
+    if base_etag is None:
+        return None
+
+    try:
+        manifest, manifest_etag = read_manifest(bucket_name, video_id)
+    except Exception as e:
+        print(f"Warning: failed to read index manifest of {video_id}: {str(e)}")
+        return base_etag
+    if manifest and manifest['base_etag'] == base_etag:
+        return manifest_etag
+    return base_etag
@@ -0,0 +1,327 @@
+"""
+Index File Format Module
+Versioned single-file layout for a video index, loadable with mmap
+
+Layout (all integers little-endian):
+    magic            8 bytes   b'VTXINDEX'
+    format version   uint32
+    header length    uint32
+    header           UTF-8 JSON: {"meta": {...}, "sections": {name: {...}}}
+    sections         64-byte aligned blocks, offsets relative to the data start
+
+Standard sections:
+    vectors          float32 or float16 matrix (count x dimension), contiguous
+    text_offsets     uint64 array (count + 1) into text_blob
+    text_blob        UTF-8 chunk texts back to back
+    time_ranges      optional float32 (count x 2) start/end seconds of each chunk
+    chunk_ids        optional uint64 content hash of each chunk (see chunk_ids);
+                     lets an incremental ingest diff chunks with a ranged read
+"""
+import json
+import hashlib
+import mmap
+import shutil
+import struct
+import tempfile
+import numpy as np
+import faiss
+
+MAGIC = b'VTXINDEX'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sII')
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SpilledSection:
+    """
+    Section data held in a temporary file rather than in memory
+    dtype and shape are given for array sections, omitted for byte sections
+    """
+
+    COPY_BYTES = 1024 * 1024
+
+    def __init__(self, fileobj, length, dtype=None, shape=None):
+        self.fileobj = fileobj
+        self.length = length
+        self.dtype = dtype
+        self.shape = shape
+
+    def copy_to(self, fileobj):
+        self.fileobj.seek(0)
+        shutil.copyfileobj(self.fileobj, fileobj, self.COPY_BYTES)
+
+
+def write_index_file(fileobj, meta, sections):
+    """
+    Write meta (JSON-serializable dict) and named sections to a binary file
+    sections: dict name -> numpy array, bytes or SpilledSection
+    """
+    layout = {}
+    offset = 0
+    for name, data in sections.items():
+        if isinstance(data, np.ndarray):
+            length = data.nbytes
+            layout[name] = {'offset': offset, 'length': length,
+                            'dtype': data.dtype.str, 'shape': list(data.shape)}
+        elif isinstance(data, SpilledSection):
+            length = data.length
+            layout[name] = {'offset': offset, 'length': length}
+            if data.dtype is not None:
+                layout[name].update(dtype=np.dtype(data.dtype).str, shape=list(data.shape))
+        else:
+            length = len(data)
+            layout[name] = {'offset': offset, 'length': length}
+        offset = _align(offset + length)
+
+    header = json.dumps({'meta': meta, 'sections': layout}).encode('utf-8')
+    fileobj.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+    fileobj.write(header)
+
+    position = PREAMBLE.size + len(header)
+    data_start = _align(position)
+    fileobj.write(b'\0' * (data_start - position))
+
+    position = 0
+    for name, data in sections.items():
+        spec = layout[name]
+        fileobj.write(b'\0' * (spec['offset'] - position))
+        if isinstance(data, SpilledSection):
+            data.copy_to(fileobj)
+        else:
+            fileobj.write(data.tobytes() if isinstance(data, np.ndarray) else data)
+        position = spec['offset'] + spec['length']
+
+
+def header_size(buffer):
+    """
+    Bytes from the start of the file needed to parse the header
+    buffer must hold at least the preamble
+    """
+    magic, _, header_length = PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a VTX index file")
+    return PREAMBLE.size + header_length
+
+
+def read_header(buffer):
+    """
+    Parse the preamble and JSON header from the start of an index file
+    Returns (header dict, data start offset)
+    """
+    magic, version, header_length = PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a VTX index file")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format version {version}")
+
+    header_end = PREAMBLE.size + header_length
+    header = json.loads(bytes(buffer[PREAMBLE.size:header_end]).decode('utf-8'))
+    return header, _align(header_end)
+
+
+def read_index_file(path):
+    """
+    Map an index file into memory without copying
+    Returns (meta, sections) where array sections are numpy views on the mapping
+    and byte sections are uint8 arrays
+    """
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    header, data_start = read_header(mapping)
+
+    sections = {}
+    for name, spec in header['sections'].items():
+        offset = data_start + spec['offset']
+        if 'dtype' in spec:
+            dtype = np.dtype(spec['dtype'])
+            count = spec['length'] // dtype.itemsize
+            array = np.frombuffer(mapping, dtype=dtype, count=count, offset=offset)
+            sections[name] = array.reshape(spec['shape'])
+        else:
+            sections[name] = np.frombuffer(mapping, dtype=np.uint8, count=spec['length'], offset=offset)
+
+    return header['meta'], sections
+
+
+def chunk_ids(texts, time_ranges=None):
+    """
+    uint64 identity of each chunk: hash of its text and its start/end time
+    (to the hundredth of a second), so re-timed captions count as changed
+    """
+    ids = np.empty(len(texts), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8)
+        if time_ranges is not None and not np.isnan(time_ranges[i, 0]):
+            digest.update(f'|{time_ranges[i, 0]:.2f}|{time_ranges[i, 1]:.2f}'.encode('ascii'))
+        ids[i] = int.from_bytes(digest.digest(), 'little')
+    return ids
+
+
+def encode_texts(texts):
+    """
+    Pack texts into (uint64 offsets, UTF-8 blob)
+    """
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    return offsets, b''.join(encoded)
+
+
+class StreamingIndexWriter:
+    """
+    Builds a flat VTX file from blocks of vectors and texts without holding
+    them: vectors and UTF-8 texts are spilled to temporary files as they
+    arrive, only per-chunk metadata (text lengths, time ranges, chunk ids,
+    24-32 bytes a chunk) stays in memory
+    """
+
+    def __init__(self, vector_dtype='float32', spill_dir=None):
+        self.vector_dtype = np.dtype(vector_dtype)
+        self.dimension = None
+        self.count = 0
+        self._vectors = tempfile.TemporaryFile(dir=spill_dir)
+        self._texts = tempfile.TemporaryFile(dir=spill_dir)
+        self._text_lengths = []
+        self._time_ranges = []
+        self._chunk_ids = []
+        self._has_time_ranges = False
+
+    def add(self, vectors, texts, time_ranges=None):
+        """
+        Append a block: (n, dimension) vectors (L2-normalized here, in place
+        for a float32 matrix), n texts and optionally their (n, 2) start/end seconds
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+        elif vectors.shape[1] != self.dimension:
+            raise ValueError(f"Block has {vectors.shape[1]} dimensions, index has {self.dimension}")
+        faiss.normalize_L2(vectors)
+        self._vectors.write(vectors.astype(self.vector_dtype, copy=False).tobytes())
+
+        encoded = [text.encode('utf-8') for text in texts]
+        self._texts.write(b''.join(encoded))
+        self._text_lengths.append(np.fromiter(map(len, encoded), dtype=np.uint64, count=len(encoded)))
+
+        if time_ranges is None:
+            time_ranges = np.full((len(texts), 2), np.nan, dtype=np.float32)
+        else:
+            time_ranges = np.asarray(time_ranges, dtype=np.float32).reshape(len(texts), 2)
+            self._has_time_ranges = True
+        self._time_ranges.append(time_ranges)
+        self._chunk_ids.append(chunk_ids(texts, time_ranges))
+        self.count += len(texts)
+
+    def write(self, fileobj, meta):
+        """
+        Write the VTX file; meta gets count and dimension filled in
+        """
+        meta = dict(meta, count=self.count, dimension=self.dimension)
+        lengths = np.concatenate(self._text_lengths) if self._text_lengths else np.zeros(0, dtype=np.uint64)
+        text_offsets = np.zeros(self.count + 1, dtype=np.uint64)
+        text_offsets[1:] = np.cumsum(lengths)
+
+        sections = {
+            'vectors': SpilledSection(self._vectors, self._vectors.tell(),
+                                      self.vector_dtype, (self.count, self.dimension or 0)),
+            'text_offsets': text_offsets,
+            'text_blob': SpilledSection(self._texts, self._texts.tell())
+        }
+        if self._has_time_ranges:
+            sections['time_ranges'] = np.concatenate(self._time_ranges)
+        sections['chunk_ids'] = np.concatenate(self._chunk_ids) if self._chunk_ids else np.zeros(0, dtype=np.uint64)
+        write_index_file(fileobj, meta, sections)
+
+    def close(self):
+        self._vectors.close()
+        self._texts.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TextTable:
+    """
+    Read-only sequence of chunk texts backed by an offsets table and UTF-8 blob
+    A text is only decoded when it is accessed
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + len(self.blob)
+
+
+class MappedFlatIndex:
+    """
+    Exact L2 index over a memory-mapped vector block
+    Implements the subset of the FAISS index API used by VectorStore
+    (d, ntotal, search, reconstruct_n, reconstruct_batch) without copying
+    vectors into FAISS
+    """
+
+    BLOCK_ROWS = 65536  # float16 vectors are upcast one block at a time
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.ntotal, self.d = vectors.shape
+
+    def search(self, queries, k):
+        queries = np.ascontiguousarray(queries, dtype='float32')
+        if self.vectors.dtype == np.float32:
+            return faiss.knn(queries, self.vectors, k)
+
+        all_distances, all_indices = [], []
+        for start in range(0, self.ntotal, self.BLOCK_ROWS):
+            block = self.vectors[start:start + self.BLOCK_ROWS].astype('float32')
+            distances, indices = faiss.knn(queries, block, min(k, len(block)))
+            all_distances.append(distances)
+            all_indices.append(indices + start)
+
+        distances = np.hstack(all_distances)
+        indices = np.hstack(all_indices)
+        order = np.argsort(distances, axis=1)[:, :k]
+        return np.take_along_axis(distances, order, 1), np.take_along_axis(indices, order, 1)
+
+    def reconstruct_n(self, start, count):
+        return np.asarray(self.vectors[start:start + count], dtype='float32')
+
+    def reconstruct_batch(self, keys):
+        return np.asarray(self.vectors[np.asarray(keys)], dtype='float32')
+
+    def to_faiss(self):
+        """
+        Copy into a mutable FAISS IndexFlatL2 (needed before adding vectors)
+        """
+        index = faiss.IndexFlatL2(self.d)
+        if self.ntotal:
+            index.add(self.reconstruct_n(0, self.ntotal))
+        return index
+
+    @property
+    def nbytes(self):
+        return self.vectors.nbytes
@@ -0,0 +1,787 @@
+"""
+Ingest Pipeline Module
+Runs video ingestion as a job of separate stages executed by workers
+
+Stages: fetch -> chunk -> embed -> save -> compact
+Each stage persists its output as a job artifact, so a failed or retried
+stage resumes from the last completed one instead of starting over.
+
+Backends:
+- S3JobStore + SQSJobQueue when INGEST_QUEUE_URL is set (Lambda workers)
+- LocalJobStore + LocalJobQueue otherwise (in-process threads for development)
+
+Stage dependencies are imported inside the stage functions, so the status
+route and queue plumbing load without numpy, faiss, openai or tiktoken.
+
+Ingest is idempotent per video_id:
+- a stored index built with the current embedding backend and chunking is
+  reused as is (find_compatible_index reads only its header)
+- concurrent submissions of one video join a single job: in-process through
+  a registry of running jobs, across processes through an S3 lock object
+  written with If-None-Match (IngestLock)
+
+A refresh job (new captions of a live stream or premiere, corrected
+transcripts) fetches the transcript again, bypassing the transcript cache,
+and when a compatible index exists embeds only the chunks that changed and
+stores them as a delta segment (index_deltas). The compact stage folds
+deltas back into the base once they pile up.
+"""
+import os
+import io
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .clients import get_s3_client, get_aws_client
+from . import tracing
+
+STAGES = ['fetch', 'chunk', 'embed', 'save', 'compact']
+JOB_PREFIX = 'jobs'
+LOCK_PREFIX = 'locks/ingest'
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+# Jobs started by this process: video_id -> job_id, job_id -> Event set when it ends
+_inflight_lock = threading.Lock()
+_inflight = {}
+_finished = {}
+
+
+def chunking_params():
+    return {
+        'chunk_size': int(os.getenv('CHUNK_SIZE', 500)),
+        'overlap': int(os.getenv('CHUNK_OVERLAP', 50))
+    }
+
+
+def new_job(video_url, refresh=False):
+    now = time.time()
+    return {
+        'job_id': uuid.uuid4().hex,
+        'url': video_url,
+        'video_id': None,
+        'refresh': refresh,
+        'status': 'queued',
+        'stage': STAGES[0],
+        'progress': 0.0,
+        'stages': {stage: {'status': 'pending'} for stage in STAGES},
+        'result': None,
+        'error': None,
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+class LocalJobStore:
+    """
+    In-memory job records and artifacts (single process, development only)
+    Only the last INGEST_LOCAL_MAX_FINISHED_JOBS finished jobs are kept
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._artifacts = {}
+        self._files = set()  # (job_id, name) of artifacts that are file paths
+        self._finished = OrderedDict()  # job_id -> None, oldest finished first
+        self.max_finished = int(os.getenv('INGEST_LOCAL_MAX_FINISHED_JOBS', 100))
+        self._lock = threading.Lock()
+
+    def save_job(self, job):
+        job['updated_at'] = time.time()
+        with self._lock:
+            self._jobs[job['job_id']] = json.loads(json.dumps(job))
+            # A resumed job is running again and no longer up for eviction
+            self._finished.pop(job['job_id'], None)
+            if job['status'] in FINISHED_STATUSES:
+                self._finished[job['job_id']] = None
+            while len(self._finished) > self.max_finished:
+                evicted, _ = self._finished.popitem(last=False)
+                del self._jobs[evicted]
+                self._drop_artifacts(evicted)
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def put_artifact(self, job_id, name, value):
+        with self._lock:
+            self._artifacts[(job_id, name)] = value
+
+    def get_artifact(self, job_id, name):
+        with self._lock:
+            return self._artifacts[(job_id, name)]
+
+    def put_artifact_file(self, job_id, name, path):
+        """
+        Keep a file artifact (a VTX index on local disk) by path
+        """
+        self.put_artifact(job_id, name, path)
+        with self._lock:
+            self._files.add((job_id, name))
+
+    def delete_artifacts(self, job_id):
+        """
+        Drop the stage outputs of a job (its record stays)
+        """
+        with self._lock:
+            self._drop_artifacts(job_id)
+
+    def _drop_artifacts(self, job_id):
+        for key in [key for key in self._artifacts if key[0] == job_id]:
+            value = self._artifacts.pop(key)
+            # File artifacts not published yet still sit on local disk
+            if key in self._files:
+                self._files.discard(key)
+                if os.path.exists(value):
+                    os.unlink(value)
+
+    def publish_artifact_file(self, job_id, name, bucket_name, key):
+        """
+        Upload a file artifact to bucket/key; returns the ETag
+        """
+        from .vector_store import VectorStore
+        path = self.get_artifact(job_id, name)
+        with open(path, 'rb') as f:
+            etag = VectorStore.upload_index_file(bucket_name, key, f)
+        os.unlink(path)
+        return etag
+
+
+class S3JobStore:
+    """
+    Job records and stage artifacts under jobs/{job_id}/ in the index bucket
+    """
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+        self.s3_client = get_s3_client()
+
+    def save_job(self, job):
+        job['updated_at'] = time.time()
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=f"{JOB_PREFIX}/{job['job_id']}/job.json",
+            Body=json.dumps(job).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+    def get_job(self, job_id):
+        try:
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=f'{JOB_PREFIX}/{job_id}/job.json')
+            return json.loads(obj['Body'].read())
+        except self.s3_client.exceptions.NoSuchKey:
+            return None
+
+    def put_artifact(self, job_id, name, value):
+        import numpy as np
+        if isinstance(value, np.ndarray):
+            buffer = io.BytesIO()
+            np.save(buffer, value)
+            body, key = buffer.getvalue(), f'{JOB_PREFIX}/{job_id}/{name}.npy'
+        else:
+            body, key = json.dumps(value).encode('utf-8'), f'{JOB_PREFIX}/{job_id}/{name}.json'
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=body)
+
+    def get_artifact(self, job_id, name):
+        try:
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=f'{JOB_PREFIX}/{job_id}/{name}.json')
+            return json.loads(obj['Body'].read())
+        except self.s3_client.exceptions.NoSuchKey:
+            import numpy as np
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=f'{JOB_PREFIX}/{job_id}/{name}.npy')
+            return np.load(io.BytesIO(obj['Body'].read()))
+
+    def put_artifact_file(self, job_id, name, path):
+        """
+        Stream a local file artifact (a VTX index) to jobs/{job_id}/{name}.vtx
+        and remove the local copy
+        """
+        from .vector_store import VectorStore
+        with open(path, 'rb') as f:
+            VectorStore.upload_index_file(self.bucket_name, f'{JOB_PREFIX}/{job_id}/{name}.vtx', f)
+        os.unlink(path)
+
+    def publish_artifact_file(self, job_id, name, bucket_name, key):
+        """
+        Server-side copy of a file artifact to bucket/key (multipart for
+        large files, nothing passes through this process); returns the ETag
+        """
+        self.s3_client.copy(
+            {'Bucket': self.bucket_name, 'Key': f'{JOB_PREFIX}/{job_id}/{name}.vtx'}, bucket_name, key
+        )
+        return self.s3_client.head_object(Bucket=bucket_name, Key=key).get('ETag')
+
+    def delete_artifacts(self, job_id):
+        """
+        Delete the stage outputs under jobs/{job_id}/, keeping job.json for
+        the status route (the bucket's lifecycle rule expires it later)
+        """
+        record = f'{JOB_PREFIX}/{job_id}/job.json'
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=f'{JOB_PREFIX}/{job_id}/'):
+            keys = [item['Key'] for item in page.get('Contents', []) if item['Key'] != record]
+            if keys:
+                self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+                )
+
+
+def _stage_fetch(job, store):
+    from .transcript_extractor import get_transcript
+
+    transcript_result = get_transcript(job['url'], use_cache=not job.get('refresh'))
+    if not transcript_result['success']:
+        raise RuntimeError(transcript_result['error'])
+
+    job['video_id'] = transcript_result['video_id']
+    segments = transcript_result['segments']
+    store.put_artifact(job['job_id'], 'transcript', segments.to_dict())
+    return {
+        'transcript_length': len(segments.text),
+        'segments_count': len(segments),
+        'transcript_cached': transcript_result.get('cached', False)
+    }
+
+
+def _stage_chunk(job, store):
+    from .text_processor import chunk_text, chunk_segments
+    from .segments import SegmentTable
+
+    transcript = store.get_artifact(job['job_id'], 'transcript')
+    params = chunking_params()
+
+    if isinstance(transcript, str):
+        # Jobs fetched before segments were kept: plain text, no timestamps
+        chunks = chunk_text(transcript, **params)
+        time_ranges = None
+    else:
+        chunks, time_ranges = chunk_segments(SegmentTable.from_dict(transcript), **params)
+    store.put_artifact(job['job_id'], 'chunks', chunks)
+    store.put_artifact(job['job_id'], 'time_ranges', time_ranges)
+    return {'chunks_count': len(chunks)}
+
+
+def _stage_embed(job, store):
+    """
+    Embed the chunks block by block and stream the vectors into a VTX index
+    file on local disk (spilled, so memory stays flat however long the
+    video); the file is the stage's artifact
+    """
+    import tempfile
+    from .embeddings import EmbeddingGenerator
+    from .embedding_cache import EmbeddingCache
+    from .index_format import StreamingIndexWriter
+    from .vector_store import VectorStore, flat_index_meta
+
+    chunks = store.get_artifact(job['job_id'], 'chunks')
+    time_ranges = store.get_artifact(job['job_id'], 'time_ranges')
+    bucket_name = os.getenv('S3_BUCKET_NAME')
+    embedding_model = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+
+    embedding_cache = None
+    if os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true':
+        embedding_cache = EmbeddingCache(bucket_name=bucket_name, pack=job['video_id'])
+    embedder = EmbeddingGenerator(model=embedding_model, cache=embedding_cache)
+
+    # Refresh of a compatible index: embed only the chunks that changed
+    plan = None
+    if job.get('refresh') and find_compatible_index(bucket_name, job['video_id']):
+        from .index_deltas import plan_update
+        plan = plan_update(bucket_name, job['video_id'], chunks, time_ranges)
+    store.put_artifact(job['job_id'], 'update_plan', plan)
+
+    positions = list(range(len(chunks))) if plan is None else plan['added']
+    if not positions:
+        if plan is None:
+            raise RuntimeError('No chunks to embed')
+        return {'embedding_cache_hit_ratio': 1.0}
+
+    block_size = int(os.getenv('INGEST_EMBED_BLOCK_CHUNKS', 256))
+    blocks = [positions[start:start + block_size] for start in range(0, len(positions), block_size)]
+    vector_dtype = os.getenv('INDEX_VECTOR_DTYPE', 'float32')
+    cache_hits = 0
+
+    spill_dir = os.getenv('INDEX_CACHE_DIR', '/tmp')
+    os.makedirs(spill_dir, exist_ok=True)
+    with StreamingIndexWriter(vector_dtype, spill_dir=spill_dir) as writer:
+        embedded = embedder.embed_blocks([chunks[position] for position in block] for block in blocks)
+        for block, (vectors, result) in zip(blocks, embedded):
+            writer.add(
+                vectors,
+                [chunks[position] for position in block],
+                None if time_ranges is None else [time_ranges[position] for position in block]
+            )
+            cache_hits += result['cache_hits']
+        if embedding_cache:
+            embedding_cache.flush()
+
+        meta = flat_index_meta(0, 0, embedder.backend.spec(), chunking_params(), vector_dtype)
+        with tempfile.NamedTemporaryFile(dir=spill_dir, suffix='.vtx', delete=False) as f:
+            writer.write(f, meta)
+
+    path = f.name
+    if os.getenv('INDEX_TYPE', 'flat') != 'flat':
+        # Train the configured quantized index on the mapped flat file
+        index_store = VectorStore.load_from_file(path)
+        if index_store.quantize() != 'flat':
+            with tempfile.NamedTemporaryFile(dir=spill_dir, suffix='.vtx', delete=False) as f:
+                index_store.save_to_file(f)
+            os.unlink(path)
+            path = f.name
+        del index_store
+    store.put_artifact_file(job['job_id'], 'index', path)
+
+    return {'embedding_cache_hit_ratio': round(cache_hits / len(positions), 4)}
+
+
+def _stage_save(job, store):
+    """
+    Publish the index file built by the embed stage: as the video's base
+    index, or as one delta segment for a refresh
+    """
+    from .store_cache import get_store_cache
+    from .index_deltas import apply_update, clear_deltas, base_key, delta_key
+
+    plan = store.get_artifact(job['job_id'], 'update_plan')
+    bucket_name = os.getenv('S3_BUCKET_NAME')
+
+    if plan is not None and not plan['added'] and not plan['removed']:
+        return {'incremental': True, 'chunks_added': 0, 'chunks_removed': 0}
+
+    if plan is not None:
+        # Only the added chunks were embedded; they become one delta segment
+        if plan['added']:
+            store.publish_artifact_file(
+                job['job_id'], 'index', bucket_name, delta_key(job['video_id'], plan['version'])
+            )
+        manifest = apply_update(bucket_name, job['video_id'], plan, delta_count=len(plan['added']))
+        get_store_cache().invalidate(job['video_id'])
+        return {
+            'incremental': True,
+            'chunks_added': len(plan['added']),
+            'chunks_removed': len(plan['removed']),
+            'index_version': manifest['version']
+        }
+
+    result = {'incremental': False} if job.get('refresh') else {}
+    if bucket_name:
+        store.publish_artifact_file(job['job_id'], 'index', bucket_name, base_key(job['video_id']))
+        # Deltas of the previous base no longer apply
+        try:
+            clear_deltas(bucket_name, job['video_id'])
+        except Exception as e:
+            # The new base is live and ignores the old manifest; only cleanup failed
+            print(f"Error: failed to clear index deltas of {job['video_id']}: {str(e)}")
+            tracing.incr('index_deltas.clear_errors')
+            result['clear_deltas_error'] = str(e)
+
+        # Drop any warm copy of a previous ingest of this video
+        get_store_cache().invalidate(job['video_id'])
+
+    return result
+
+
+def _stage_compact(job, store):
+    """
+    Fold delta segments into the base once needs_compaction says so
+    Runs as its own stage (its own queue message), after the update is live
+    """
+    from .index_deltas import read_manifest, needs_compaction, compact
+    from .store_cache import get_store_cache
+
+    bucket_name = os.getenv('S3_BUCKET_NAME')
+    if not bucket_name or not needs_compaction(read_manifest(bucket_name, job['video_id'])[0]):
+        return {}
+
+    compact(bucket_name, job['video_id'])
+    get_store_cache().invalidate(job['video_id'])
+    return {'compacted': True}
+
+
+STAGE_FUNCTIONS = {
+    'fetch': _stage_fetch,
+    'chunk': _stage_chunk,
+    'embed': _stage_embed,
+    'save': _stage_save,
+    'compact': _stage_compact
+}
+
+
+def run_stage(store, job_id, stage):
+    """
+    Execute one stage of a job and record its status and timing
+    Returns the next stage name, or None when the job is finished or failed
+    A stage that already completed is skipped (safe under redelivery)
+    """
+    job = store.get_job(job_id)
+    if job is None:
+        print(f"Ingest job not found: {job_id}")
+        return None
+
+    # Jobs created before a stage was added have no entry for it
+    stage_info = job['stages'].setdefault(stage, {'status': 'pending'})
+    index = STAGES.index(stage)
+    next_stage = STAGES[index + 1] if index + 1 < len(STAGES) else None
+
+    if stage_info['status'] == 'succeeded':
+        return next_stage
+
+    stage_info.update(status='running', started_at=time.time())
+    job.update(status='running', stage=stage)
+    store.save_job(job)
+
+    try:
+        print(f"Ingest job {job_id}: running stage {stage}")
+        # A top-level trace on worker threads, a span inside a traced handler
+        with tracing.request(f'ingest.{stage}', request_id=job_id):
+            output = STAGE_FUNCTIONS[stage](job, store)
+
+    except Exception as e:
+        finished = time.time()
+        stage_info.update(status='failed', finished_at=finished,
+                          duration_ms=round((finished - stage_info['started_at']) * 1000, 1))
+        job.update(status='failed', error=str(e))
+        store.save_job(job)
+        _job_finished(store, job)
+        print(f"Ingest job {job_id} failed in stage {stage}: {str(e)}")
+        return None
+
+    finished = time.time()
+    stage_info.update(status='succeeded', finished_at=finished,
+                      duration_ms=round((finished - stage_info['started_at']) * 1000, 1))
+    job['result'] = dict(job['result'] or {}, **output)
+    job['progress'] = round((index + 1) / len(STAGES), 2)
+
+    if next_stage:
+        job['stage'] = next_stage
+    else:
+        job['status'] = 'succeeded'
+        job['result']['video_id'] = job['video_id']
+    store.save_job(job)
+    if stage == 'save':
+        # The index is live and save is recorded as done, so no retry reads
+        # the artifacts again; a failed job keeps them to resume from
+        _delete_artifacts(store, job_id)
+    if not next_stage:
+        _job_finished(store, job)
+
+    return next_stage
+
+
+def _delete_artifacts(store, job_id):
+    try:
+        store.delete_artifacts(job_id)
+    except Exception as e:
+        # Left to the bucket's lifecycle rule for jobs/
+        print(f"Warning: failed to delete artifacts of ingest job {job_id}: {str(e)}")
+
+
+def run_job(store, job_id):
+    """
+    Run all remaining stages of a job in the calling thread
+    """
+    stage = STAGES[0]
+    while stage:
+        stage = run_stage(store, job_id, stage)
+    return store.get_job(job_id)
+
+
+class LocalJobQueue:
+    """
+    In-process stand-in for the job queue: stages run on a thread pool
+    """
+
+    def __init__(self, store, max_workers=None):
+        self.store = store
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv('INGEST_WORKERS', 4)),
+            thread_name_prefix='ingest'
+        )
+
+    def enqueue(self, job_id, stage):
+        self.executor.submit(self._work, job_id, stage)
+
+    def _work(self, job_id, stage):
+        next_stage = run_stage(self.store, job_id, stage)
+        if next_stage:
+            self.enqueue(job_id, next_stage)
+
+
+class SQSJobQueue:
+    """
+    Amazon SQS job queue; messages are consumed by the ingest_worker Lambda
+    """
+
+    def __init__(self, queue_url):
+        self.queue_url = queue_url
+        self.sqs_client = get_aws_client('sqs')
+
+    def enqueue(self, job_id, stage):
+        self.sqs_client.send_message(
+            QueueUrl=self.queue_url,
+            MessageBody=json.dumps({'job_id': job_id, 'stage': stage})
+        )
+
+
+_backend = None
+
+
+def get_job_backend():
+    """
+    Return the process-wide (job store, job queue) pair
+    """
+    global _backend
+    if _backend is None:
+        queue_url = os.getenv('INGEST_QUEUE_URL')
+        if queue_url:
+            store = S3JobStore(os.getenv('S3_BUCKET_NAME'))
+            _backend = (store, SQSJobQueue(queue_url))
+        else:
+            store = LocalJobStore()
+            _backend = (store, LocalJobQueue(store))
+    return _backend
+
+
+def find_compatible_index(bucket_name, video_id):
+    """
+    Meta of the stored index of video_id if it was built with the current
+    embedding backend and chunking parameters and carries timestamps;
+    None when the video needs (re)ingesting. Reads only the index header.
+    """
+    from .vector_store import VectorStore
+    from .embedding_backends import backend_spec, same_space
+
+    if not bucket_name:
+        return None
+    header = VectorStore.get_s3_header(bucket_name, video_id)
+    if header is None:
+        return None
+
+    meta = header['meta']
+    if not same_space(meta.get('embedding_backend'), backend_spec()):
+        return None
+    if meta.get('chunking') != chunking_params() or 'time_ranges' not in header['sections']:
+        return None
+    return meta
+
+
+class IngestLock:
+    """
+    Cross-process single-flight for ingest: one lock object per video at
+    locks/ingest/{video_id}.json holding the owning job_id, created with a
+    conditional put (If-None-Match). A lock whose job finished, vanished or
+    is older than INGEST_LOCK_TTL_SECONDS is taken over with If-Match.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+        self.s3_client = get_s3_client()
+        self.ttl = float(os.getenv('INGEST_LOCK_TTL_SECONDS', 900))
+
+    @staticmethod
+    def key(video_id):
+        return f'{LOCK_PREFIX}/{video_id}.json'
+
+    def _put(self, video_id, job_id, **condition):
+        self.s3_client.put_object(
+            Bucket=self.bucket_name,
+            Key=self.key(video_id),
+            Body=json.dumps({'job_id': job_id, 'acquired_at': time.time()}).encode('utf-8'),
+            ContentType='application/json',
+            **condition
+        )
+
+    def _holder(self, video_id):
+        """
+        (lock body, ETag) of the current lock, or (None, None) if there is none
+        """
+        try:
+            obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key(video_id))
+            return json.loads(obj['Body'].read()), obj['ETag']
+        except self.s3_client.exceptions.NoSuchKey:
+            return None, None
+
+    def _is_stale(self, holder, job_store):
+        acquired_at = holder.get('acquired_at', 0)
+        if time.time() - acquired_at > self.ttl:
+            return True
+        job = job_store.get_job(holder.get('job_id'))
+        if job is None:
+            return True
+        # A lock taken after a failed job's last update is its resume
+        return job['status'] in FINISHED_STATUSES and acquired_at < job['updated_at']
+
+    @tracing.traced('ingest_lock.acquire')
+    def acquire(self, video_id, job_id, job_store):
+        """
+        Try to make job_id the ingest of video_id
+        Returns (holder job_id, acquired): acquired is False when another
+        ingest, or another resume of job_id, is already running
+        """
+        from botocore.exceptions import ClientError, ParamValidationError
+
+        condition = {'IfNoneMatch': '*'}
+        for _ in range(self.MAX_ATTEMPTS):
+            try:
+                self._put(video_id, job_id, **condition)
+                return job_id, True
+            except ParamValidationError:
+                # botocore without conditional writes (< 1.35): no cross-process lock
+                print("Warning: S3 conditional writes unsupported, ingest lock skipped")
+                return job_id, True
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                    raise
+
+            holder, etag = self._holder(video_id)
+            if holder is None:
+                condition = {'IfNoneMatch': '*'}
+            elif self._is_stale(holder, job_store):
+                condition = {'IfMatch': etag}
+            else:
+                return holder['job_id'], False
+
+        raise RuntimeError(f'Could not acquire ingest lock for {video_id}')
+
+    def release(self, video_id, job_id):
+        """
+        Delete the lock if job_id still holds it
+        """
+        try:
+            holder, _ = self._holder(video_id)
+            if holder and holder.get('job_id') == job_id:
+                self.s3_client.delete_object(Bucket=self.bucket_name, Key=self.key(video_id))
+        except Exception as e:
+            print(f"Warning: failed to release ingest lock for {video_id}: {str(e)}")
+
+
+def _claim(store, video_id, job_id):
+    """
+    Register job_id as the ingest of video_id in this process and, with S3
+    jobs, in the ingest lock; call with _inflight_lock held
+    Returns the job already ingesting video_id instead, or None once claimed
+    """
+    running = _inflight.get(video_id)
+    existing = store.get_job(running) if running else None
+    if existing is not None and existing['status'] not in FINISHED_STATUSES:
+        return existing
+    if isinstance(store, S3JobStore):
+        holder, acquired = IngestLock(store.bucket_name).acquire(video_id, job_id, store)
+        if not acquired:
+            existing = store.get_job(holder)
+            if existing is not None:
+                return existing
+
+    _inflight[video_id] = job_id
+    _finished[job_id] = threading.Event()
+    return None
+
+
+def submit_job(video_url, video_id=None, enqueue=True, refresh=False):
+    """
+    Create a job record and enqueue its first stage, or join the ingest of
+    the same video already running (single-flight)
+    Returns (job, created); with enqueue=False the caller runs the job
+    """
+    store, queue = get_job_backend()
+    job = new_job(video_url, refresh=refresh)
+    job['video_id'] = video_id
+
+    if video_id:
+        # Held across check and registration so concurrent requests in this
+        # process cannot both create a job (submissions are rare and short)
+        with _inflight_lock:
+            existing = _claim(store, video_id, job['job_id'])
+            if existing is not None:
+                return existing, False
+            store.save_job(job)
+    else:
+        store.save_job(job)
+
+    if enqueue:
+        queue.enqueue(job['job_id'], STAGES[0])
+    return job, True
+
+
+def _job_finished(store, job):
+    """
+    Clear the single-flight registration of a job that succeeded or failed
+    """
+    with _inflight_lock:
+        if _inflight.get(job['video_id']) == job['job_id']:
+            del _inflight[job['video_id']]
+        event = _finished.pop(job['job_id'], None)
+    if event:
+        event.set()
+
+    if job['video_id'] and isinstance(store, S3JobStore):
+        IngestLock(store.bucket_name).release(job['video_id'], job['job_id'])
+
+
+def wait_for_job(store, job_id, timeout=None, poll_interval=1.0):
+    """
+    Block until a job succeeds or fails (or timeout seconds pass) and return it
+    Jobs of this process are awaited on their event, others by polling
+    """
+    timeout = timeout if timeout is not None else float(os.getenv('INGEST_WAIT_TIMEOUT_SECONDS', 600))
+    deadline = time.monotonic() + timeout
+
+    with _inflight_lock:
+        event = _finished.get(job_id)
+    if event:
+        event.wait(timeout)
+        return store.get_job(job_id)
+
+    while True:
+        job = store.get_job(job_id)
+        if job is None or job['status'] in FINISHED_STATUSES or time.monotonic() >= deadline:
+            return job
+        time.sleep(poll_interval)
+
+
+def resume_job(job_id):
+    """
+    Re-enqueue a failed job from the stage that failed, through the same
+    single-flight as submit_job
+    Completed stages keep their artifacts and are not repeated
+    Returns (job, resumed): the job itself, or the ingest of its video that
+    is already running, with resumed False
+    """
+    store, queue = get_job_backend()
+    job = store.get_job(job_id)
+    if job is None or job['status'] != 'failed':
+        return job, False
+
+    if job['video_id']:
+        with _inflight_lock:
+            existing = _claim(store, job['video_id'], job_id)
+            if existing is not None:
+                return existing, False
+            _reset_failed_stage(store, job)
+    else:
+        _reset_failed_stage(store, job)
+
+    queue.enqueue(job_id, job['stage'])
+    return job, True
+
+
+def _reset_failed_stage(store, job):
+    job['stages'][job['stage']] = {'status': 'pending'}
+    job.update(status='queued', error=None)
+    store.save_job(job)
+
+
+def process_queue_message(message_body):
+    """
+    Worker entry point: run the stage named in a queue message and enqueue the next
+    """
+    store, queue = get_job_backend()
+    message = json.loads(message_body)
+    next_stage = run_stage(store, message['job_id'], message['stage'])
+    if next_stage:
+        queue.enqueue(message['job_id'], next_stage)
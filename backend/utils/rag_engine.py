@@ -3,8 +3,102 @@ RAG Engine Module
 Orchestrates retrieval and generation for question answering
 """
 import os
-from openai import OpenAI
-from .embeddings import EmbeddingGenerator
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from .embeddings import EmbeddingGenerator, AsyncEmbeddingGenerator
+from .embedding_backends import same_space
+from .ttl_cache import TTLCache
+from .clients import get_openai_client, get_async_openai_client
+from .aio import run_blocking
+from .context_packer import pack_context
+from .coalescer import QueryCoalescer, AsyncQueryCoalescer, coalesce_settings
+from .text_processor import count_tokens
+from . import tracing
+
+# Process-level caches, shared by every RAGEngine in a warm container
+# Level 1: (embedding model, dimensions, normalized question) -> query embedding
+query_embedding_cache = TTLCache(
+    maxsize=int(os.getenv('QUERY_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('QUERY_CACHE_TTL_SECONDS', 3600))
+)
+# Level 2: (video_id, index version, normalized question, model, top_k) -> answer
+answer_cache = TTLCache(
+    maxsize=int(os.getenv('ANSWER_CACHE_SIZE', 512)),
+    ttl=float(os.getenv('ANSWER_CACHE_TTL_SECONDS', 900))
+)
+
+# Fields of a retrieved chunk reported back to clients (start/end: seconds in the video)
+SOURCE_KEYS = ('index', 'score', 'video_id', 'start', 'end')
+
+# System prompt that creates the "Twin" behavior; identical on every request,
+# so it is a stable prompt prefix the provider can cache
+SYSTEM_PROMPT = """You are an AI assistant that answers questions based STRICTLY on the provided video transcript context.
+
+CRITICAL RULES:
+1. ONLY use information from the context provided below
+2. If the context doesn't contain the answer, say "I don't have information about that in this video"
+3. Try to mimic the speaker's tone and style from the transcript
+4. Keep answers concise and natural, as if the speaker is responding
+5. Do NOT use external knowledge or make assumptions beyond the context
+
+Your goal is to be a "digital twin" of the speaker in the video."""
+
+USER_PROMPT_TEMPLATE = """Context from video transcript:
+{context}
+
+Question: {question}
+
+Answer the question based solely on the context above. If you cannot answer from the context, say so clearly."""
+
+# Per-message framing tokens of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Answer when no retrieved chunk reaches MIN_SIMILARITY; no LLM call is made
+NOT_IN_VIDEO_ANSWER = "I don't have information about that in this video."
+# pack_context() result standing in for the context of a gated retrieval
+NOTHING_PACKED = {'context': '', 'chunks': [], 'passages': 0, 'tokens': 0}
+
+
+def normalize_question(question):
+    """
+    Canonical form used for cache keys: lowercase, single spaces, no trailing punctuation
+    """
+    return ' '.join(question.lower().split()).rstrip('?.! ')
+
+
+def source_chunks(chunks):
+    """
+    Fields of retrieved chunks reported back to clients (SOURCE_KEYS)
+    """
+    return [{key: chunk[key] for key in SOURCE_KEYS if key in chunk} for chunk in chunks]
+
+
+def embedding_error(embedding_result):
+    return f"Failed to embed question: {embedding_result.get('error', 'Unknown error')}"
+
+
+def pipeline_error(error):
+    return {'success': False, 'error': f'RAG pipeline failed: {str(error)}'}
+
+
+class AnswerStream:
+    """
+    Text, timing and prompt usage of an answer while stream_answer() sends it
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ttft_ms = None
+        self.parts = []
+        # Filled by stream_answer_tokens
+        self.usage = {'prompt_tokens': 0}
+
+    def token_event(self, text):
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.started) * 1000
+        self.parts.append(text)
+        return {'event': 'token', 'data': {'text': text}}
 
 
 class RAGEngine:
@@ -12,6 +106,10 @@ class RAGEngine:
     Handles RAG workflow: retrieval + generation
     """
 
+    # Embedder and coalescer classes (AsyncRAGEngine swaps in the async ones)
+    embedder_class = EmbeddingGenerator
+    coalescer_class = QueryCoalescer
+
     def __init__(self, api_key=None, model="gpt-3.5-turbo"):
         """
         Initialize with OpenAI API key for LLM
@@ -20,64 +118,287 @@ class RAGEngine:
         if not self.api_key:
             raise ValueError("OpenAI API key is required")
 
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = get_openai_client(self.api_key)
         self.model = model
-        self.embedding_gen = EmbeddingGenerator(api_key=self.api_key)
+        # Embedder for EMBEDDING_MODEL; indexes built by another backend get their own
+        self.embedding_gen = self.embedder_class(api_key=self.api_key)
+        self._embedders = {}
         self.top_k = int(os.getenv('TOP_K_RESULTS', 3))
+        # Hits scoring below this are dropped; 0 keeps every hit
+        self.min_similarity = float(os.getenv('MIN_SIMILARITY', 0))
+        # Groups concurrent retrievals into retrieve_many calls (CHAT_COALESCE_WINDOW_MS)
+        settings = coalesce_settings()
+        self.coalescer = self.coalescer_class(self.retrieve_many, *settings) if settings else None
 
-    def generate_answer(self, question, context_chunks):
+    def build_messages(self, question, context_chunks):
         """
-        Generate answer using retrieved context chunks
+        Build the chat messages for a question and its retrieved context
         The "Twin" aspect: System prompt instructs to answer only from context
+        Context is packed by pack_context: overlapping neighbours merged,
+        bounded by CONTEXT_TOKEN_BUDGET
+        Returns (messages, packed context dict)
         """
-        # Combine context chunks
-        context = "\n\n".join([chunk['text'] for chunk in context_chunks])
+        packed = pack_context(context_chunks)
+        user_prompt = USER_PROMPT_TEMPLATE.format(context=packed['context'], question=question)
 
-        # System prompt that creates the "Twin" behavior
-        system_prompt = """You are an AI assistant that answers questions based STRICTLY on the provided video transcript context.
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ], packed
 
-CRITICAL RULES:
-1. ONLY use information from the context provided below
-2. If the context doesn't contain the answer, say "I don't have information about that in this video"
-3. Try to mimic the speaker's tone and style from the transcript
-4. Keep answers concise and natural, as if the speaker is responding
-5. Do NOT use external knowledge or make assumptions beyond the context
+    @staticmethod
+    def estimate_prompt_tokens(messages):
+        """
+        Prompt tokens of messages, counted locally (for responses without usage)
+        """
+        return sum(count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages)
 
-Your goal is to be a "digital twin" of the speaker in the video."""
+    def completion_params(self, messages, stream=False):
+        """
+        Chat completion request for messages
+        """
+        params = {
+            'model': self.model,
+            'messages': messages,
+            'temperature': 0.7,  # Balanced creativity
+            'max_tokens': 500
+        }
+        if stream:
+            params.update(stream=True, stream_options={'include_usage': True})
+        return params
 
-        user_prompt = f"""Context from video transcript:
-{context}
+    @staticmethod
+    def packed_fields(packed):
+        """
+        Result fields describing the context that went into the prompt:
+        the chunks pack_context kept (merged passages count each chunk, dropped
+        ones are left out) and its token count
+        """
+        return {
+            'context_used': len(packed['chunks']),
+            'context_tokens': packed['tokens'],
+            'chunks': source_chunks(packed['chunks'])
+        }
 
-Question: {question}
+    def completion_result(self, response, messages, packed):
+        """
+        generate_answer() result from a chat completion response
+        """
+        answer = response.choices[0].message.content
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = usage.prompt_tokens if usage else self.estimate_prompt_tokens(messages)
+        tracing.record('rag.prompt_tokens', prompt_tokens)
 
-Answer the question based solely on the context above. If you cannot answer from the context, say so clearly."""
+        return {
+            'success': True,
+            'answer': answer,
+            **self.packed_fields(packed),
+            'prompt_tokens': prompt_tokens,
+            'model': self.model
+        }
 
+    @tracing.traced('rag.generate')
+    def generate_answer(self, question, context_chunks):
+        """
+        Generate answer using retrieved context chunks
+        """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,  # Balanced creativity
-                max_tokens=500
-            )
-
-            answer = response.choices[0].message.content
+            messages, packed = self.build_messages(question, context_chunks)
+            response = self.client.chat.completions.create(**self.completion_params(messages))
+            return self.completion_result(response, messages, packed)
 
+        except Exception as e:
             return {
-                'success': True,
-                'answer': answer,
-                'context_used': len(context_chunks),
-                'model': self.model
+                'success': False,
+                'error': f'Answer generation failed: {str(e)}'
             }
 
-        except Exception as e:
+    def stream_answer_tokens(self, messages, usage=None):
+        """
+        Generate answer with a streamed completion of messages (build_messages)
+        Yields text deltas as they arrive from the model
+        usage: optional dict, filled with prompt_tokens (from the final usage
+        chunk when the API sends one, else counted locally)
+        """
+        if usage is not None:
+            usage['prompt_tokens'] = self.estimate_prompt_tokens(messages)
+
+        stream = self.client.chat.completions.create(**self.completion_params(messages, stream=True))
+
+        for chunk in stream:
+            text = self.read_stream_chunk(chunk, usage)
+            if text:
+                yield text
+
+    @staticmethod
+    def read_stream_chunk(chunk, usage):
+        """
+        Text delta of a streamed completion chunk; records the final usage
+        """
+        if usage is not None and getattr(chunk, 'usage', None):
+            usage['prompt_tokens'] = chunk.usage.prompt_tokens
+        if chunk.choices and chunk.choices[0].delta.content:
+            return chunk.choices[0].delta.content
+        return None
+
+    def answer_cache_key(self, question, vector_store, video_id):
+        """
+        Answer cache key, or None when the store has no known version
+        Answers are only cached for stores with a known version (S3 ETag),
+        so a re-ingested video never returns an answer from the old index
+        """
+        if not vector_store.etag:
+            return None
+        return (video_id, vector_store.etag, normalize_question(question), self.model, self.top_k)
+
+    @staticmethod
+    def cached_answer(answer_key):
+        """
+        Cached answer for answer_key (marked cached, no prompt tokens), or None
+        """
+        cached_answer = answer_cache.get(answer_key) if answer_key else None
+        if not cached_answer:
+            return None
+        tracing.incr('rag.answer_cache_hits')
+        return dict(cached_answer, cached=True, prompt_tokens=0)
+
+    def lookup_answer(self, question, vector_store, video_id):
+        """
+        (answer cache key, cached answer or None) for a question
+        """
+        answer_key = self.answer_cache_key(question, vector_store, video_id)
+        return answer_key, self.cached_answer(answer_key)
+
+    @staticmethod
+    def finish_answer(answer_result, video_id, answer_key):
+        """
+        Attach the video to a successful answer and cache it
+        """
+        if answer_result['success']:
+            answer_result['video_id'] = video_id
+            answer_result['cached'] = False
+            if answer_key:
+                answer_cache.set(answer_key, answer_result)
+        return answer_result
+
+    def embedder_for(self, vector_store):
+        """
+        EmbeddingGenerator producing vectors in the same space as the store
+        Stores without a recorded backend (older indexes) use EMBEDDING_MODEL
+        """
+        spec = getattr(vector_store, 'embedding_backend', None)
+        if spec is None or same_space(spec, self.embedding_gen.backend.spec()):
+            return self.embedding_gen
+
+        key = (spec['model'], spec.get('dimensions'))
+        embedder = self._embedders.get(key)
+        if embedder is None:
+            embedder = self._embedders.setdefault(key, self.embedder_class(
+                api_key=self.api_key, model=spec['model'], dimensions=spec.get('dimensions')
+            ))
+        return embedder
+
+    @staticmethod
+    def query_key(embedder, question):
+        return (embedder.model, embedder.dimensions, normalize_question(question))
+
+    def retrieval_result(self, context_chunks):
+        """
+        Retrieval dict for search hits; hits below MIN_SIMILARITY are dropped,
+        and when none is left the retrieval is marked gated (answered with
+        NOT_IN_VIDEO_ANSWER, without an LLM call)
+        """
+        if not context_chunks:
             return {
                 'success': False,
-                'error': f'Answer generation failed: {str(e)}'
+                'error': 'No relevant context found in the video'
             }
 
+        if self.min_similarity:
+            context_chunks = [chunk for chunk in context_chunks if chunk['score'] >= self.min_similarity]
+            if not context_chunks:
+                tracing.incr('rag.gated')
+                return {'success': True, 'context_chunks': [], 'gated': True}
+
+        return {
+            'success': True,
+            'context_chunks': context_chunks
+        }
+
+    def not_in_video_answer(self):
+        """
+        generate_answer() result for a gated retrieval
+        """
+        return {
+            'success': True,
+            'answer': NOT_IN_VIDEO_ANSWER,
+            **self.packed_fields(NOTHING_PACKED),
+            'prompt_tokens': 0,
+            'model': self.model
+        }
+
+    def answer_without_llm(self, retrieval):
+        """
+        Result for a retrieval that needs no LLM call: the retrieval itself
+        when it failed, NOT_IN_VIDEO_ANSWER when it is gated
+        Returns None when the answer has to be generated
+        """
+        if not retrieval['success']:
+            return retrieval
+        if retrieval.get('gated'):
+            return self.not_in_video_answer()
+        return None
+
+    def stream_context(self, question, retrieval):
+        """
+        (packed context, messages) of a successful retrieval for
+        stream_answer(); messages is None for a gated one, which is answered
+        with NOT_IN_VIDEO_ANSWER
+        """
+        if retrieval.get('gated'):
+            return NOTHING_PACKED, None
+        messages, packed = self.build_messages(question, retrieval['context_chunks'])
+        return packed, messages
+
+    def lookup_query_embedding(self, embedder, question):
+        """
+        (cache key, cached query embedding or None) for one question
+        """
+        keys, query_embeddings, _ = self.lookup_query_embeddings(embedder, [question])
+        return keys[0], query_embeddings[0]
+
+    @staticmethod
+    def store_query_embedding(key, embedding_result):
+        """
+        Cache a freshly embedded question
+        Returns (query embedding, None), or (None, failed retrieval dict)
+        """
+        if not embedding_result['success']:
+            return None, {'success': False, 'error': embedding_error(embedding_result)}
+        query_embedding_cache.set(key, embedding_result['embedding'])
+        return embedding_result['embedding'], None
+
+    def retrieve(self, question, vector_store):
+        """
+        Embed the question (reusing a cached embedding) with the store's
+        embedding backend and search the store; with coalescing on, joins
+        the questions of concurrent requests in one retrieve_many call
+        Returns dict with success and context_chunks
+        """
+        if self.coalescer:
+            return self.coalescer.retrieve(question, vector_store)
+
+        embedder = self.embedder_for(vector_store)
+        query_key, query_embedding = self.lookup_query_embedding(embedder, question)
+        if query_embedding is None:
+            with tracing.span('rag.embed_query'):
+                embedding_result = embedder.generate_single_embedding(question)
+            query_embedding, failure = self.store_query_embedding(query_key, embedding_result)
+            if failure:
+                return failure
+
+        return self.retrieval_result(vector_store.search(query_embedding, top_k=self.top_k))
+
     def answer_question(self, question, vector_store, video_id):
         """
         Complete RAG workflow: embed question -> retrieve context -> generate answer
@@ -88,39 +409,427 @@ Answer the question based solely on the context above. If you cannot answer from
             video_id: Video identifier (for logging/tracking)
 
         Returns:
-            dict with success, answer, context_used, and video_id
+            dict with success, answer, context_used, video_id and cached
         """
         try:
-            # Step 1: Generate embedding for the question
-            embedding_result = self.embedding_gen.generate_single_embedding(question)
+            answer_key, cached_answer = self.lookup_answer(question, vector_store, video_id)
+            if cached_answer:
+                return cached_answer
 
-            if not embedding_result['success']:
-                return {
-                    'success': False,
-                    'error': f"Failed to embed question: {embedding_result.get('error', 'Unknown error')}"
-                }
+            # Step 1 + 2: Embed question and retrieve relevant chunks
+            retrieval = self.retrieve(question, vector_store)
 
-            query_embedding = embedding_result['embedding']
+            # Step 3: Generate answer using retrieved context (none passed MIN_SIMILARITY: no LLM call)
+            answer_result = self.answer_without_llm(retrieval)
+            if answer_result is None:
+                answer_result = self.generate_answer(question, retrieval['context_chunks'])
+            return self.finish_answer(answer_result, video_id, answer_key)
 
-            # Step 2: Retrieve relevant chunks from vector store
-            context_chunks = vector_store.search(query_embedding, top_k=self.top_k)
+        except Exception as e:
+            return pipeline_error(e)
 
-            if not context_chunks:
-                return {
-                    'success': False,
-                    'error': 'No relevant context found in the video'
-                }
+    def lookup_query_embeddings(self, embedder, questions):
+        """
+        (cache keys, cached query embeddings or None, positions of the misses)
+        for questions
+        """
+        keys = [self.query_key(embedder, question) for question in questions]
+        query_embeddings = [query_embedding_cache.get(key) for key in keys]
+        misses = [i for i, embedding in enumerate(query_embeddings) if embedding is None]
+        if len(misses) < len(questions):
+            tracing.incr('rag.query_cache_hits', len(questions) - len(misses))
+        return keys, query_embeddings, misses
+
+    @staticmethod
+    def store_query_embeddings(keys, query_embeddings, misses, embedding_result):
+        """
+        Fill the embedded misses into query_embeddings and the cache
+        Returns the embedding error, or None
+        """
+        if not embedding_result['success']:
+            return embedding_error(embedding_result)
+        for i, embedding in zip(misses, embedding_result['embeddings']):
+            query_embeddings[i] = embedding
+            query_embedding_cache.set(keys[i], embedding)
+        return None
+
+    def search_many(self, vector_store, query_embeddings):
+        """
+        Hit lists for query embeddings (one matrix search when the store
+        supports search_batch)
+        """
+        search_batch = getattr(vector_store, 'search_batch', None)
+        if search_batch:
+            return search_batch(query_embeddings, top_k=self.top_k)
+        return [vector_store.search(query_embedding, top_k=self.top_k) for query_embedding in query_embeddings]
+
+    def retrieve_many(self, questions, vector_store):
+        """
+        Batch form of retrieve(): cached query embeddings are reused, the rest
+        are embedded in one request and all questions are searched together
+        (one matrix search when the store supports search_batch)
+        Returns a list of retrieval dicts aligned with questions
+        """
+        embedder = self.embedder_for(vector_store)
+        keys, query_embeddings, misses = self.lookup_query_embeddings(embedder, questions)
+
+        embed_error = None
+        if misses:
+            with tracing.span('rag.embed_query'):
+                embedding_result = embedder.generate_embeddings([questions[i] for i in misses])
+            embed_error = self.store_query_embeddings(keys, query_embeddings, misses, embedding_result)
+
+        embedded = self.embedded(query_embeddings)
+        hit_lists = self.search_many(vector_store, [query_embeddings[i] for i in embedded])
+        return self.retrievals_for(questions, embedded, hit_lists, embed_error)
+
+    @staticmethod
+    def embedded(query_embeddings):
+        """
+        Positions of the questions that have a query embedding to search with
+        """
+        return [i for i, embedding in enumerate(query_embeddings) if embedding is not None]
+
+    def retrievals_for(self, questions, embedded, hit_lists, embed_error):
+        retrievals = [{'success': False, 'error': embed_error} for _ in questions]
+        for i, hits in zip(embedded, hit_lists):
+            retrievals[i] = self.retrieval_result(hits)
+        return retrievals
+
+    def group_batch(self, questions, vector_store, video_id, results):
+        """
+        Answer cache pass of a batch: fills cached results, and groups the
+        rest by normalized question
+        Returns (pending {normalized: [positions]}, answer keys by normalized,
+        one representative question per pending group)
+        """
+        pending = {}
+        answer_keys = {}
+        for i, question in enumerate(questions):
+            answer_key, cached_answer = self.lookup_answer(question, vector_store, video_id)
+            if cached_answer:
+                results[i] = cached_answer
+                continue
+            normalized = normalize_question(question)
+            pending.setdefault(normalized, []).append(i)
+            answer_keys[normalized] = answer_key
+        representatives = [questions[positions[0]] for positions in pending.values()]
+        return pending, answer_keys, representatives
+
+    def fill_batch(self, results, pending, answer_keys, answers, video_id):
+        """
+        Finish the answer of each pending group and copy it to its positions
+        answers are aligned with the groups of pending
+        """
+        for normalized, answer_result in zip(pending, answers):
+            self.finish_answer(answer_result, video_id, answer_keys[normalized])
+            for i in pending[normalized]:
+                results[i] = answer_result
+        return results
+
+    @staticmethod
+    def batch_error(results, error):
+        """
+        Results of a batch that failed: the answers already filled in, an error for the rest
+        """
+        failure = pipeline_error(error)
+        return [result or failure for result in results]
 
-            # Step 3: Generate answer using retrieved context
-            answer_result = self.generate_answer(question, context_chunks)
+    def answer_questions(self, questions, vector_store, video_id, max_workers=None):
+        """
+        Batch RAG workflow for many questions over one store
+
+        The store is searched once for all questions, questions are embedded in
+        one request, and LLM calls run concurrently on a bounded pool.
+        Repeated questions (after normalization) are answered once.
 
-            if answer_result['success']:
-                answer_result['video_id'] = video_id
+        Returns a list aligned with questions; each item has the shape of
+        answer_question()'s result, including per-question errors
+        """
+        max_workers = max_workers or int(os.getenv('CHAT_BATCH_CONCURRENCY', 8))
+        results = [None] * len(questions)
 
-            return answer_result
+        try:
+            # Answer cache first; remaining questions grouped by normalized form
+            pending, answer_keys, representatives = self.group_batch(questions, vector_store, video_id, results)
+            retrievals = self.retrieve_many(representatives, vector_store) if pending else []
+
+            def answer_one(item):
+                question, retrieval = item
+                answer_result = self.answer_without_llm(retrieval)
+                return answer_result or self.generate_answer(question, retrieval['context_chunks'])
+
+            workers = max(1, min(max_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map() preserves question order
+                answers = list(executor.map(tracing.bind(answer_one), zip(representatives, retrievals)))
+
+            return self.fill_batch(results, pending, answer_keys, answers, video_id)
+
+        except Exception as e:
+            return self.batch_error(results, e)
+
+    @classmethod
+    def stream_metadata(cls, video_id, packed=None, cached_answer=None):
+        """
+        First event of stream_answer(): the context packed into the prompt,
+        or the cached answer's
+        """
+        if cached_answer:
+            return {'event': 'metadata', 'data': {
+                'video_id': video_id,
+                'context_used': cached_answer['context_used'],
+                'context_tokens': cached_answer.get('context_tokens', 0),
+                'chunks': cached_answer.get('chunks', []),
+                'cached': True
+            }}
+        return {'event': 'metadata', 'data': {
+            'video_id': video_id,
+            **cls.packed_fields(packed),
+            'cached': False
+        }}
+
+    @staticmethod
+    def stream_error(message):
+        return {'event': 'error', 'data': {'error': message}}
+
+    def stream_done(self, stream, packed, answer_key, video_id):
+        """
+        Last event of stream_answer(); records timings and caches a fresh
+        answer (packed is None for an answer that came from the cache)
+        """
+        answer = ''.join(stream.parts)
+        total_ms = (time.perf_counter() - stream.started) * 1000
+        ttft_ms = stream.ttft_ms or total_ms
+        prompt_tokens = stream.usage['prompt_tokens']
+        tracing.record('rag.ttft', ttft_ms)
+        tracing.record('rag.stream_total', total_ms)
+        if packed is not None:
+            tracing.record('rag.prompt_tokens', prompt_tokens)
+        print(f"Streamed answer for {video_id}: ttft={stream.ttft_ms or 0:.0f}ms total={total_ms:.0f}ms")
+
+        if packed is not None:
+            # Cached like answer_question's results, so either path can serve it
+            self.finish_answer({
+                'success': True,
+                'answer': answer,
+                **self.packed_fields(packed),
+                'prompt_tokens': prompt_tokens,
+                'model': self.model
+            }, video_id, answer_key)
+
+        return {'event': 'done', 'data': {
+            'answer': answer,
+            'ttft_ms': round(ttft_ms, 1),
+            'total_ms': round(total_ms, 1),
+            'prompt_tokens': prompt_tokens
+        }}
+
+    def stream_answer(self, question, vector_store, video_id):
+        """
+        Streaming RAG workflow
+
+        Yields events as dicts with 'event' and 'data':
+        - metadata: retrieval results (chunks used, scores), sent first
+        - token: a piece of the answer text
+        - done: full answer plus ttft_ms (time to first token), total_ms and
+          prompt_tokens (0 for a cached answer)
+        - error: the pipeline failed; no further events follow
+        """
+        stream = AnswerStream()
+        try:
+            answer_key, cached_answer = self.lookup_answer(question, vector_store, video_id)
+            if cached_answer:
+                packed, texts = None, [cached_answer['answer']]
+                yield self.stream_metadata(video_id, cached_answer=cached_answer)
+            else:
+                retrieval = self.retrieve(question, vector_store)
+                if not retrieval['success']:
+                    yield self.stream_error(retrieval['error'])
+                    return
+                packed, messages = self.stream_context(question, retrieval)
+                yield self.stream_metadata(video_id, packed)
+                texts = self.stream_answer_tokens(messages, stream.usage) if messages else [NOT_IN_VIDEO_ANSWER]
+
+            for text in texts:
+                yield stream.token_event(text)
+            yield self.stream_done(stream, packed, answer_key, video_id)
+
+        except Exception as e:
+            yield self.stream_error(pipeline_error(e)['error'])
+
+
+class AsyncRAGEngine(RAGEngine):
+    """
+    RAGEngine for the async serving path (local_dev/asgi_server.py)
+    The same workflow and caches, with OpenAI calls made through AsyncOpenAI
+    and FAISS searches run on the blocking pool, so one event loop serves
+    many chats at once. answer_question, answer_questions, retrieve,
+    retrieve_many and generate_answer are coroutines; stream_answer and
+    stream_answer_tokens are async generators
+    Cache keys, gating, packing and result dicts come from the RAGEngine
+    helpers; these methods only await the I/O in between
+    """
+
+    embedder_class = AsyncEmbeddingGenerator
+    coalescer_class = AsyncQueryCoalescer
+
+    def __init__(self, api_key=None, model="gpt-3.5-turbo"):
+        super().__init__(api_key, model)
+        self.async_client = get_async_openai_client(self.api_key)
+
+    @tracing.traced('rag.generate')
+    async def generate_answer(self, question, context_chunks):
+        try:
+            messages, packed = self.build_messages(question, context_chunks)
+            response = await self.async_client.chat.completions.create(**self.completion_params(messages))
+            return self.completion_result(response, messages, packed)
 
         except Exception as e:
             return {
                 'success': False,
-                'error': f'RAG pipeline failed: {str(e)}'
+                'error': f'Answer generation failed: {str(e)}'
             }
+
+    async def stream_answer_tokens(self, messages, usage=None):
+        if usage is not None:
+            usage['prompt_tokens'] = self.estimate_prompt_tokens(messages)
+
+        stream = await self.async_client.chat.completions.create(**self.completion_params(messages, stream=True))
+
+        async for chunk in stream:
+            text = self.read_stream_chunk(chunk, usage)
+            if text:
+                yield text
+
+    async def retrieve(self, question, vector_store):
+        if self.coalescer:
+            return await self.coalescer.retrieve(question, vector_store)
+
+        embedder = self.embedder_for(vector_store)
+        query_key, query_embedding = self.lookup_query_embedding(embedder, question)
+        if query_embedding is None:
+            with tracing.span('rag.embed_query'):
+                embedding_result = await embedder.generate_single_embedding(question)
+            query_embedding, failure = self.store_query_embedding(query_key, embedding_result)
+            if failure:
+                return failure
+
+        return self.retrieval_result(await run_blocking(vector_store.search, query_embedding, top_k=self.top_k))
+
+    async def answer_question(self, question, vector_store, video_id):
+        try:
+            answer_key, cached_answer = self.lookup_answer(question, vector_store, video_id)
+            if cached_answer:
+                return cached_answer
+
+            retrieval = await self.retrieve(question, vector_store)
+            answer_result = self.answer_without_llm(retrieval)
+            if answer_result is None:
+                answer_result = await self.generate_answer(question, retrieval['context_chunks'])
+            return self.finish_answer(answer_result, video_id, answer_key)
+
+        except Exception as e:
+            return pipeline_error(e)
+
+    async def retrieve_many(self, questions, vector_store):
+        embedder = self.embedder_for(vector_store)
+        keys, query_embeddings, misses = self.lookup_query_embeddings(embedder, questions)
+
+        embed_error = None
+        if misses:
+            with tracing.span('rag.embed_query'):
+                embedding_result = await embedder.generate_embeddings([questions[i] for i in misses])
+            embed_error = self.store_query_embeddings(keys, query_embeddings, misses, embedding_result)
+
+        embedded = self.embedded(query_embeddings)
+        hit_lists = await run_blocking(self.search_many, vector_store, [query_embeddings[i] for i in embedded])
+        return self.retrievals_for(questions, embedded, hit_lists, embed_error)
+
+    async def answer_questions(self, questions, vector_store, video_id, max_workers=None):
+        """
+        LLM calls run as tasks, at most CHAT_BATCH_CONCURRENCY at a time
+        """
+        max_workers = max_workers or int(os.getenv('CHAT_BATCH_CONCURRENCY', 8))
+        results = [None] * len(questions)
+
+        try:
+            pending, answer_keys, representatives = self.group_batch(questions, vector_store, video_id, results)
+            retrievals = await self.retrieve_many(representatives, vector_store) if pending else []
+            slots = asyncio.Semaphore(max(1, max_workers))
+
+            async def answer_one(question, retrieval):
+                answer_result = self.answer_without_llm(retrieval)
+                if answer_result:
+                    return answer_result
+                async with slots:
+                    return await self.generate_answer(question, retrieval['context_chunks'])
+
+            answers = await asyncio.gather(*(
+                answer_one(question, retrieval) for question, retrieval in zip(representatives, retrievals)
+            ))
+            return self.fill_batch(results, pending, answer_keys, answers, video_id)
+
+        except Exception as e:
+            return self.batch_error(results, e)
+
+    @staticmethod
+    async def fixed_tokens(texts):
+        """
+        Async iterator over answer texts that need no LLM call
+        """
+        for text in texts:
+            yield text
+
+    async def stream_answer(self, question, vector_store, video_id):
+        stream = AnswerStream()
+        try:
+            answer_key, cached_answer = self.lookup_answer(question, vector_store, video_id)
+            if cached_answer:
+                packed, texts = None, self.fixed_tokens([cached_answer['answer']])
+                yield self.stream_metadata(video_id, cached_answer=cached_answer)
+            else:
+                retrieval = await self.retrieve(question, vector_store)
+                if not retrieval['success']:
+                    yield self.stream_error(retrieval['error'])
+                    return
+                packed, messages = self.stream_context(question, retrieval)
+                yield self.stream_metadata(video_id, packed)
+                if messages:
+                    texts = self.stream_answer_tokens(messages, stream.usage)
+                else:
+                    texts = self.fixed_tokens([NOT_IN_VIDEO_ANSWER])
+
+            async for text in texts:
+                yield stream.token_event(text)
+            yield self.stream_done(stream, packed, answer_key, video_id)
+
+        except Exception as e:
+            yield self.stream_error(pipeline_error(e)['error'])
+
+
+_engines = {}
+
+
+def get_rag_engine(model="gpt-3.5-turbo"):
+    """
+    Return a RAGEngine for model, reused across warm invocations
+    Engines hold no per-request state, only configuration and shared clients
+    """
+    engine = _engines.get(model)
+    if engine is None:
+        engine = _engines.setdefault(model, RAGEngine(model=model))
+    return engine
+
+
+_async_engines = {}
+
+
+def get_async_rag_engine(model="gpt-3.5-turbo"):
+    """
+    Shared AsyncRAGEngine for model (see get_rag_engine)
+    """
+    engine = _async_engines.get(model)
+    if engine is None:
+        engine = _async_engines.setdefault(model, AsyncRAGEngine(model=model))
+    return engine
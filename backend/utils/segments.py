@@ -0,0 +1,107 @@
+"""
+Transcript Segments Module
+Columnar storage of caption segments: one text buffer plus NumPy columns
+
+    text        all segment texts joined by single spaces (one str)
+    offsets     int64 (count + 1) character offsets of each segment in text
+    starts      float64 segment start times in seconds
+    durations   float32 segment durations in seconds
+
+Compared to a list of {'text', 'start', 'duration'} dicts plus a joined copy,
+a segment costs 20 bytes of columns and its characters once in the buffer.
+"""
+import sys
+import numpy as np
+
+
+class SegmentTable:
+    """
+    Read-only columnar transcript; text is the joined transcript itself
+    """
+
+    def __init__(self, text, offsets, starts, durations):
+        self.text = text
+        self.offsets = offsets
+        self.starts = starts
+        self.durations = durations
+
+    @classmethod
+    def from_segments(cls, segments):
+        """
+        Build from an iterable of segments: dicts with 'text', 'start',
+        'duration' (to_raw_data() shape) or objects with those attributes
+        (youtube-transcript-api snippets). The iterable is consumed once.
+        """
+        texts, starts, durations = [], [], []
+        for segment in segments:
+            if isinstance(segment, dict):
+                text, start, duration = segment['text'], segment['start'], segment['duration']
+            else:
+                text, start, duration = segment.text, segment.start, segment.duration
+            texts.append(text)
+            starts.append(start)
+            durations.append(duration)
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        # Each segment is followed by one joining space
+        offsets[1:] = np.cumsum(np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1)
+        return cls(
+            ' '.join(texts),
+            offsets,
+            np.asarray(starts, dtype=np.float64),
+            np.asarray(durations, dtype=np.float32)
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_text(self, i):
+        return self.text[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def time_ranges(self, char_starts, char_ends):
+        """
+        (start, end) seconds covered by character ranges of text
+        char_ends are exclusive; returns a float32 array of shape (n, 2)
+        """
+        char_starts = np.asarray(char_starts, dtype=np.int64)
+        char_ends = np.asarray(char_ends, dtype=np.int64)
+        ranges = np.zeros((len(char_starts), 2), dtype=np.float32)
+        if len(self) == 0:
+            return ranges
+
+        first = np.searchsorted(self.offsets, char_starts, side='right') - 1
+        last = np.searchsorted(self.offsets, np.maximum(char_ends - 1, char_starts), side='right') - 1
+        first = np.clip(first, 0, len(self) - 1)
+        last = np.clip(last, 0, len(self) - 1)
+        ranges[:, 0] = self.starts[first]
+        ranges[:, 1] = self.starts[last] + self.durations[last]
+        return ranges
+
+    @property
+    def nbytes(self):
+        """
+        Approximate resident size: columns plus the text buffer
+        """
+        return self.offsets.nbytes + self.starts.nbytes + self.durations.nbytes + sys.getsizeof(self.text)
+
+    def to_dict(self):
+        """
+        JSON-serializable form (ingest job artifacts); offsets are rebuilt on load
+        """
+        return {
+            'text': self.text,
+            'segment_lengths': np.diff(self.offsets).tolist(),
+            'starts': self.starts.tolist(),
+            'durations': self.durations.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        offsets = np.zeros(len(data['segment_lengths']) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(data['segment_lengths'])
+        return cls(
+            data['text'],
+            offsets,
+            np.asarray(data['starts'], dtype=np.float64),
+            np.asarray(data['durations'], dtype=np.float32)
+        )
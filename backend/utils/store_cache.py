@@ -0,0 +1,199 @@
+"""
+Vector Store Cache Module
+Keeps loaded VectorStores in memory across warm Lambda invocations
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from .index_deltas import load_video_index, video_index_etag
+from .aio import run_blocking
+from . import tracing
+
+
+def default_memory_budget(fraction=None):
+    """
+    Derive the cache budget (bytes) from the function's MemorySize
+    Lambda exposes MemorySize as AWS_LAMBDA_FUNCTION_MEMORY_SIZE (MB)
+    """
+    memory_mb = int(os.getenv('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', 1024))
+    if fraction is None:
+        fraction = float(os.getenv('STORE_CACHE_MEMORY_FRACTION', 0.4))
+    return int(memory_mb * 1024 * 1024 * fraction)
+
+
+class VectorStoreCache:
+    """
+    Process-level LRU cache of loaded VectorStores keyed by video_id
+
+    - Evicts least recently used stores once the memory budget is exceeded
+    - Revalidates entries with a HEAD request (ETag) so a re-ingested or
+      incrementally updated video is reloaded instead of being served stale
+    """
+
+    def __init__(self, memory_budget=None, revalidate_seconds=None):
+        """
+        memory_budget: max bytes of cached stores (default: derived from MemorySize)
+        revalidate_seconds: how long an entry is trusted before its ETag is checked
+        """
+        self.memory_budget = memory_budget or default_memory_budget()
+        if revalidate_seconds is None:
+            revalidate_seconds = float(os.getenv('STORE_CACHE_REVALIDATE_SECONDS', 60))
+        self.revalidate_seconds = revalidate_seconds
+
+        self._entries = OrderedDict()  # video_id -> entry dict
+        self._loads = {}  # video_id -> in-flight aget() load (asyncio future)
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @tracing.traced('store_cache.get')
+    def get(self, bucket_name, video_id):
+        """
+        Return the VectorStore for a video, loading it from S3 on a miss
+        Returns None if the video has not been ingested
+        """
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry:
+                self._entries.move_to_end(video_id)
+
+        if entry and self._is_fresh(entry, bucket_name, video_id):
+            with self._lock:
+                self.hits += 1
+            tracing.incr('store_cache.hits')
+            return entry['store']
+
+        with self._lock:
+            self.misses += 1
+        tracing.incr('store_cache.misses')
+
+        store = load_video_index(bucket_name, video_id)
+        if store:
+            self.put(video_id, store)
+        else:
+            self.invalidate(video_id)
+
+        return store
+
+    async def aget(self, bucket_name, video_id):
+        """
+        get() for the async serving path: an entry inside its revalidation
+        window is served without leaving the event loop; loads and ETag
+        checks run on the blocking pool, one per video at a time (concurrent
+        requests for the same video await the same load)
+        """
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry and time.monotonic() - entry['validated_at'] < self.revalidate_seconds:
+                self._entries.move_to_end(video_id)
+                self.hits += 1
+                tracing.incr('store_cache.hits')
+                return entry['store']
+
+        load = self._loads.get(video_id)
+        if load is None:
+            load = asyncio.ensure_future(run_blocking(self.get, bucket_name, video_id))
+            self._loads[video_id] = load
+            load.add_done_callback(lambda _: self._loads.pop(video_id, None))
+        # A cancelled request must not cancel the load other requests await
+        return await asyncio.shield(load)
+
+    def _is_fresh(self, entry, bucket_name, video_id):
+        """
+        Check whether a cached entry may still be served
+        Only issues a HEAD request once the revalidation window has passed
+        """
+        now = time.monotonic()
+        if now - entry['validated_at'] < self.revalidate_seconds:
+            return True
+
+        etag = video_index_etag(bucket_name, video_id)
+        if etag and etag == entry['store'].etag:
+            entry['validated_at'] = now
+            return True
+
+        print(f"Cached index for {video_id} is stale, reloading")
+        self.invalidate(video_id)
+        return False
+
+    def put(self, video_id, store):
+        """
+        Insert a store and evict least recently used entries over budget
+        Stores larger than the whole budget are not cached
+        """
+        size = store.memory_bytes()
+        if size > self.memory_budget:
+            return False
+
+        with self._lock:
+            self._remove(video_id)
+            self._entries[video_id] = {
+                'store': store,
+                'size': size,
+                'validated_at': time.monotonic()
+            }
+            self.current_bytes += size
+
+            evicted = 0
+            while self.current_bytes > self.memory_budget and self._entries:
+                evicted_id = next(iter(self._entries))
+                self._remove(evicted_id)
+                evicted += 1
+            self.evictions += evicted
+            current_bytes = self.current_bytes
+
+        if evicted:
+            tracing.incr('store_cache.evictions', evicted)
+        tracing.record('store_cache.bytes', current_bytes, 'Bytes')
+        return True
+
+    def invalidate(self, video_id):
+        """
+        Drop a cached store (e.g. after the video was re-ingested)
+        """
+        with self._lock:
+            self._remove(video_id)
+
+    def _remove(self, video_id):
+        entry = self._entries.pop(video_id, None)
+        if entry:
+            self.current_bytes -= entry['size']
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """
+        Hit/miss counters and memory usage of the cache
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'budget_bytes': self.memory_budget
+            }
+
+
+# Module-level instance survives across warm invocations of the same container
+_store_cache = None
+
+
+def get_store_cache():
+    """
+    Return the process-wide VectorStoreCache
+    """
+    global _store_cache
+    if _store_cache is None:
+        _store_cache = VectorStoreCache()
+    return _store_cache
@@ -2,8 +2,23 @@
 Text Processing Module
 Handles chunking of transcript text for embedding
 """
-import os
-import tiktoken
+import re
+from functools import lru_cache
+import numpy as np
+from . import tracing
+
+# A sentence is a run of text between '.', '!' or '?', stripped of whitespace
+SENTENCE_PATTERN = re.compile(r'[^.!?\s](?:[^.!?]*[^.!?\s])?')
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model="gpt-3.5-turbo"):
+    """
+    Return the tiktoken encoding for a model, built once per process
+    tiktoken is imported here so routes that never count tokens skip it
+    """
+    import tiktoken
+    return tiktoken.encoding_for_model(model)
 
 
 def count_tokens(text, model="gpt-3.5-turbo"):
@@ -11,56 +26,241 @@ def count_tokens(text, model="gpt-3.5-turbo"):
     Count tokens in text using tiktoken
     """
     try:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
+        return len(get_encoding(model).encode(text))
     except Exception:
         # Fallback: rough estimate (1 token ≈ 4 characters)
         return len(text) // 4
 
 
-def chunk_text(text, chunk_size=500, overlap=50):
+def sentence_spans(text):
     """
-    Split text into overlapping chunks
+    Locate sentences as (start, end) character offsets into text
+    Equivalent to splitting on . ! ? and stripping each piece
+    """
+    spans = [match.span() for match in SENTENCE_PATTERN.finditer(text)]
+    if not spans:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    spans = np.array(spans, dtype=np.int64)
+    return spans[:, 0], spans[:, 1]
 
-    Strategy: Splits on sentence boundaries when possible to maintain context
-    - chunk_size: target tokens per chunk
-    - overlap: tokens to overlap between chunks (maintains context continuity)
+
+# Text encoded per tokenizer call; bounds the token lists held at once
+TOKENIZE_WINDOW_CHARS = 1 << 18
+
+
+def _char_to_byte_offsets(text, offsets):
     """
-    # Split into sentences (basic approach)
-    sentences = text.replace('!', '.').replace('?', '.').split('.')
-    sentences = [s.strip() + '.' for s in sentences if s.strip()]
+    Map character offsets to UTF-8 byte offsets (identity for ASCII text)
+    """
+    if text.isascii():
+        return offsets
+    codepoints = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    byte_lengths = 1 + (codepoints >= 0x80) + (codepoints >= 0x800) + (codepoints >= 0x10000)
+    byte_offsets = np.concatenate(([0], np.cumsum(byte_lengths, dtype=np.int64)))
+    return byte_offsets[offsets]
 
-    chunks = []
-    current_chunk = []
-    current_tokens = 0
 
-    for sentence in sentences:
-        sentence_tokens = count_tokens(sentence)
+def _token_windows(text, window_chars):
+    """
+    Split text into (start, end) windows that tokenize exactly like the whole
+
+    Windows end just before a space that follows a non-space character: no
+    pre-tokenizer pattern spans such a boundary, so encoding each window
+    yields the same tokens as encoding the full text.
+    """
+    start = 0
+    while start < len(text):
+        cut = text.find(' ', start + window_chars)
+        while cut != -1 and text[cut - 1].isspace():
+            cut = text.find(' ', cut + 1)
+        end = len(text) if cut == -1 else cut
+        yield start, end
+        start = end
+
+
+def _terminator_tokens(encoding, text, start, end):
+    """
+    Tokens that appending '.' adds to the sentence text[start:end]
+    Only its last word is re-encoded: the pre-tokenizer never joins text
+    across a space that follows a non-space character (see _token_windows)
+    """
+    cut = end
+    while True:
+        cut = text.rfind(' ', start, cut)
+        if cut <= start or not text[cut - 1].isspace():
+            break
+    tail = text[max(cut, start):end]
+    return len(encoding.encode_ordinary(tail + '.')) - len(encoding.encode_ordinary(tail))
+
+
+def sentence_token_counts(text, starts, ends, model="gpt-3.5-turbo", window_chars=None):
+    """
+    Token count of every sentence from one tokenizer pass over the text,
+    matching count_tokens(sentence + '.') per sentence
+
+    Each token is attributed to the sentence its first non-whitespace byte
+    falls in (tiktoken attaches the space before a word to the word, so
+    " Next" belongs to the sentence starting at "Next"); the terminator
+    after a sentence stands in for the '.' that chunk_text appends, and a
+    final sentence without one gets the tokens of that '.' added.
+    Whitespace-only tokens count only inside a sentence, not between two.
+    The text is encoded in windows of about TOKENIZE_WINDOW_CHARS characters
+    (see _token_windows), so memory stays bounded for very long transcripts.
+    """
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    try:
+        encoding = get_encoding(model)
+    except Exception:
+        # Fallback: rough estimate (1 token ≈ 4 characters), '.' included
+        return (ends - starts + 1) // 4
+
+    windows = list(_token_windows(text, window_chars or TOKENIZE_WINDOW_CHARS))
+
+    # UTF-8 byte offsets of sentence starts and ends, converted window by window
+    start_bytes = np.empty_like(starts)
+    end_bytes = np.empty_like(ends)
+    window_bytes = []
+    byte_base = 0
+    for window_start, window_end in windows:
+        window = text[window_start:window_end]
+        for offsets, out in ((starts, start_bytes), (ends, end_bytes)):
+            first = np.searchsorted(offsets, window_start, side='left')
+            last = len(offsets) if window_end == len(text) else np.searchsorted(offsets, window_end, side='left')
+            out[first:last] = byte_base + _char_to_byte_offsets(window, offsets[first:last] - window_start)
+        window_bytes.append(byte_base)
+        byte_base += len(window.encode('utf-8'))
+
+    counts = np.zeros(len(starts), dtype=np.int64)
+    for (window_start, window_end), byte_base in zip(windows, window_bytes):
+        tokens = encoding.encode_ordinary(text[window_start:window_end])
+        token_bytes = encoding.decode_tokens_bytes(tokens)
+        token_lengths = np.fromiter(map(len, token_bytes), dtype=np.int64, count=len(tokens))
+        leading = np.fromiter((len(b) - len(b.lstrip()) for b in token_bytes), dtype=np.int64, count=len(tokens))
+        token_starts = byte_base + np.cumsum(token_lengths) - token_lengths
+
+        # Sentence i owns [start_i, start_i+1); text before the first sentence is dropped
+        whitespace = leading == token_lengths
+        owners = np.searchsorted(start_bytes, token_starts + np.where(whitespace, 0, leading), side='right') - 1
+        keep = owners >= 0
+        keep[whitespace] &= token_starts[whitespace] < end_bytes[np.maximum(owners[whitespace], 0)]
+        counts += np.bincount(owners[keep], minlength=len(counts))
 
+    if not text[ends[-1]:].strip():
+        counts[-1] += _terminator_tokens(encoding, text, int(starts[-1]), int(ends[-1]))
+    return counts
+
+
+def iter_pack_sentences(token_counts, chunk_size=500, overlap=50):
+    """
+    Greedily group sentences into chunks of at most chunk_size tokens,
+    carrying trailing sentences worth up to overlap tokens into the next chunk
+    Yields (first, last) sentence index ranges (last exclusive)
+    """
+    counts = token_counts.tolist() if isinstance(token_counts, np.ndarray) else list(token_counts)
+
+    chunk_start = 0
+    current_tokens = 0
+
+    for i, sentence_tokens in enumerate(counts):
         # If adding this sentence exceeds chunk size, save current chunk
-        if current_tokens + sentence_tokens > chunk_size and current_chunk:
-            chunk_text = ' '.join(current_chunk)
-            chunks.append(chunk_text)
+        if current_tokens + sentence_tokens > chunk_size and i > chunk_start:
+            yield chunk_start, i
 
             # Keep last few sentences for overlap
-            overlap_sentences = []
+            overlap_start = i
             overlap_tokens = 0
-            for s in reversed(current_chunk):
-                s_tokens = count_tokens(s)
-                if overlap_tokens + s_tokens <= overlap:
-                    overlap_sentences.insert(0, s)
-                    overlap_tokens += s_tokens
-                else:
+            while overlap_start > chunk_start:
+                s_tokens = counts[overlap_start - 1]
+                if overlap_tokens + s_tokens > overlap:
                     break
+                overlap_start -= 1
+                overlap_tokens += s_tokens
 
-            current_chunk = overlap_sentences
+            chunk_start = overlap_start
             current_tokens = overlap_tokens
 
-        current_chunk.append(sentence)
         current_tokens += sentence_tokens
 
     # Add final chunk
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
+    if chunk_start < len(counts):
+        yield chunk_start, len(counts)
+
+
+def pack_sentences(token_counts, chunk_size=500, overlap=50):
+    """
+    List form of iter_pack_sentences
+    """
+    return list(iter_pack_sentences(token_counts, chunk_size, overlap))
+
 
-    return chunks
+@tracing.traced('text.chunk')
+def chunk_text(text, chunk_size=500, overlap=50):
+    """
+    Split text into overlapping chunks
+
+    Strategy: Splits on sentence boundaries when possible to maintain context
+    - chunk_size: target tokens per chunk
+    - overlap: tokens to overlap between chunks (maintains context continuity)
+
+    The transcript is tokenized once; sentences are offsets into it and
+    chunks/overlaps are built by slicing those offset arrays
+    """
+    starts, ends = sentence_spans(text)
+    token_counts = sentence_token_counts(text, starts, ends)
+    starts, ends = starts.tolist(), ends.tolist()
+
+    return [
+        ' '.join(text[starts[i]:ends[i]] + '.' for i in range(first, last))
+        for first, last in pack_sentences(token_counts, chunk_size, overlap)
+    ]
+
+
+def iter_chunk_segments(segments, chunk_size=500, overlap=50, block_size=256):
+    """
+    Chunk a SegmentTable like chunk_text, keeping each chunk's time range
+
+    A chunk is one slice of the transcript buffer from its first sentence to
+    the end of its last one (original punctuation kept), so no sentence
+    strings are built. Yields blocks of up to block_size chunks as
+    (chunks, time_ranges) with time_ranges a float32 (n, 2) array of
+    start/end seconds; only one block of chunk strings exists at a time.
+    """
+    text = segments.text
+    starts, ends = sentence_spans(text)
+    token_counts = sentence_token_counts(text, starts, ends)
+
+    ranges = []
+    for chunk_range in iter_pack_sentences(token_counts, chunk_size, overlap):
+        ranges.append(chunk_range)
+        if len(ranges) == block_size:
+            yield _slice_chunks(segments, starts, ends, ranges)
+            ranges = []
+    if ranges:
+        yield _slice_chunks(segments, starts, ends, ranges)
+
+
+def _slice_chunks(segments, starts, ends, ranges):
+    text = segments.text
+    bounds = np.array(ranges, dtype=np.int64)
+    char_starts = starts[bounds[:, 0]]
+    # Include the sentence terminator that follows the last sentence
+    char_ends = np.minimum(ends[bounds[:, 1] - 1] + 1, len(text))
+
+    chunks = [text[start:end].rstrip() for start, end in zip(char_starts.tolist(), char_ends.tolist())]
+    return chunks, segments.time_ranges(char_starts, char_ends)
+
+
+@tracing.traced('text.chunk')
+def chunk_segments(segments, chunk_size=500, overlap=50):
+    """
+    All chunks of a SegmentTable at once (see iter_chunk_segments)
+    Returns (chunks, time_ranges)
+    """
+    chunks, time_ranges = [], [np.zeros((0, 2), dtype=np.float32)]
+    for block_chunks, block_ranges in iter_chunk_segments(segments, chunk_size, overlap):
+        chunks.extend(block_chunks)
+        time_ranges.append(block_ranges)
+    return chunks, np.concatenate(time_ranges)
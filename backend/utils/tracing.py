@@ -0,0 +1,367 @@
+"""
+Tracing Module
+Lightweight spans, timers and counters around pipeline stages
+
+Usage:
+    with tracing.request('chat', context):     # one per handler invocation
+        with tracing.span('vector_store.search'):
+            ...
+        tracing.incr('store_cache.hit')
+
+Exporters (TRACING_EXPORTERS, comma separated):
+- emf: one CloudWatch Embedded Metric Format JSON line per request on stdout,
+  with every span of the request as a metric and the request id attached
+- local: in-process aggregation of p50/p95/p99 per span name (summary())
+
+Disabled unless TRACING_ENABLED=true; when disabled span() returns a shared
+no-op context manager and counters return immediately.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import inspect
+import functools
+from collections import deque
+from contextvars import ContextVar
+
+_enabled = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+_exporters = {name.strip() for name in os.getenv('TRACING_EXPORTERS', 'emf').split(',') if name.strip()}
+NAMESPACE = os.getenv('TRACING_NAMESPACE', 'VideoTwin')
+
+# Active request trace of the current thread / context
+_current = ContextVar('tracing_request', default=None)
+_cold_start = True
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class LocalAggregator:
+    """
+    Keeps recent samples per metric name and reports percentiles
+    """
+
+    def __init__(self, max_samples=None):
+        self.max_samples = max_samples or int(os.getenv('TRACING_LOCAL_SAMPLES', 10000))
+        self._samples = {}
+        self._units = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, value, unit):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+                self._units[name] = unit
+            samples.append(value)
+
+    def summary(self):
+        """
+        {name: {count, mean, p50, p95, p99, max, unit}} over the retained samples
+        Counters report their total as 'sum'
+        """
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+
+        report = {}
+        for name, values in sorted(snapshot.items()):
+            unit = self._units[name]
+            if unit == 'Count':
+                report[name] = {'count': len(values), 'sum': sum(values), 'unit': unit}
+                continue
+            report[name] = {
+                'count': len(values),
+                'mean': round(sum(values) / len(values), 3),
+                'p50': round(_percentile(values, 50), 3),
+                'p95': round(_percentile(values, 95), 3),
+                'p99': round(_percentile(values, 99), 3),
+                'max': round(values[-1], 3),
+                'unit': unit
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._units.clear()
+
+
+def _percentile(sorted_values, percent):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+_local = LocalAggregator()
+
+
+class _RequestTrace:
+    """
+    Metrics collected during one handler invocation
+    """
+
+    def __init__(self, operation, request_id):
+        self.operation = operation
+        self.request_id = request_id
+        self.metrics = {}  # name -> list of values
+        self.units = {}
+
+    def add(self, name, value, unit):
+        values = self.metrics.get(name)
+        if values is None:
+            values = self.metrics.setdefault(name, [])
+            self.units[name] = unit
+        values.append(value)
+
+    def to_emf(self, cold_start):
+        """
+        CloudWatch Embedded Metric Format record for this request
+        """
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [['Operation']],
+                    'Metrics': [{'Name': name, 'Unit': self.units[name]} for name in self.metrics]
+                }]
+            },
+            'Operation': self.operation,
+            'RequestId': self.request_id,
+            'ColdStart': cold_start
+        }
+        for name, values in self.metrics.items():
+            # EMF accepts up to 100 values per metric
+            record[name] = values[0] if len(values) == 1 else values[:100]
+        return record
+
+
+def _emit(name, value, unit):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, value, unit)
+    if 'local' in _exporters:
+        _local.add(name, value, unit)
+
+
+class _Span:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _emit(self.name, (time.perf_counter() - self.started) * 1000, 'Milliseconds')
+        if exc_type is not None:
+            _emit(f'{self.name}.errors', 1, 'Count')
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def configure(enabled=None, exporters=None):
+    """
+    Override TRACING_ENABLED / TRACING_EXPORTERS at runtime (local tools, benchmarks)
+    """
+    global _enabled, _exporters
+    if enabled is not None:
+        _enabled = enabled
+    if exporters is not None:
+        _exporters = set(exporters)
+
+
+def span(name):
+    """
+    Time a block as metric `name` (milliseconds)
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Span(name)
+
+
+def traced(name):
+    """
+    Decorator form of span(); coroutine functions are timed until they return
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+                with _Span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name, value, unit='Milliseconds'):
+    """
+    Record a measured value (e.g. time to first token)
+    """
+    if _enabled:
+        _emit(name, value, unit)
+
+
+def incr(name, value=1):
+    """
+    Count an event (cache hits, retries)
+    """
+    if _enabled:
+        _emit(name, value, 'Count')
+
+
+def current_request_id():
+    trace = _current.get() if _enabled else None
+    return trace.request_id if trace else None
+
+
+class _Request:
+    """
+    Context manager opening a request trace; nested requests act as spans
+    """
+
+    def __init__(self, operation, request_id):
+        self.operation = operation
+        self.request_id = request_id
+        self.token = None
+        self.inner = None
+
+    def __enter__(self):
+        if _current.get() is not None:
+            self.inner = _Span(self.operation).__enter__()
+            return self
+
+        self.trace = _RequestTrace(self.operation, self.request_id or uuid.uuid4().hex)
+        self.token = _current.set(self.trace)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.inner is not None:
+            return self.inner.__exit__(exc_type, exc, tb)
+
+        global _cold_start
+        self.trace.add('request.duration', (time.perf_counter() - self.started) * 1000, 'Milliseconds')
+        if exc_type is not None:
+            self.trace.add('request.errors', 1, 'Count')
+        try:
+            _current.reset(self.token)
+        except ValueError:
+            # A streaming generator closed from another context
+            _current.set(None)
+
+        if 'local' in _exporters:
+            # Request metrics are per operation locally (EMF uses the Operation dimension)
+            for name, values in self.trace.metrics.items():
+                if name.startswith('request.'):
+                    for value in values:
+                        _local.add(f'{self.operation}.{name[len("request."):]}', value, self.trace.units[name])
+
+        if 'emf' in _exporters:
+            sys.stdout.write(json.dumps(self.trace.to_emf(_cold_start)) + '\n')
+            sys.stdout.flush()
+        _cold_start = False
+        return False
+
+
+def request(operation, context=None, request_id=None):
+    """
+    Trace one handler invocation; the request id comes from the Lambda
+    context (aws_request_id) when available
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return _Request(operation, request_id or getattr(context, 'aws_request_id', None))
+
+
+def traced_request(operation):
+    """
+    Decorator for Lambda-style handlers (event, context): traces the
+    invocation and counts 5xx responses as errors; coroutine handlers
+    (the ASGI server's) are traced until they return
+    """
+    def count_error(response):
+        trace = _current.get()
+        if trace and isinstance(response, dict) and response.get('statusCode', 200) >= 500:
+            trace.add('request.errors', 1, 'Count')
+
+    def decorator(handler):
+        if inspect.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(event, context):
+                if not _enabled:
+                    return await handler(event, context)
+                with request(operation, context):
+                    response = await handler(event, context)
+                    count_error(response)
+                    return response
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            if not _enabled:
+                return handler(event, context)
+            with request(operation, context):
+                response = handler(event, context)
+                count_error(response)
+                return response
+        return wrapper
+    return decorator
+
+
+def bind(func):
+    """
+    Carry the current request trace into a worker thread (ThreadPoolExecutor)
+    """
+    if not _enabled:
+        return func
+
+    trace = _current.get()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current.set(trace)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
+
+
+def summary():
+    """
+    Per-metric percentiles from the local exporter
+    """
+    return _local.summary()
+
+
+def reset():
+    _local.reset()
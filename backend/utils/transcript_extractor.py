@@ -1,15 +1,25 @@
 """
 YouTube Transcript Extraction Module
 Handles extraction of transcripts from YouTube videos
+
+Fetched transcripts are cached in the index bucket under
+transcripts/{video_id}/{language}.json, so re-ingesting a video (new
+chunking, another embedding backend) does not go back to YouTube.
 """
 import re
 import os
+import json
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import (
     TranscriptsDisabled,
     NoTranscriptFound,
     VideoUnavailable
 )
+from .segments import SegmentTable
+from .clients import get_s3_client
+from . import tracing
+
+TRANSCRIPT_PREFIX = 'transcripts'
 
 # Note: YouTube blocks AWS IPs. For production, use proxies or YouTube Data API.
 # For POC/demo, this works with cookies or from non-cloud IPs.
@@ -35,15 +45,96 @@ def extract_video_id(url):
     raise ValueError("Invalid YouTube URL format")
 
 
-def get_transcript(video_url):
+def transcript_languages():
+    """
+    Preferred caption languages, most preferred first (TRANSCRIPT_LANGUAGES)
+    """
+    return [lang.strip() for lang in os.getenv('TRANSCRIPT_LANGUAGES', 'en').split(',') if lang.strip()]
+
+
+class TranscriptCache:
     """
-    Fetch transcript from YouTube video
-    Returns concatenated transcript text
+    Raw transcript segments stored in S3, keyed by video_id and language
+    Failures are logged and treated as misses; the cache never fails an ingest
+    """
+
+    def __init__(self, bucket_name):
+        self.bucket_name = bucket_name
+        self.s3_client = get_s3_client()
+
+    @staticmethod
+    def key(video_id, language):
+        return f'{TRANSCRIPT_PREFIX}/{video_id}/{language}.json'
+
+    @tracing.traced('transcript_cache.get')
+    def get(self, video_id, languages):
+        """
+        Cached segments in the first available language
+        Returns (language, SegmentTable) or None
+        """
+        for language in languages:
+            try:
+                obj = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key(video_id, language))
+                return language, SegmentTable.from_dict(json.loads(obj['Body'].read()))
+            except self.s3_client.exceptions.NoSuchKey:
+                continue
+            except Exception as e:
+                print(f"Warning: transcript cache read failed: {str(e)}")
+                return None
+        return None
+
+    @tracing.traced('transcript_cache.put')
+    def put(self, video_id, language, segments):
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=self.key(video_id, language),
+                Body=json.dumps(segments.to_dict()).encode('utf-8'),
+                ContentType='application/json'
+            )
+        except Exception as e:
+            print(f"Warning: transcript cache write failed: {str(e)}")
+
+
+def get_transcript_cache():
+    """
+    TranscriptCache on S3_BUCKET_NAME, or None when disabled or no bucket is set
+    """
+    bucket_name = os.getenv('S3_BUCKET_NAME')
+    if not bucket_name or os.getenv('TRANSCRIPT_CACHE_ENABLED', 'true').lower() != 'true':
+        return None
+    return TranscriptCache(bucket_name)
+
+
+@tracing.traced('transcript.fetch')
+def get_transcript(video_url, languages=None, use_cache=True):
+    """
+    Fetch transcript from YouTube video, or from the transcript cache
+    Returns the segments as a columnar SegmentTable ('segments'), the
+    concatenated transcript text ('transcript', the table's own buffer),
+    the caption 'language' and whether it came from the cache ('cached')
+    use_cache=False always fetches (captions that change) and refreshes the cache
     """
     try:
         video_id = extract_video_id(video_url)
         print(f"   Video ID extracted: {video_id}")
 
+        languages = languages or transcript_languages()
+        cache = get_transcript_cache()
+        cached = cache.get(video_id, languages) if cache and use_cache else None
+        if cached:
+            language, segments = cached
+            print(f"   ✓ Transcript served from cache: {len(segments)} segments ({language})")
+            return {
+                'success': True,
+                'video_id': video_id,
+                'segments': segments,
+                'transcript': segments.text,
+                'length': len(segments.text),
+                'language': language,
+                'cached': True
+            }
+
         # Use the new API (v1.2.3+) - instance method instead of static
         # Try with proxies if configured (for AWS Lambda)
         proxies = {}
@@ -61,21 +152,25 @@ def get_transcript(video_url):
             ytt_api = YouTubeTranscriptApi()
 
         # Fetch transcript - returns transcript object
-        transcript = ytt_api.fetch(video_id)
+        transcript = ytt_api.fetch(video_id, languages=languages)
 
-        # Convert to raw data (list of dicts with 'text', 'start', 'duration')
-        transcript_data = transcript.to_raw_data()
+        # Columns straight from the snippets (text, start, duration),
+        # without an intermediate list of dicts
+        segments = SegmentTable.from_segments(transcript.snippets)
 
-        print(f"   ✓ Transcript fetched: {len(transcript_data)} segments")
+        print(f"   ✓ Transcript fetched: {len(segments)} segments")
 
-        # Combine all transcript segments into single text
-        full_transcript = " ".join([segment['text'] for segment in transcript_data])
+        if cache:
+            cache.put(video_id, transcript.language_code, segments)
 
         return {
             'success': True,
             'video_id': video_id,
-            'transcript': full_transcript,
-            'length': len(full_transcript)
+            'segments': segments,
+            'transcript': segments.text,
+            'length': len(segments.text),
+            'language': transcript.language_code,
+            'cached': False
         }
 
     except TranscriptsDisabled:
@@ -4,10 +4,244 @@ Handles FAISS index creation and similarity search
 """
 import os
 import pickle
+import shutil
+import tempfile
 import numpy as np
 import faiss
-import boto3
 from io import BytesIO
+from .index_format import (
+    write_index_file, read_index_file, read_header, header_size, encode_texts, chunk_ids,
+    TextTable, MappedFlatIndex
+)
+from .clients import get_s3_client
+from .aio import run_blocking
+from . import tracing
+
+INDEX_FILE = 'index.vtx'
+# Pre-VTX layout, still readable for migration
+LEGACY_INDEX_FILE = 'faiss.index'
+LEGACY_TEXTS_FILE = 'texts.pkl'
+
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+# Index files above this size are uploaded as multipart, streamed part by part
+MULTIPART_THRESHOLD_BYTES = int(os.getenv('INDEX_MULTIPART_THRESHOLD_MB', 16)) * 1024 * 1024
+MULTIPART_CHUNK_BYTES = 8 * 1024 * 1024
+# First ranged read when only the header is needed; headers are a few hundred bytes
+HEADER_PROBE_BYTES = 64 * 1024
+# Index types of INDEX_TYPE; all but flat are quantized and trained on the video's own vectors
+INDEX_TYPES = ('flat', 'sq8', 'ivfpq', 'hnsw-sq')
+# Coarse clusters need this many training points each (FAISS' own minimum)
+IVF_MIN_POINTS_PER_LIST = 39
+# Quantizers are trained on a sample of at most this many vectors
+TRAIN_SAMPLE_MAX = 10000
+# Bits per product quantizer code; each codebook needs 2 ** PQ_NBITS training vectors
+PQ_NBITS = 8
+# Hit scores (SEARCH_SCORE): ip is the inner product of the unit vectors
+# (cosine similarity), l2 the older 1 / (1 + squared L2 distance)
+SCORE_MODES = ('ip', 'l2')
+# Hits fetched for MMR re-ranking when MMR_CANDIDATES is not set
+MMR_MIN_CANDIDATES = 20
+
+
+def flat_index_meta(dimension, count, embedding_backend=None, chunking=None, vector_dtype='float32'):
+    """
+    VTX meta of a flat (raw vectors) index
+    """
+    return {
+        'dimension': int(dimension),
+        'count': int(count),
+        'metric': 'l2',
+        'embedding_backend': embedding_backend,
+        'chunking': chunking,
+        'index_type': 'flat',
+        'vector_dtype': vector_dtype
+    }
+
+
+def build_index(vectors, index_type=None):
+    """
+    FAISS index of normalized vectors of the given type (default INDEX_TYPE):
+    flat (exact float32), sq8 (8-bit scalar quantizer), ivfpq (inverted
+    lists + product quantizer) or hnsw-sq (HNSW graph over sq8 codes)
+    Quantized types are trained on the vectors themselves; sets smaller than
+    INDEX_TRAIN_MIN_VECTORS stay flat, exact search is cheap at that size
+    """
+    index_type = index_type or os.getenv('INDEX_TYPE', 'flat')
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+    count, dimension = vectors.shape
+    if count < int(os.getenv('INDEX_TRAIN_MIN_VECTORS', 1000)) or (index_type == 'ivfpq' and count < 2 ** PQ_NBITS):
+        index_type = 'flat'
+
+    if index_type == 'sq8':
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    elif index_type == 'ivfpq':
+        nlist = int(os.getenv('INDEX_IVF_NLIST', 0)) or int(4 * np.sqrt(count))
+        nlist = max(1, min(nlist, count // IVF_MIN_POINTS_PER_LIST))
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dimension), dimension, nlist, pq_subquantizers(dimension), PQ_NBITS)
+        # 256 codes per subquantizer are trained on a single video's chunks;
+        # FAISS warns below 39 points per code, which is the normal case here
+        index.pq.cp.min_points_per_centroid = 1
+    elif index_type == 'hnsw-sq':
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, int(os.getenv('INDEX_HNSW_M', 32)))
+        index.hnsw.efConstruction = 80
+    else:
+        index = faiss.IndexFlatL2(dimension)
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if not index.is_trained:
+        sample = vectors
+        if count > TRAIN_SAMPLE_MAX:
+            rows = np.random.default_rng(0).choice(count, TRAIN_SAMPLE_MAX, replace=False)
+            sample = vectors[np.sort(rows)]
+        index.train(sample)
+    index.add(vectors)
+    if index_type == 'ivfpq':
+        # Row lookups (reconstruct_n for compaction and catalogs) need the direct map
+        index.make_direct_map()
+    configure_search(index)
+    return index
+
+
+def pq_subquantizers(dimension):
+    """
+    Product quantizer size (INDEX_PQ_M, default one byte per 16 dimensions);
+    the nearest count at or below it that divides the dimension
+    """
+    m = int(os.getenv('INDEX_PQ_M', 0)) or max(1, dimension // 16)
+    while dimension % m:
+        m -= 1
+    return m
+
+
+def configure_search(index):
+    """
+    Apply the search-time knobs (INDEX_IVF_NPROBE, INDEX_HNSW_EF_SEARCH) to
+    an index; they are not fixed at build time, so indexes can be re-tuned
+    without re-ingesting
+    """
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(index.nlist, int(os.getenv('INDEX_IVF_NPROBE', 16)))
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = int(os.getenv('INDEX_HNSW_EF_SEARCH', 64))
+
+
+def index_type_name(index):
+    """
+    INDEX_TYPES name of an index; the FAISS class name for other indexes
+    (e.g. the HNSW of catalog shards)
+    """
+    if isinstance(index, (faiss.IndexFlat, MappedFlatIndex)):
+        return 'flat'
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return 'sq8'
+    if isinstance(index, faiss.IndexIVFPQ):
+        return 'ivfpq'
+    if isinstance(index, faiss.IndexHNSWSQ):
+        return 'hnsw-sq'
+    return type(index).__name__
+
+
+def index_params(index):
+    """
+    Build parameters of a quantized index, recorded in the VTX meta
+    """
+    if isinstance(index, faiss.IndexIVFPQ):
+        return {'nlist': int(index.nlist), 'pq_m': int(index.pq.M), 'pq_nbits': int(index.pq.nbits)}
+    if isinstance(index, faiss.IndexHNSW):
+        return {'hnsw_m': int(index.hnsw.nb_neighbors(1))}
+    return {}
+
+
+def index_nbytes(index):
+    """
+    Approximate resident size of an index: vectors or codes, plus the graph
+    of HNSW indexes
+    """
+    if hasattr(index, 'nbytes'):
+        return index.nbytes
+    if isinstance(index, faiss.IndexHNSW):
+        return index_nbytes(faiss.downcast_index(index.storage)) + index.hnsw.neighbors.size() * 4
+    if isinstance(index, faiss.IndexIVFPQ):
+        # Codes, ids and direct map per row; coarse centroids and PQ codebooks
+        rows = index.ntotal * (index.code_size + 16)
+        return rows + (index.nlist + index.pq.ksub) * index.d * 4
+    try:
+        return index.ntotal * index.sa_code_size()
+    except RuntimeError:
+        return index.ntotal * index.d * 4
+
+
+def similarities(distances):
+    """
+    Inner products of unit vectors from the squared L2 distances FAISS
+    returns (|a - b|^2 = 2 - 2 a.b), so every index type scores by cosine
+    without a rebuild; quantized indexes give approximate distances
+    """
+    return 1 - np.asarray(distances, dtype=np.float32) / 2
+
+
+def score(distance):
+    """
+    Hit score of a squared L2 distance in the SEARCH_SCORE mode
+    """
+    if os.getenv('SEARCH_SCORE', 'ip') == 'l2':
+        return float(1 / (1 + distance))
+    return float(1 - distance / 2)
+
+
+def mmr_settings(top_k):
+    """
+    (lambda, candidates fetched) of MMR re-ranking for top_k hits, or None
+    when it is off (MMR_LAMBDA >= 1, or nothing to choose between)
+    """
+    mmr_lambda = float(os.getenv('MMR_LAMBDA', 1))
+    if mmr_lambda >= 1 or top_k < 2:
+        return None
+    candidates = int(os.getenv('MMR_CANDIDATES', 0)) or max(MMR_MIN_CANDIDATES, 4 * top_k)
+    return mmr_lambda, max(candidates, top_k)
+
+
+def mmr_order(vectors, relevance, k, mmr_lambda):
+    """
+    Maximal marginal relevance: positions of k candidates, each chosen to
+    maximize lambda * relevance - (1 - lambda) * (similarity to the closest
+    candidate already chosen)
+    vectors: (n, d) unit vectors of the candidates; relevance: (n,) query similarities
+    One (n, n) similarity matrix, then one vector update per pick
+    """
+    count = len(relevance)
+    if count <= k:
+        return np.argsort(-relevance, kind='stable')
+
+    pairwise = vectors @ vectors.T
+    chosen = np.zeros(count, dtype=bool)
+    first = int(np.argmax(relevance))
+    order = [first]
+    chosen[first] = True
+    redundancy = pairwise[first].copy()
+    for _ in range(k - 1):
+        gain = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        gain[chosen] = -np.inf
+        pick = int(np.argmax(gain))
+        order.append(pick)
+        chosen[pick] = True
+        np.maximum(redundancy, pairwise[pick], out=redundancy)
+    return np.array(order)
+
+
+def diversify(rows, distances, top_k, vectors_of):
+    """
+    Re-rank one query's candidate rows with MMR (see mmr_settings)
+    rows, distances: candidates as FAISS returned them (-1 rows dropped)
+    vectors_of: rows -> (n, d) float32 vectors
+    Returns (rows, distances) of at most top_k hits
+    """
+    settings = mmr_settings(top_k)
+    if settings is None or len(rows) <= top_k:
+        return rows[:top_k], distances[:top_k]
+    order = mmr_order(vectors_of(rows), similarities(distances), top_k, settings[0])
+    return rows[order], distances[order]
 
 
 class VectorStore:
@@ -16,96 +250,264 @@ class VectorStore:
     Supports persistence to S3 for serverless architecture
     """
 
-    def __init__(self, dimension=1536):
+    def __init__(self, dimension=1536, embedding_backend=None):
         """
         dimension: embedding vector size (1536 for text-embedding-3-small)
+        embedding_backend: spec of the backend that produced the vectors
+        ({'model', 'dimensions'}); queries must be embedded with the same one
         """
         self.dimension = dimension
+        self.embedding_backend = embedding_backend
+        self.chunking = None  # {'chunk_size', 'overlap'} the chunks were built with
         # Use IndexFlatL2 for exact cosine similarity search
         # Small datasets don't need approximate search algorithms
         self.index = faiss.IndexFlatL2(dimension)
         self.texts = []  # Store original text chunks
+        # float32 (n, 2) start/end seconds per chunk; None when no chunk has one
+        self.time_ranges = None
+        self.etag = None  # S3 ETag of the index this store was loaded from
 
-    def add_vectors(self, embeddings, texts):
+    @tracing.traced('vector_store.add')
+    def add_vectors(self, embeddings, texts, time_ranges=None):
         """
         Add embeddings and corresponding texts to index
-        embeddings: list of vectors (numpy array or list)
+        embeddings: (n, dimension) matrix or list of vectors; a C-contiguous
+        float32 matrix (EmbeddingGenerator output) is normalized in place and
+        added without a copy
         texts: list of original text chunks
+        time_ranges: optional (n, 2) start/end seconds of each chunk
         """
-        if not embeddings or not texts:
+        if len(embeddings) == 0 or len(texts) == 0:
             return False
 
         if len(embeddings) != len(texts):
             raise ValueError("Number of embeddings must match number of texts")
 
-        # Convert to numpy array if needed
-        embeddings_array = np.array(embeddings).astype('float32')
+        # A memory-mapped store is read-only; copy it into FAISS before appending
+        if isinstance(self.index, MappedFlatIndex):
+            self.index = self.index.to_faiss()
+            self.texts = list(self.texts)
+
+        embeddings_array = np.ascontiguousarray(embeddings, dtype=np.float32)
 
         # Normalize vectors for cosine similarity
         faiss.normalize_L2(embeddings_array)
 
         # Add to index
+        self._extend_time_ranges(len(texts), time_ranges)
         self.index.add(embeddings_array)
         self.texts.extend(texts)
 
         return True
 
+    def _extend_time_ranges(self, count, time_ranges):
+        """
+        Append time ranges for count new chunks; unknown ranges are NaN
+        """
+        if time_ranges is None and self.time_ranges is None:
+            return
+        if time_ranges is None:
+            time_ranges = np.full((count, 2), np.nan, dtype=np.float32)
+        time_ranges = np.asarray(time_ranges, dtype=np.float32).reshape(count, 2)
+
+        existing = self.time_ranges
+        if existing is None:
+            existing = np.full((self.index.ntotal, 2), np.nan, dtype=np.float32)
+        self.time_ranges = np.concatenate([existing, time_ranges])
+
+    @tracing.traced('vector_store.quantize')
+    def quantize(self, index_type=None):
+        """
+        Rebuild the index as index_type (default INDEX_TYPE), see build_index
+        A quantized index cannot give back its exact vectors, so rebuilding
+        one (compaction) re-encodes the decoded approximations
+        Returns the type of the index now in use
+        """
+        index_type = index_type or os.getenv('INDEX_TYPE', 'flat')
+        if self.index.ntotal and index_type != index_type_name(self.index):
+            index = build_index(self.index.reconstruct_n(0, self.index.ntotal), index_type)
+            if index_type_name(index) != index_type_name(self.index):
+                self.index = index
+        return index_type_name(self.index)
+
+    def hit(self, idx, distance):
+        """
+        Search result dict for row idx, with start/end seconds when known
+        """
+        result = {
+            'text': self.texts[idx],
+            'score': score(distance),
+            'index': int(idx)
+        }
+        if self.time_ranges is not None and not np.isnan(self.time_ranges[idx, 0]):
+            result['start'] = round(float(self.time_ranges[idx, 0]), 2)
+            result['end'] = round(float(self.time_ranges[idx, 1]), 2)
+        return result
+
+    @tracing.traced('vector_store.search')
     def search(self, query_embedding, top_k=3):
         """
         Search for most similar vectors
-        Returns top_k most relevant text chunks
+        Returns top_k most relevant text chunks; with MMR on (MMR_LAMBDA < 1)
+        they are picked from a larger candidate set to avoid near-duplicates
+        """
+        return self._search_matrix([query_embedding], top_k)[0]
+
+    @tracing.traced('vector_store.search_batch')
+    def search_batch(self, query_embeddings, top_k=3):
+        """
+        Search many queries with one matrix search
+        Returns a list of hit lists aligned with query_embeddings
         """
-        if self.index.ntotal == 0:
-            return []
+        return self._search_matrix(query_embeddings, top_k)
 
-        # Convert and normalize query embedding
-        query_array = np.array([query_embedding]).astype('float32')
+    def _search_matrix(self, query_embeddings, top_k):
+        if self.index.ntotal == 0 or len(query_embeddings) == 0:
+            return [[] for _ in range(len(query_embeddings))]
+
+        # Convert and normalize query embeddings (one copy: cached query
+        # embeddings must not be normalized in place)
+        query_array = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        if query_array.shape[1] != self.index.d:
+            raise ValueError(f"Query has {query_array.shape[1]} dimensions, index has {self.index.d}; "
+                             "it was built with a different embedding backend")
         faiss.normalize_L2(query_array)
 
-        # Search
-        distances, indices = self.index.search(query_array, min(top_k, self.index.ntotal))
+        # Search (over-fetching candidates for MMR)
+        settings = mmr_settings(top_k)
+        fetch = settings[1] if settings else top_k
+        distances, indices = self.index.search(query_array, min(fetch, self.index.ntotal))
 
         # Return results with similarity scores
         results = []
-        for i, idx in enumerate(indices[0]):
-            if idx != -1:  # Valid result
-                results.append({
-                    'text': self.texts[idx],
-                    'score': float(1 / (1 + distances[0][i])),  # Convert distance to similarity
-                    'index': int(idx)
-                })
+        for row_distances, row_indices in zip(distances, indices):
+            valid = row_indices != -1
+            row_indices, row_distances = diversify(row_indices[valid], row_distances[valid], top_k,
+                                                   self.index.reconstruct_batch)
+            results.append([self.hit(idx, distance) for distance, idx in zip(row_distances, row_indices)])
 
         return results
 
+    def memory_bytes(self):
+        """
+        Approximate resident size of the index and texts in bytes
+        Used by the warm-container cache to enforce its memory budget
+        """
+        vector_bytes = index_nbytes(self.index)
+        if self.time_ranges is not None:
+            vector_bytes += self.time_ranges.nbytes
+        if isinstance(self.texts, TextTable):
+            return vector_bytes + self.texts.nbytes
+        text_bytes = sum(len(text) for text in self.texts)
+        # Rough per-object overhead of Python str and list slots
+        return vector_bytes + text_bytes + 64 * len(self.texts)
+
+    def save_to_file(self, fileobj):
+        """
+        Write the store in the single-file VTX format (see index_format.py)
+        Flat indexes store raw vectors; other FAISS indexes (quantized, or
+        the HNSW of catalog shards) are stored serialized, with their type
+        and build parameters in the meta
+        """
+        text_offsets, text_blob = encode_texts(self.texts)
+        vector_dtype = os.getenv('INDEX_VECTOR_DTYPE', 'float32')
+        meta = flat_index_meta(self.index.d, self.index.ntotal, self.embedding_backend, self.chunking, vector_dtype)
+
+        if isinstance(self.index, (faiss.IndexFlat, MappedFlatIndex)):
+            vectors = self.index.reconstruct_n(0, self.index.ntotal).astype(vector_dtype, copy=False)
+            index_section = ('vectors', vectors.reshape(-1, self.index.d))
+        else:
+            meta['index_type'] = index_type_name(self.index)
+            meta['index_params'] = index_params(self.index)
+            del meta['vector_dtype']
+            index_section = ('faiss_index', faiss.serialize_index(self.index))
+
+        sections = {
+            index_section[0]: index_section[1],
+            'text_offsets': text_offsets,
+            'text_blob': text_blob
+        }
+        if self.time_ranges is not None:
+            sections['time_ranges'] = np.ascontiguousarray(self.time_ranges, dtype=np.float32)
+        sections['chunk_ids'] = chunk_ids(self.texts, self.time_ranges)
+        write_index_file(fileobj, meta, sections)
+
+    @classmethod
+    def load_from_file(cls, path):
+        """
+        Memory-map a VTX index file
+        Vectors and texts stay in the mapping; texts are decoded on access
+        """
+        meta, sections = read_index_file(path)
+
+        # Indexes written before backends were recorded have no spec (None)
+        store = cls(dimension=meta['dimension'], embedding_backend=meta.get('embedding_backend'))
+        if 'vectors' in sections:
+            store.index = MappedFlatIndex(sections['vectors'])
+        else:
+            store.index = faiss.deserialize_index(sections['faiss_index'])
+            configure_search(store.index)
+        store.texts = TextTable(sections['text_offsets'], sections['text_blob'])
+        # Indexes written before timestamps were kept have no time_ranges section
+        store.time_ranges = sections.get('time_ranges')
+        store.chunking = meta.get('chunking')
+        return store
+
+    @staticmethod
+    @tracing.traced('vector_store.upload')
+    def upload_index_file(bucket_name, key, fileobj):
+        """
+        Stream a VTX file object to S3; multipart above
+        INDEX_MULTIPART_THRESHOLD_MB, so only a few parts are in memory at once
+        Raises on failure; returns the new ETag
+        """
+        from boto3.s3.transfer import TransferConfig
+
+        s3_client = get_s3_client()
+        s3_client.upload_fileobj(fileobj, bucket_name, key, Config=TransferConfig(
+            multipart_threshold=MULTIPART_THRESHOLD_BYTES,
+            multipart_chunksize=MULTIPART_CHUNK_BYTES,
+            max_concurrency=4
+        ))
+        return s3_client.head_object(Bucket=bucket_name, Key=key).get('ETag')
+
+    @tracing.traced('vector_store.save')
+    def save_to_s3_key(self, bucket_name, key):
+        """
+        Upload the store as a VTX file to an arbitrary S3 key
+        Raises on failure; returns the new ETag
+        """
+        with tempfile.TemporaryFile() as f:
+            self.save_to_file(f)
+            f.seek(0)
+            self.etag = self.upload_index_file(bucket_name, key, f)
+        return self.etag
+
+    @classmethod
+    @tracing.traced('vector_store.load')
+    def load_from_s3_key(cls, bucket_name, key):
+        """
+        Download a VTX file from an arbitrary S3 key and memory-map it
+        Raises on failure (including NoSuchKey)
+        """
+        s3_client = get_s3_client()
+        index_obj = s3_client.get_object(Bucket=bucket_name, Key=key)
+
+        # The mapping stays valid after the file is unlinked
+        with tempfile.NamedTemporaryFile(dir=os.getenv('INDEX_CACHE_DIR', '/tmp')) as f:
+            shutil.copyfileobj(index_obj['Body'], f, DOWNLOAD_CHUNK_BYTES)
+            f.flush()
+            store = cls.load_from_file(f.name)
+
+        store.etag = index_obj.get('ETag')
+        return store
+
     def save_to_s3(self, bucket_name, video_id):
         """
-        Save index and texts to S3
+        Save index and texts to S3 as a single VTX file
         """
         try:
-            s3_client = boto3.client('s3')
-
-            # Save FAISS index
-            index_buffer = BytesIO()
-            faiss.write_index(self.index, faiss.BufferedIOWriter(faiss.PyCallbackIOWriter(index_buffer.write)))
-            index_buffer.seek(0)
-
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=f'indexes/{video_id}/faiss.index',
-                Body=index_buffer.getvalue()
-            )
-
-            # Save texts
-            texts_buffer = BytesIO()
-            pickle.dump(self.texts, texts_buffer)
-            texts_buffer.seek(0)
-
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=f'indexes/{video_id}/texts.pkl',
-                Body=texts_buffer.getvalue()
-            )
-
+            self.save_to_s3_key(bucket_name, f'indexes/{video_id}/{INDEX_FILE}')
             return True
 
         except Exception as e:
@@ -116,32 +518,139 @@ class VectorStore:
     def load_from_s3(cls, bucket_name, video_id, dimension=1536):
         """
         Load index and texts from S3
+        Streams the VTX file to local disk and memory-maps it; falls back to
+        the legacy faiss.index + texts.pkl pair for videos ingested before it
         """
         try:
-            s3_client = boto3.client('s3')
-
-            # Load FAISS index
-            index_obj = s3_client.get_object(
-                Bucket=bucket_name,
-                Key=f'indexes/{video_id}/faiss.index'
-            )
-            index_buffer = BytesIO(index_obj['Body'].read())
-            index = faiss.read_index(faiss.BufferedIOReader(faiss.PyCallbackIOReader(index_buffer.read)))
-
-            # Load texts
-            texts_obj = s3_client.get_object(
-                Bucket=bucket_name,
-                Key=f'indexes/{video_id}/texts.pkl'
-            )
-            texts = pickle.load(BytesIO(texts_obj['Body'].read()))
-
-            # Create instance and restore state
-            store = cls(dimension=dimension)
-            store.index = index
-            store.texts = texts
-
-            return store
+            s3_client = get_s3_client()
+
+            try:
+                return cls.load_from_s3_key(bucket_name, f'indexes/{video_id}/{INDEX_FILE}')
+            except s3_client.exceptions.NoSuchKey:
+                return cls._load_legacy_from_s3(s3_client, bucket_name, video_id, dimension)
 
         except Exception as e:
             print(f"Error loading from S3: {str(e)}")
             return None
+
+    async def asave_to_s3(self, bucket_name, video_id):
+        """
+        save_to_s3() for async callers; the upload runs on the blocking pool
+        """
+        return await run_blocking(self.save_to_s3, bucket_name, video_id)
+
+    @classmethod
+    async def aload_from_s3(cls, bucket_name, video_id, dimension=1536):
+        """
+        load_from_s3() for async callers; download and mapping run on the
+        blocking pool
+        """
+        return await run_blocking(cls.load_from_s3, bucket_name, video_id, dimension)
+
+    @classmethod
+    @tracing.traced('vector_store.load_legacy')
+    def _load_legacy_from_s3(cls, s3_client, bucket_name, video_id, dimension):
+        """
+        Load the pre-VTX format (FAISS blob + pickled texts)
+        Only used for migration; re-ingesting writes the new format
+        """
+        print(f"Loading legacy index format for video: {video_id}")
+
+        # Load FAISS index
+        index_obj = s3_client.get_object(
+            Bucket=bucket_name,
+            Key=f'indexes/{video_id}/{LEGACY_INDEX_FILE}'
+        )
+        etag = index_obj.get('ETag')
+        index_buffer = BytesIO(index_obj['Body'].read())
+        index = faiss.read_index(faiss.BufferedIOReader(faiss.PyCallbackIOReader(index_buffer.read)))
+
+        # Load texts
+        texts_obj = s3_client.get_object(
+            Bucket=bucket_name,
+            Key=f'indexes/{video_id}/{LEGACY_TEXTS_FILE}'
+        )
+        texts = pickle.load(BytesIO(texts_obj['Body'].read()))
+
+        # Create instance and restore state
+        store = cls(dimension=index.d)
+        store.index = index
+        store.texts = texts
+        store.etag = etag
+
+        return store
+
+    @staticmethod
+    @tracing.traced('vector_store.header')
+    def read_s3_header(bucket_name, key):
+        """
+        Read only the VTX header of an S3 object with ranged GETs
+        Returns (header dict {'meta', 'sections'}, data start offset, ETag)
+        Raises on failure (including NoSuchKey)
+        """
+        s3_client = get_s3_client()
+        response = s3_client.get_object(Bucket=bucket_name, Key=key, Range=f'bytes=0-{HEADER_PROBE_BYTES - 1}')
+        prefix = response['Body'].read()
+        needed = header_size(prefix)
+        if len(prefix) < needed:
+            prefix = s3_client.get_object(Bucket=bucket_name, Key=key, Range=f'bytes=0-{needed - 1}')['Body'].read()
+        header, data_start = read_header(prefix)
+        return header, data_start, response.get('ETag')
+
+    @staticmethod
+    @tracing.traced('vector_store.section')
+    def read_s3_section(bucket_name, key, header, data_start, name):
+        """
+        Fetch one array section of a VTX object with a ranged GET
+        Returns None if the file has no such section
+        """
+        spec = header['sections'].get(name)
+        if spec is None:
+            return None
+        start = data_start + spec['offset']
+        body = get_s3_client().get_object(
+            Bucket=bucket_name, Key=key, Range=f"bytes={start}-{start + spec['length'] - 1}"
+        )['Body'].read()
+        return np.frombuffer(body, dtype=np.dtype(spec['dtype'])).reshape(spec['shape'])
+
+    @staticmethod
+    def get_s3_header(bucket_name, video_id):
+        """
+        Read only the VTX header ({'meta', 'sections'}) of a stored index
+        with a ranged GET; returns None if there is no VTX index
+        """
+        s3_client = get_s3_client()
+
+        try:
+            header, _, _ = VectorStore.read_s3_header(bucket_name, f'indexes/{video_id}/{INDEX_FILE}')
+            return header
+
+        except s3_client.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            print(f"Error reading index header from S3: {str(e)}")
+            return None
+
+    @staticmethod
+    @tracing.traced('vector_store.head')
+    def get_s3_etag(bucket_name, video_id):
+        """
+        Return the current ETag of the stored index without downloading it
+        Returns None if the index does not exist
+        """
+        s3_client = get_s3_client()
+        error = None
+
+        for filename in (INDEX_FILE, LEGACY_INDEX_FILE):
+            try:
+                response = s3_client.head_object(
+                    Bucket=bucket_name,
+                    Key=f'indexes/{video_id}/{filename}'
+                )
+                return response.get('ETag')
+
+            except Exception as e:
+                error = e
+
+        print(f"Error checking index in S3: {str(error)}")
+        return None
@@ -32,12 +32,7 @@ async function ingestVideo() {
     // Show loading state with progress
     ingestBtn.disabled = true;
 
-    // Show progress steps
-    showStatus('📥 Step 1/4: Extracting transcript from YouTube...', 'loading');
-
-    setTimeout(() => showStatus('📝 Step 2/4: Chunking transcript text...', 'loading'), 3000);
-    setTimeout(() => showStatus('🧠 Step 3/4: Generating embeddings with OpenAI...', 'loading'), 6000);
-    setTimeout(() => showStatus('☁️ Step 4/4: Uploading vector store to S3...', 'loading'), 15000);
+    showStatus('📥 Queuing video for processing...', 'loading');
 
     try {
         const response = await fetch(`${API_BASE_URL}/ingest`, {
@@ -50,10 +45,23 @@ async function ingestVideo() {
 
         const data = await response.json();
 
-        if (response.ok && data.success) {
-            currentVideoId = data.video_id;
+        if (!response.ok || !data.success) {
+            showStatus(`❌ Error: ${data.error || 'Failed to process video'}`, 'error');
+            ingestBtn.disabled = false;
+            return;
+        }
+
+        // An up-to-date index is reused without a job
+        const job = data.already_ingested
+            ? { status: 'succeeded', result: data }
+            : await waitForIngestJob(data.job_id);
+
+        if (job.status === 'succeeded') {
+            currentVideoId = job.result.video_id;
             showStatus(
-                `✅ Video processed successfully! Created ${data.chunks_count} chunks from ${data.transcript_length} characters. Ready to chat!`,
+                data.already_ingested
+                    ? `✅ Video already processed (${job.result.chunks_count} chunks). Ready to chat!`
+                    : `✅ Video processed successfully! Created ${job.result.chunks_count} chunks from ${job.result.transcript_length} characters. Ready to chat!`,
                 'success'
             );
 
@@ -63,7 +71,7 @@ async function ingestVideo() {
                 document.getElementById('chat-section').style.display = 'block';
             }, 2000);
         } else {
-            showStatus(`❌ Error: ${data.error || 'Failed to process video'}`, 'error');
+            showStatus(`❌ Error: ${job.error || 'Failed to process video'}`, 'error');
             ingestBtn.disabled = false;
         }
     } catch (error) {
@@ -72,6 +80,37 @@ async function ingestVideo() {
     }
 }
 
+// Poll /ingest/status until the job finishes, showing the current stage
+const INGEST_STAGE_MESSAGES = {
+    fetch: '📥 Step 1/4: Extracting transcript from YouTube...',
+    chunk: '📝 Step 2/4: Chunking transcript text...',
+    embed: '🧠 Step 3/4: Generating embeddings with OpenAI...',
+    save: '☁️ Step 4/4: Uploading vector store to S3...'
+};
+
+async function waitForIngestJob(jobId) {
+    while (true) {
+        const response = await fetch(`${API_BASE_URL}/ingest/status`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ job_id: jobId })
+        });
+        const job = await response.json();
+
+        if (!response.ok) {
+            throw new Error(job.error || 'Failed to get job status');
+        }
+        if (job.status === 'succeeded' || job.status === 'failed') {
+            return job;
+        }
+
+        showStatus(INGEST_STAGE_MESSAGES[job.stage] || '⏳ Processing...', 'loading');
+        await new Promise(resolve => setTimeout(resolve, 1500));
+    }
+}
+
 // Ask question
 async function askQuestion() {
     const questionInput = document.getElementById('question-input');
@@ -94,7 +133,7 @@ async function askQuestion() {
     const loadingId = addMessage('Thinking<span class="loading-dots"></span>', 'bot', true);
 
     try {
-        const response = await fetch(`${API_BASE_URL}/chat`, {
+        const response = await fetch(`${API_BASE_URL}/chat/stream`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -105,16 +144,46 @@ async function askQuestion() {
             })
         });
 
-        const data = await response.json();
+        if (!response.ok || !response.body) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
 
-        // Remove loading message
-        removeMessage(loadingId);
+        // Read server-sent events: metadata, token..., done (or error)
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answerId = null;
+        let answer = '';
 
-        if (response.ok && data.success) {
-            addMessage(data.answer, 'bot');
-        } else {
-            addMessage(`Error: ${data.error || 'Failed to get answer'}`, 'bot');
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+
+            for (const frame of frames) {
+                const event = parseSSE(frame);
+                if (!event) continue;
+
+                if (event.type === 'token') {
+                    if (!answerId) {
+                        removeMessage(loadingId);
+                        answerId = addMessage('', 'bot');
+                    }
+                    answer += event.data.text;
+                    updateMessage(answerId, answer);
+                } else if (event.type === 'error') {
+                    removeMessage(loadingId);
+                    addMessage(`Error: ${event.data.error || 'Failed to get answer'}`, 'bot');
+                } else if (event.type === 'done') {
+                    console.log(`Time to first token: ${event.data.ttft_ms} ms`);
+                }
+            }
         }
+
+        removeMessage(loadingId);
     } catch (error) {
         removeMessage(loadingId);
         addMessage(`Error: ${error.message}`, 'bot');
@@ -125,6 +194,17 @@ async function askQuestion() {
     }
 }
 
+// Parse one server-sent event frame into {type, data}
+function parseSSE(frame) {
+    let type = 'message';
+    let data = '';
+    for (const line of frame.split('\n')) {
+        if (line.startsWith('event: ')) type = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+    }
+    return data ? { type, data: JSON.parse(data) } : null;
+}
+
 // Handle Enter key in question input
 function handleEnter(event) {
     if (event.key === 'Enter') {
@@ -166,6 +246,15 @@ function addMessage(text, type, isLoading = false) {
     return messageId;
 }
 
+function updateMessage(messageId, text) {
+    const message = document.getElementById(messageId);
+    if (message) {
+        message.textContent = text;
+        const chatBox = document.getElementById('chat-box');
+        chatBox.scrollTop = chatBox.scrollHeight;
+    }
+}
+
 function removeMessage(messageId) {
     const message = document.getElementById(messageId);
     if (message) {